@@ -19,21 +19,30 @@ sqlite_conn = sqlite3.connect(
     "tpch.db"
 )  # Typically this will involve a connection string, sqlite3 db is stored as a file
 
-# Fetch data from the SQLite Customer table using conn.execute
-customers = sqlite_conn.execute(
-    "SELECT * FROM Customer"
-).fetchall()  # Fetch data from the SQLite Customer table
-
 import duckdb  # duckdb database driver
 
 duckdb_conn = duckdb.connect("duckdb.db")  # Duckdb connection string
-# Insert data into the DuckDB Customer table
-insert_query = f"""
-INSERT INTO Customer (customer_id, zipcode, city, state_code, datetime_created, datetime_updated)
-VALUES (?, ?, ?, ?, ?, ?)
-"""  # Insert into query
 
-duckdb_conn.executemany(insert_query, customers)
+# Load the Customer table from SQLite to DuckDB, reading only the rows that changed since the last run
+# incremental_extract saves a high-water mark on datetime_updated per table
+# and upserts the rows updated after it on customer_id
+# The first run has no high-water mark yet and does a full refresh, replacing whatever the table held,
+# so rerunning the script never duplicates rows or reloads the whole table
+from extract_load_functions import get_high_water_mark, incremental_extract
+
+first_load = get_high_water_mark(duckdb_conn, "Customer") is None
+incremental_extract(sqlite_conn, duckdb_conn, "Customer", full_refresh=first_load)
+
+# Question: How do you copy a whole table in one go, e.g. for a one-off snapshot?
+# fetchall() + executemany() would build a Python tuple per row and insert them one at a time,
+# transfer_table lets DuckDB scan the SQLite file directly (or falls back to fetchmany batches)
+# It appends every row, so it copies into a freshly created table
+from extract_load_functions import transfer_table
+
+duckdb_conn.execute(
+    "CREATE OR REPLACE TABLE CustomerSnapshot AS SELECT * FROM Customer LIMIT 0"
+)
+transfer_table(sqlite_conn, duckdb_conn, "Customer", target="CustomerSnapshot")
 
 # Commit and close the connections
 # Commit tells the DB connection to send the data to the database and commit it, if you don't commit the data will not be inserted
@@ -49,41 +58,32 @@ duckdb_conn.close()
 # Hint: Use boto3 client with UNSIGNED config to access the S3 bucket
 # Hint: The data will be zipped you have to unzip it
 
-import csv
-import gzip
-from io import StringIO
-
 import boto3
 import duckdb
 from botocore import UNSIGNED
 from botocore.client import Config
 
+from cache_functions import ColumnarCache, load_parquet
+from s3_functions import cache_s3_gzip_csv
+
 # AWS S3 bucket and file details
 bucket_name = "noaa-ghcn-pds"
 file_key = "csv.gz/by_station/ASN00002022.csv.gz"
 # Create a boto3 client with anonymous access
 s3_client = boto3.client("s3", config=Config(signature_version=UNSIGNED))
 
-# Download the CSV file from S3
-response = s3_client.get_object(Bucket=bucket_name, Key=file_key)
-compressed_data = response["Body"].read()
-
-# Decompress the gzip data
-csv_data = gzip.decompress(compressed_data).decode("utf-8")
-
-# Read the CSV file using csv.reader
-csv_reader = csv.reader(StringIO(csv_data))
-data = list(csv_reader)
 # Connect to the DuckDB database (assume WeatherData table exists)
 duckdb_conn = duckdb.connect("duckdb.db")
 
-# Insert data into the DuckDB WeatherData table
-insert_query = """
-INSERT INTO WeatherData (id, date, element, value, m_flag, q_flag, s_flag, obs_time)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-"""
-
-duckdb_conn.executemany(insert_query, data[:100000])
+# Stream the object: decompress and parse it in batches and write each batch to a local Parquet cache
+# Reading the whole body, decompressing it, decoding it and building a list of rows keeps
+# four copies of the file in memory, streaming keeps memory constant however large the file is
+# The cache entry is keyed by the object's ETag, so repeat runs skip the download and parsing
+# until the object changes, and DuckDB loads the Parquet file with read_parquet
+cache = ColumnarCache(".columnar_cache")
+weather_path = cache_s3_gzip_csv(s3_client, bucket_name, file_key, cache)
+load_parquet(duckdb_conn, "WeatherData", weather_path)
+print(cache.stats)
 
 # Commit and close the connection
 duckdb_conn.commit()
@@ -95,45 +95,27 @@ duckdb_conn.close()
 # Hint: use requests library
 
 import duckdb
-import requests
+
+from api_functions import EXCHANGES_SCHEMA, ApiExtractor, load_records
 
 # Define the API endpoint
 url = "https://api.coincap.io/v2/exchanges"
 
 # Fetch data from the CoinCap API
-response = requests.get(url)
-data = response.json()["data"]
+# ApiExtractor reuses pooled connections, sets a timeout, retries rate limited requests
+# and revalidates its on-disk cache with ETag/Last-Modified so unchanged data is not downloaded again
+with ApiExtractor(cache_dir=".api_cache") as extractor:
+    data = extractor.get_json(url)["data"]
 
 # Connect to the DuckDB database
 duckdb_conn = duckdb.connect("duckdb.db")
 
 # Insert data into the DuckDB Exchanges table
-insert_query = """
-INSERT INTO Exchanges (id, name, rank, percentTotalVolume, volumeUsd, tradingPairs, socket, exchangeUrl, updated)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-"""
-# Prepare data for insertion
 # Hint: Why are we changing the data type?
-insert_data = [
-    (
-        exchange["exchangeId"],
-        exchange["name"],
-        int(exchange["rank"]),
-        (
-            float(exchange["percentTotalVolume"])
-            if exchange["percentTotalVolume"]
-            else None
-        ),
-        float(exchange["volumeUsd"]) if exchange["volumeUsd"] else None,
-        exchange["tradingPairs"],
-        exchange["socket"],
-        exchange["exchangeUrl"],
-        int(exchange["updated"]),
-    )
-    for exchange in data
-]
-
-duckdb_conn.executemany(insert_query, insert_data)
+# The API returns numbers as strings, EXCHANGES_SCHEMA maps every JSON field to its DuckDB column type
+# load_records checks the schema against the Exchanges table, converts the whole payload
+# to typed Arrow columns at once (empty strings become NULL) and inserts it in one statement
+load_records(duckdb_conn, "Exchanges", data, EXCHANGES_SCHEMA)
 
 # Commit and close the connection
 duckdb_conn.commit()
@@ -152,6 +134,19 @@ with open(data_location, "r", newline="") as csvfile:
     for row in csvreader:
         print(row)
 
+# To write it to a database, load the file in bulk instead of inserting row by row
+# bulk_load_csv uses DuckDB's read_csv with the table's column types (or a single executemany for SQLite)
+import duckdb
+
+from extract_load_functions import bulk_load_csv
+
+duckdb_conn = duckdb.connect("duckdb.db")
+duckdb_conn.execute(
+    "CREATE OR REPLACE TABLE CustomerCsv AS SELECT * FROM Customer LIMIT 0"
+)
+bulk_load_csv(duckdb_conn, "CustomerCsv", data_location)
+duckdb_conn.close()
+
 # Web scraping
 # Questions: Use beatiful soup to scrape the below website and print all the links in that website
 # URL of the website to scrape
@@ -172,3 +167,13 @@ soup = BeautifulSoup(response.text, 'html.parser')
 for link in soup.find_all('a'):
     print(link.get('href'))
 
+# Question: How do you follow the links and crawl the whole website?
+# crawl does a breadth-first crawl with asyncio, with a limit on concurrent requests per host,
+# it follows robots.txt, parses only the <a> tags with lxml and writes the link graph to DuckDB in batches
+import duckdb
+
+from crawl_functions import crawl
+
+duckdb_conn = duckdb.connect("duckdb.db")
+print(crawl([url], duckdb_conn, max_pages=50, max_depth=2))
+duckdb_conn.close()
@@ -13,12 +13,11 @@ import json
 sample_df = pd.read_csv("data/sample_data.csv")
 
 # list of dicts - each dict is a customer
-customers = []
+# iterrows() builds a Series object per customer before converting it to a dict,
+# to_records converts the DataFrame column by column and zips the rows from the column lists
+from transform_functions import to_records
 
-for _, row in sample_df.iterrows():
-    # each row returns a Series object corresponding to a single customer
-    customer_dict = row.to_dict()
-    customers.append(customer_dict)
+customers = to_records(sample_df, "dicts")
 
 print(json.dumps(customers, indent=4))
 
@@ -5,79 +5,51 @@ print("Use standard python libraries to do the transformations")
 print(
     "################################################################################"
 )
-import csv
+from transform_functions import (
+    GENDER_CODES,
+    aggregate_purchases,
+    cast_columns,
+    dedup_rows,
+    encode_values,
+    fill_missing,
+    read_rows,
+    remove_outliers,
+    split_name,
+)
+
+# Every step below is a generator stage: a row is read, cleaned and added to the aggregates
+# before the next row is read, so the data is walked once and never held in memory as a list
 
 # Question: How do you read data from a CSV file into a list of dictionaries?
-data = []
-with open("./data/sample_data.csv", "r", newline="") as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        data.append(row)
+# read_rows yields the csv.DictReader rows one at a time, list(read_rows(...)) gives the list
+rows = read_rows("./data/sample_data.csv")
 
 # Question: How do you remove duplicate rows based on customer ID?
-data_unique = []
-customer_ids_seen = set()
-for row in data:
-    if row["Customer_ID"] not in customer_ids_seen:
-        data_unique.append(row)
-        customer_ids_seen.add(row["Customer_ID"])
-    else:
-        print(f'duplicate customer id {row["Customer_ID"]}')
+rows = dedup_rows(rows, "Customer_ID")
 
 # Question: How do you handle missing values by replacing them with 0?
-for row in data_unique:
-    if not row["Age"]:
-        print(f'Customer {row["Customer_Name"]} does not have Age value')
-        row["Age"] = 0
-    if not row["Purchase_Amount"]:
-        row["Purchase_Amount"] = 0.0
+rows = fill_missing(rows, {"Age": 0, "Purchase_Amount": 0.0})
+# hint: Why do we convert to float?
+# The CSV values are strings, they are converted once here instead of in every later step
+rows = cast_columns(rows, {"Age": int, "Purchase_Amount": float})
 
 # Question: How do you remove outliers such as age > 100 or purchase amount > 1000?
-data_cleaned = [
-    row
-    for row in data_unique
-    if int(row["Age"]) <= 100 and float(row["Purchase_Amount"]) <= 1000
-]
+rows = remove_outliers(rows, {"Age": 100, "Purchase_Amount": 1000})
 
 # Question: How do you convert the Gender column to a binary format (0 for Female, 1 for Male)?
-for row in data_cleaned:
-    if row["Gender"] == "Female":
-        row["Gender"] = 0
-    elif row["Gender"] == "Male":
-        row["Gender"] = 1
+# GENDER_CODES gives any other or missing Gender -1, the same in every engine below
+rows = encode_values(rows, {"Gender": GENDER_CODES})
 
 # Question: How do you split the Customer_Name column into separate First_Name and Last_Name columns?
-for row in data_cleaned:
-    first_name, last_name = row["Customer_Name"].split(" ", 1)
-    row["First_Name"] = first_name
-    row["Last_Name"] = last_name
-    del row["Customer_Name"]
+rows = split_name(rows, "Customer_Name")
 
 # Question: How do you calculate the total purchase amount by Gender?
-total_purchase_by_gender = {}
-for row in data_cleaned:
-    total_purchase_by_gender[row["Gender"]] += float(row["Purchase_Amount"])
-
 # Question: How do you calculate the average purchase amount by Age group?
-# assume age_groups is the grouping we want
-# hint: Why do we convert to float?
-age_groups = {"18-30": [], "31-40": [], "41-50": [], "51-60": [], "61-70": []}
-for row in data_cleaned:
-    age = int(row["Age"])
-    if age <= 30:
-        age_groups["18-30"].append(float(row["Purchase_Amount"]))
-    elif age <= 40:
-        age_groups["31-40"].append(float(row["Purchase_Amount"]))
-    elif age <= 50:
-        age_groups["41-50"].append(float(row["Purchase_Amount"]))
-    elif age <= 60:
-        age_groups["51-60"].append(float(row["Purchase_Amount"]))
-    else:
-        age_groups["61-70"].append(float(row["Purchase_Amount"]))
-
-average_purchase_by_age_group = {
-    group: sum(amounts) / len(amounts) for group, amounts in age_groups.items()
-}
+# assume age_groups is the grouping we want: 18-30, 31-40, 41-50, 51-60 and 61-70, AGE_GROUPS
+# puts the 0 of a missing age in 0-17 and ages over 70 in 71+ the same way in every engine
+# Both are computed in the same pass with a running sum and count per group,
+# appending every amount to a list per age group would grow with the input
+total_purchase_by_gender, average_purchase_by_age_group = aggregate_purchases(rows)
 
 # Question: How do you print the results for total purchase amount by Gender and average purchase amount by Age group?
 print("Total purchase amount by Gender:", total_purchase_by_gender)
@@ -103,62 +75,36 @@ con.execute(
 # Read data from CSV file into DuckDB table
 con.execute("COPY data FROM './data/sample_data.csv' WITH HEADER CSV")
 
+from transform_functions import purchases_dag
+
+# Each step is a SELECT that reads the previous step, declared in purchases_dag (transform_functions.py)
+# Creating a table per step would write the whole data set to DuckDB five times, the DAG compiles
+# the steps an output needs into one query with CTEs, so DuckDB runs them as a single pipeline
+# and only the two aggregates are computed
+dag = purchases_dag("data")
+
 # Question: How do you remove duplicate rows based on customer ID in DuckDB?
-con.execute("CREATE TABLE data_unique AS SELECT DISTINCT * FROM data")
+print(dag.steps["data_unique"])
 
 # Question: How do you handle missing values by replacing them with 0 in DuckDB?
-con.execute(
-    "CREATE TABLE data_cleaned_missing AS SELECT \
-             Customer_ID, Customer_Name, \
-             COALESCE(Age, 0) AS Age, \
-             Gender, \
-             COALESCE(Purchase_Amount, 0.0) AS Purchase_Amount, \
-             Purchase_Date \
-             FROM data_unique"
-)
+print(dag.steps["data_cleaned_missing"])
 
 # Question: How do you remove outliers (e.g., age > 100 or purchase amount > 1000) in DuckDB?
-con.execute(
-    "CREATE TABLE data_cleaned_outliers AS SELECT * FROM data_cleaned_missing \
-             WHERE Age <= 100 AND Purchase_Amount <= 1000"
-)
+print(dag.steps["data_cleaned_outliers"])
 
 # Question: How do you convert the Gender column to a binary format (0 for Female, 1 for Male) in DuckDB?
-con.execute(
-    "CREATE TABLE data_cleaned_gender AS SELECT *, \
-             CASE WHEN Gender = 'Female' THEN 0 ELSE 1 END AS Gender_Binary \
-             FROM data_cleaned_outliers"
-)
+print(dag.steps["data_cleaned_gender"])
 
 # Question: How do you split the Customer_Name column into separate First_Name and Last_Name columns in DuckDB?
-con.execute(
-    "CREATE TABLE data_cleaned AS SELECT \
-             Customer_ID, \
-             SPLIT_PART(Customer_Name, ' ', 1) AS First_Name, \
-             SPLIT_PART(Customer_Name, ' ', 2) AS Last_Name, \
-             Age, Gender_Binary, Purchase_Amount, Purchase_Date \
-             FROM data_cleaned_gender"
-)
+print(dag.steps["data_cleaned"])
 
 # Question: How do you calculate the total purchase amount by Gender in DuckDB?
-total_purchase_by_gender = con.execute(
-    "SELECT Gender_Binary, SUM(Purchase_Amount) AS Total_Purchase_Amount \
-                                        FROM data_cleaned_gender \
-                                        GROUP BY Gender_Binary"
-).fetchall()
+total_purchase_by_gender = dag.fetchall(con, "total_purchase_by_gender")
 
 # Question: How do you calculate the average purchase amount by Age group in DuckDB?
-average_purchase_by_age_group = con.execute(
-    "SELECT CASE \
-                                             WHEN Age BETWEEN 18 AND 30 THEN '18-30' \
-                                             WHEN Age BETWEEN 31 AND 40 THEN '31-40' \
-                                             WHEN Age BETWEEN 41 AND 50 THEN '41-50' \
-                                             WHEN Age BETWEEN 51 AND 60 THEN '51-60' \
-                                             ELSE '61-70' END AS Age_Group, \
-                                             AVG(Purchase_Amount) AS Average_Purchase_Amount \
-                                             FROM data_cleaned \
-                                             GROUP BY Age_Group"
-).fetchall()
+average_purchase_by_age_group = dag.fetchall(con, "average_purchase_by_age_group")
+
+# dag.materialize(con, "data_cleaned") would store the cleaned rows as a table if they are needed later
 
 # Question: How do you print the results for total purchase amount by Gender and average purchase amount by Age group in DuckDB?
 print("====================== Results ======================")
@@ -166,3 +112,40 @@ print("Total purchase amount by Gender:")
 print(total_purchase_by_gender)
 print("Average purchase amount by Age group:")
 print(average_purchase_by_age_group)
+
+print(
+    "################################################################################"
+)
+print("Use polars lazy API to do the transformations")
+print(
+    "################################################################################"
+)
+
+import polars as pl
+
+from transform_functions import polars_age_group, scan_purchases
+
+# Question: How do you run all the transformations as one query plan?
+# scan_purchases chains the dedup, missing values, outliers, Gender and name split steps on
+# pl.scan_csv without reading anything, polars then optimises the whole plan at collect time:
+# only the columns used by the query are parsed and the filters run as early as possible
+purchases = scan_purchases("./data/sample_data.csv")
+
+total_purchase_by_gender = purchases.group_by("Gender").agg(
+    pl.col("Purchase_Amount").sum().alias("Total_Purchase_Amount")
+)
+average_purchase_by_age_group = (
+    purchases.group_by(polars_age_group(pl.col("Age")).alias("Age_Group"))
+    .agg(pl.col("Purchase_Amount").mean().alias("Average_Purchase_Amount"))
+    .sort("Age_Group")
+)
+
+# collect_all runs both queries together and shares the common scan and cleaning steps
+total_purchase_by_gender, average_purchase_by_age_group = pl.collect_all(
+    [total_purchase_by_gender, average_purchase_by_age_group]
+)
+print("====================== Results ======================")
+print("Total purchase amount by Gender:")
+print(total_purchase_by_gender)
+print("Average purchase amount by Age group:")
+print(average_purchase_by_age_group)
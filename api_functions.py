@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import requests
+from requests.adapters import HTTPAdapter
+
+from extract_load_functions import insert_arrow
+
+# JSON field -> (DuckDB column, DuckDB type) of the CoinCap exchanges payload,
+# it has to match CREATE TABLE Exchanges in db/setup_db.py (see validate_schema)
+EXCHANGES_SCHEMA = [
+    ("exchangeId", "id", "TEXT"),
+    ("name", "name", "TEXT"),
+    ("rank", "rank", "INTEGER"),
+    ("percentTotalVolume", "percentTotalVolume", "FLOAT"),
+    ("volumeUsd", "volumeUsd", "FLOAT"),
+    ("tradingPairs", "tradingPairs", "TEXT"),
+    ("socket", "socket", "BOOLEAN"),
+    ("exchangeUrl", "exchangeUrl", "TEXT"),
+    ("updated", "updated", "BIGINT"),
+]
+
+ARROW_TYPES = {
+    "VARCHAR": pa.string(),
+    "INTEGER": pa.int32(),
+    "BIGINT": pa.int64(),
+    "FLOAT": pa.float32(),
+    "DOUBLE": pa.float64(),
+    "BOOLEAN": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("us"),
+}
+
+# Type aliases DuckDB accepts in CREATE TABLE, mapped to the names it reports back
+TYPE_ALIASES = {
+    "TEXT": "VARCHAR",
+    "STRING": "VARCHAR",
+    "INT": "INTEGER",
+    "INT4": "INTEGER",
+    "INT8": "BIGINT",
+    "REAL": "FLOAT",
+    "FLOAT4": "FLOAT",
+    "FLOAT8": "DOUBLE",
+    "BOOL": "BOOLEAN",
+}
+
+
+# On-disk cache of JSON responses with their ETag/Last-Modified validators,
+# one file per URL + query parameters
+class ResponseCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url, params):
+        key = url + "?" + json.dumps(params or {}, sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, url, params):
+        try:
+            with open(self._path(url, params)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    # Write to a temporary file and rename so readers never see a partial entry
+    def put(self, url, params, etag, last_modified, body):
+        entry = {"etag": etag, "last_modified": last_modified, "body": body}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self._path(url, params))
+
+
+# HTTP JSON extractor with a pooled requests.Session, timeouts, retries on 429/5xx
+# honouring Retry-After, an optional requests_per_second limit and conditional
+# requests against an on-disk ResponseCache
+class ApiExtractor:
+    def __init__(
+        self,
+        cache_dir=None,
+        pool_size=16,
+        timeout=10,
+        retries=3,
+        backoff=0.5,
+        requests_per_second=None,
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.min_interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_request_at = 0
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "cache_hits": 0, "retries": 0}
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Space requests at least min_interval apart across all threads
+    def _wait_for_slot(self):
+        if not self.min_interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_request_at - now
+            self.next_request_at = max(now, self.next_request_at) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff * 2**attempt
+
+    # GET a URL and return the decoded JSON, a 304 answer is served from the cache
+    def get_json(self, url, params=None):
+        cached = self.cache.get(url, params) if self.cache else None
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.retries + 1):
+            self._wait_for_slot()
+            response = self.session.get(
+                url, params=params, headers=headers, timeout=self.timeout
+            )
+            with self.lock:
+                self.stats["requests"] += 1
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            if attempt < self.retries:
+                with self.lock:
+                    self.stats["retries"] += 1
+                time.sleep(self._retry_delay(response, attempt))
+
+        if response.status_code == 304 and cached:
+            with self.lock:
+                self.stats["cache_hits"] += 1
+            return cached["body"]
+        response.raise_for_status()
+        body = response.json()
+        if self.cache:
+            self.cache.put(
+                url,
+                params,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                body,
+            )
+        return body
+
+    # Fetch every page of a limit/offset paginated endpoint, concurrency pages at a time,
+    # stopping at the first page shorter than page_size
+    def fetch_pages(
+        self, url, page_size=100, concurrency=4, params=None, data_key="data"
+    ):
+        def fetch_page(offset):
+            page_params = {**(params or {}), "limit": page_size, "offset": offset}
+            return self.get_json(url, page_params)[data_key]
+
+        records = []
+        offset = 0
+        with ThreadPoolExecutor(concurrency) as pool:
+            while True:
+                offsets = [offset + i * page_size for i in range(concurrency)]
+                for page in pool.map(fetch_page, offsets):
+                    records.extend(page)
+                    if len(page) < page_size:
+                        return records
+                offset += concurrency * page_size
+
+    # Share of requests answered from the cache
+    def cache_hit_rate(self):
+        return self.stats["cache_hits"] / max(1, self.stats["requests"])
+
+
+def _normalise_type(duckdb_type):
+    duckdb_type = duckdb_type.upper()
+    return TYPE_ALIASES.get(duckdb_type, duckdb_type)
+
+
+# Check that every schema column exists in the DuckDB table with the same type
+def validate_schema(duckdb_conn, table, schema):
+    table_types = {
+        name: _normalise_type(column_type)
+        for name, column_type in duckdb_conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = ?",
+            [table],
+        ).fetchall()
+    }
+    if not table_types:
+        raise ValueError(f"Table {table} does not exist")
+    mismatches = [
+        f"{column}: schema {duckdb_type}, table {table_types.get(column, 'missing')}"
+        for _, column, duckdb_type in schema
+        if table_types.get(column) != _normalise_type(duckdb_type)
+    ]
+    if mismatches:
+        raise ValueError(
+            f"Schema does not match table {table}: " + "; ".join(mismatches)
+        )
+
+
+# Build an Arrow table from JSON records: each field is collected into one column and
+# cast by Arrow in a single vectorised step, missing fields and empty strings in
+# non-text columns become nulls
+def records_to_arrow(records, schema):
+    columns = {}
+    for field, column, duckdb_type in schema:
+        target_type = ARROW_TYPES[_normalise_type(duckdb_type)]
+        values = pa.array([record.get(field) for record in records])
+        if pa.types.is_string(values.type) and not pa.types.is_string(target_type):
+            values = pc.if_else(
+                pc.equal(values, ""), pa.scalar(None, values.type), values
+            )
+        columns[column] = pc.cast(values, target_type)
+    return pa.table(columns)
+
+
+# Validate the schema against the DuckDB table and insert the records in one go,
+# returns the number of rows inserted
+def load_records(duckdb_conn, table, records, schema):
+    validate_schema(duckdb_conn, table, schema)
+    arrow_table = records_to_arrow(records, schema)
+    insert_arrow(duckdb_conn, table, arrow_table)
+    return arrow_table.num_rows
@@ -0,0 +1,111 @@
+import argparse
+from collections import Counter
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import AGE_GROUP_SQL, AGE_GROUPS, age_group
+
+CASES = [
+    "rows_if_chain",
+    "rows_label",
+    "rows_table",
+    "pandas_cut",
+    "numpy_searchsorted",
+    "numpy_table",
+    "duckdb_between",
+    "duckdb_generated",
+]
+
+
+# The per row if/elif chain the stdlib transform used before AGE_GROUPS
+def age_group_if_chain(age):
+    if age <= 30:
+        return "18-30"
+    if age <= 40:
+        return "31-40"
+    if age <= 50:
+        return "41-50"
+    if age <= 60:
+        return "51-60"
+    return "61-70"
+
+
+# pd.cut with an IntervalIndex like 3-data-transform-questions.py
+AGE_INTERVALS = pd.IntervalIndex.from_tuples(
+    [(17, 30), (30, 40), (40, 50), (50, 60), (60, 70)]
+)
+
+# The CASE WHEN ... BETWEEN of the original DuckDB transform
+BETWEEN_SQL = """CASE
+    WHEN Age BETWEEN 18 AND 30 THEN '18-30'
+    WHEN Age BETWEEN 31 AND 40 THEN '31-40'
+    WHEN Age BETWEEN 41 AND 50 THEN '41-50'
+    WHEN Age BETWEEN 51 AND 60 THEN '51-60'
+    ELSE '61-70'
+END"""
+
+
+# Ages 0-100 with 1% zeros, like ages after filling missing values
+def create_ages(num_rows):
+    ages = np.random.default_rng(0).integers(18, 101, num_rows, dtype=np.int32)
+    ages[::100] = 0
+    return ages
+
+
+# Count of rows per age group with each binning implementation
+def run_case(case, num_rows):
+    num_rows = int(num_rows)
+    ages = create_ages(num_rows)
+    if case.startswith("rows"):
+        ages = ages.tolist()
+    elif case.startswith("duckdb"):
+        conn = duckdb.connect()
+        conn.register("ages_df", pd.DataFrame({"Age": ages}))
+        conn.execute("CREATE TABLE ages AS SELECT * FROM ages_df")
+    elif case == "numpy_searchsorted":
+        ages = ages.astype(np.float64)
+
+    def bin_ages():
+        if case == "rows_if_chain":
+            counts = Counter(map(age_group_if_chain, ages))
+        elif case == "rows_label":
+            counts = Counter(map(age_group, ages))
+        elif case == "rows_table":
+            # Indexing the table inline like aggregate_purchases
+            counts = Counter(map(AGE_GROUPS.label_table.__getitem__, ages))
+        elif case == "pandas_cut":
+            counts = pd.cut(ages, bins=AGE_INTERVALS).value_counts()
+        elif case.startswith("numpy"):
+            counts = np.bincount(AGE_GROUPS.codes(ages))
+        else:
+            sql = BETWEEN_SQL if case == "duckdb_between" else AGE_GROUP_SQL
+            counts = conn.execute(
+                f"SELECT {sql} AS Age_Group, COUNT(*) FROM ages GROUP BY Age_Group"
+            ).fetchall()
+        assert len(counts)
+        return num_rows
+
+    report(bin_ages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        print_table(
+            [
+                {"case": case, **run_isolated(__spec__.name, case, args.rows)}
+                for case in args.cases
+            ]
+        )
+
+# Run this with the command python -m benchmarks.bench_age_groups --rows 10000000
@@ -0,0 +1,114 @@
+import argparse
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from api_functions import ApiExtractor
+from benchmarks.bench_utils import print_table
+
+
+# Local stub of a limit/offset paginated API that answers after latency seconds
+# and supports ETag revalidation
+def make_handler(records, latency):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            offset, limit = int(query["offset"]), int(query["limit"])
+            etag = f'"{offset}-{limit}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps({"data": records[offset : offset + limit]}).encode()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+# One requests.get per page without a session, the way the extract script fetches
+def fetch_without_session(url, page_size):
+    records = []
+    offset = 0
+    requests_made = 0
+    while True:
+        params = {"limit": page_size, "offset": offset}
+        page = requests.get(url, params=params, timeout=10).json()["data"]
+        requests_made += 1
+        records.extend(page)
+        if len(page) < page_size:
+            return records, requests_made
+        offset += page_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    records = [
+        {"exchangeId": f"exchange-{i}", "rank": str(i)} for i in range(args.records)
+    ]
+    handler = make_handler(records, args.latency_ms / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v2/exchanges"
+
+    results = []
+    start = time.perf_counter()
+    _, requests_made = fetch_without_session(url, args.page_size)
+    seconds = time.perf_counter() - start
+    results.append(
+        {
+            "case": "requests.get",
+            "requests": requests_made,
+            "seconds": round(seconds, 3),
+            "requests_per_sec": round(requests_made / seconds, 1),
+            "cache_hit_rate": 0.0,
+        }
+    )
+
+    for concurrency in args.concurrency:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for cache in ["cold", "warm"]:
+                with ApiExtractor(
+                    cache_dir=cache_dir, pool_size=concurrency
+                ) as extractor:
+                    start = time.perf_counter()
+                    extractor.fetch_pages(url, args.page_size, concurrency)
+                    seconds = time.perf_counter() - start
+                    results.append(
+                        {
+                            "case": f"extractor x{concurrency} {cache}",
+                            "requests": extractor.stats["requests"],
+                            "seconds": round(seconds, 3),
+                            "requests_per_sec": round(
+                                extractor.stats["requests"] / seconds, 1
+                            ),
+                            "cache_hit_rate": round(extractor.cache_hit_rate(), 3),
+                        }
+                    )
+    server.shutdown()
+    print_table(results)
+
+# Run this with the command python -m benchmarks.bench_api_extractor --records 20000
@@ -0,0 +1,108 @@
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from extract_load_functions import bulk_load_csv
+
+CASES = ["sqlite_per_row", "sqlite_bulk", "duckdb_bulk"]
+CITIES = [("sao paulo", "SP"), ("franca", "SP"), ("rio de janeiro", "RJ")]
+CUSTOMER_COLUMNS = """
+    customer_id INTEGER{primary_key},
+    zipcode TEXT,
+    city TEXT,
+    state_code TEXT,
+    datetime_created {timestamp},
+    datetime_updated {timestamp}
+"""
+
+
+# Write a customers.csv style file with num_rows synthetic customers
+def create_customers_csv(path, num_rows):
+    rng = random.Random(0)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            [
+                "customer_id",
+                "zipcode",
+                "city",
+                "state_code",
+                "datetime_created",
+                "datetime_updated",
+            ]
+        )
+        for i in range(num_rows):
+            city, state_code = rng.choice(CITIES)
+            writer.writerow(
+                [
+                    i,
+                    f"{rng.randrange(100000):05d}",
+                    city,
+                    state_code,
+                    "2017-10-18 00:00:00",
+                    "2017-10-18 00:00:00",
+                ]
+            )
+
+
+def run_case(case, csv_path):
+    if case.startswith("sqlite"):
+        conn = sqlite3.connect(csv_path + f".{case}.db")
+        columns = CUSTOMER_COLUMNS.format(primary_key=" PRIMARY KEY", timestamp="TEXT")
+    else:
+        # Same schema as the DuckDB Customer table in db/setup_db.py
+        conn = duckdb.connect(csv_path + f".{case}.duckdb")
+        columns = CUSTOMER_COLUMNS.format(primary_key="", timestamp="TIMESTAMP")
+    conn.execute(f"CREATE TABLE Customer ({columns})")
+
+    def load():
+        if case != "sqlite_per_row":
+            return bulk_load_csv(conn, "Customer", csv_path)
+        # The original insert_data_from_csv: one execute per row
+        num_rows = 0
+        with open(csv_path, "r") as file:
+            for row in csv.DictReader(file):
+                conn.execute(
+                    "INSERT INTO Customer VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        row["customer_id"],
+                        row["zipcode"],
+                        row["city"],
+                        row["state_code"],
+                        row["datetime_created"],
+                        row["datetime_updated"],
+                    ),
+                )
+                num_rows += 1
+        conn.commit()
+        return num_rows
+
+    report(load)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "CSV_PATH"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "customers.csv")
+            create_customers_csv(csv_path, args.rows)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_bulk_load_csv --rows 10000000
@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_load_gzip_csv import create_weather_file
+from benchmarks.bench_utils import print_table, report, run_isolated
+from cache_functions import ColumnarCache, file_version, load_parquet
+from s3_functions import load_gzip_csv, open_gzip_csv
+
+CASES = ["no_cache", "cold_cache", "warm_cache"]
+
+
+def run_case(case, path):
+    duckdb_conn = duckdb.connect(f"{path}.{case}.duckdb")
+    duckdb_conn.execute("SET memory_limit = '256MB'")
+    duckdb_conn.execute(
+        """
+        CREATE TABLE WeatherData (
+            id TEXT,
+            date TEXT,
+            element TEXT,
+            value INTEGER,
+            m_flag TEXT,
+            q_flag TEXT,
+            s_flag TEXT,
+            obs_time TEXT
+        )
+        """
+    )
+    cache = ColumnarCache(f"{path}.{case}.cache")
+    source_uri = "file://" + path
+
+    def extract():
+        with open(path, "rb") as file:
+            return cache.put(source_uri, file_version(path), open_gzip_csv(file))
+
+    if case == "warm_cache":
+        # A previous run already parsed the file into the cache
+        extract()
+
+    def load():
+        if case == "no_cache":
+            with open(path, "rb") as file:
+                return load_gzip_csv(file, duckdb_conn, "WeatherData")
+        parquet_path = cache.get(source_uri, file_version(path)) or extract()
+        return load_parquet(duckdb_conn, "WeatherData", parquet_path)
+
+    report(load)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=1024)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "PATH"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "weather.csv.gz")
+            create_weather_file(path, args.megabytes)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, path)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_columnar_cache --megabytes 1024
@@ -0,0 +1,137 @@
+import argparse
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+import duckdb
+import requests
+from bs4 import BeautifulSoup
+
+from benchmarks.bench_utils import print_table
+from crawl_functions import crawl, extract_links
+
+
+# Page of a synthetic site: paragraphs of text around links_per_page links to other pages
+def make_page(page, num_pages, links_per_page):
+    rng = random.Random(page)
+    paragraphs = "".join(
+        f"<p class='text'>Paragraph {i} of page {page} <b>with</b> <i>markup</i></p>"
+        for i in range(200)
+    )
+    links = "".join(
+        f"<li><a href='/page/{rng.randrange(num_pages)}'>link</a></li>"
+        for _ in range(links_per_page)
+    )
+    return f"<html><body>{paragraphs}<ul>{links}</ul>{paragraphs}</body></html>"
+
+
+# Local site that answers every page after latency seconds
+def make_handler(num_pages, links_per_page, latency):
+    class SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path == "/robots.txt":
+                body, content_type = b"User-agent: *\nDisallow:\n", "text/plain"
+            else:
+                page = int(self.path.rsplit("/", 1)[-1] or 0)
+                body = make_page(page, num_pages, links_per_page).encode()
+                content_type = "text/html"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+# Breadth-first crawl with one requests.get and a full html.parser soup per page,
+# the way the scraping example fetches a page
+def crawl_sequentially(start_url, max_pages):
+    seen = {start_url}
+    frontier = deque([start_url])
+    pages = 0
+    while frontier and pages < max_pages:
+        url = frontier.popleft()
+        soup = BeautifulSoup(requests.get(url, timeout=10).text, "html.parser")
+        pages += 1
+        for link in soup.find_all("a"):
+            target = urljoin(url, link.get("href"))
+            if target not in seen:
+                seen.add(target)
+                frontier.append(target)
+    return pages
+
+
+def time_case(case, run):
+    start = time.perf_counter()
+    pages = run()
+    seconds = time.perf_counter() - start
+    return {
+        "case": case,
+        "pages": pages,
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--links-per-page", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    handler = make_handler(args.pages, args.links_per_page, args.latency_ms / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f"http://127.0.0.1:{server.server_port}/page/0"
+
+    # Parsing alone, without the network
+    html = make_page(0, args.pages, args.links_per_page)
+    results = [
+        time_case(
+            "parse html.parser",
+            lambda: sum(
+                bool(BeautifulSoup(html, "html.parser").find_all("a"))
+                for _ in range(200)
+            ),
+        ),
+        time_case(
+            "parse lxml <a> only",
+            lambda: sum(bool(extract_links(html, start_url)) for _ in range(200)),
+        ),
+        time_case(
+            "requests.get",
+            lambda: crawl_sequentially(start_url, args.pages),
+        ),
+    ]
+    for concurrency in args.concurrency:
+        conn = duckdb.connect()
+        results.append(
+            time_case(
+                f"crawl x{concurrency}",
+                lambda: crawl(
+                    [start_url],
+                    conn,
+                    max_pages=args.pages,
+                    max_depth=args.pages,
+                    concurrency=concurrency,
+                    per_host=concurrency,
+                )["pages"],
+            )
+        )
+    server.shutdown()
+    print_table(results)
+
+# Run this with the command python -m benchmarks.bench_crawl --pages 500
@@ -0,0 +1,167 @@
+import argparse
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import ValueDictionary, dictionary_encode
+
+CASES = [
+    "python_str",
+    "python_codes",
+    "pandas_object",
+    "pandas_category",
+    "arrow_string",
+    "arrow_dictionary",
+    "polars_string",
+    "polars_categorical",
+]
+NUM_CITIES = 4000
+STATE_CODES = [f"S{i:02d}" for i in range(27)]
+COLUMNS = ["city", "state_code"]
+ENCODED_CASES = {
+    "python_codes",
+    "pandas_category",
+    "arrow_dictionary",
+    "polars_categorical",
+}
+
+
+# City of every customer, drawn from NUM_CITIES cities
+def create_city_ids(num_rows):
+    return np.random.default_rng(0).integers(0, NUM_CITIES, num_rows)
+
+
+# city and state_code columns of a Customer table as lists of one str per row, like
+# values read from CSV or SQLite, with NUM_CITIES cities spread over 27 states
+def create_customer_columns(num_rows):
+    city_ids = create_city_ids(num_rows)
+    cities = [f"cidade {i}" for i in range(NUM_CITIES)]
+    states = [STATE_CODES[i % len(STATE_CODES)] for i in range(NUM_CITIES)]
+    return {
+        "city": [(cities[i] + " ")[:-1] for i in city_ids.tolist()],
+        "state_code": [(states[i] + " ")[:-1] for i in city_ids.tolist()],
+    }
+
+
+def states_table():
+    return {
+        "state_code": STATE_CODES,
+        "state_name": [f"estado {code}" for code in STATE_CODES],
+    }
+
+
+def python_column_bytes(column):
+    if isinstance(column, list):
+        return sys.getsizeof(column) + sum(map(sys.getsizeof, column))
+    codes, dictionary = column
+    return codes.itemsize * len(codes) + sum(map(sys.getsizeof, dictionary.values))
+
+
+# Build the columns for a case, returns them and the seconds spent encoding
+def build(case, num_rows):
+    columns = create_customer_columns(num_rows)
+    library = case.split("_")[0]
+    if library == "python":
+        start = time.perf_counter()
+        if case in ENCODED_CASES:
+            dictionaries = {name: ValueDictionary() for name in COLUMNS}
+            columns = {
+                name: (dictionaries[name].encode(columns[name]), dictionaries[name])
+                for name in COLUMNS
+            }
+        data = columns
+    else:
+        data = {
+            "pandas": pd.DataFrame,
+            "arrow": pa.table,
+            "polars": pl.DataFrame,
+        }[
+            library
+        ](columns)
+        del columns
+        start = time.perf_counter()
+        if case in ENCODED_CASES:
+            data = dictionary_encode(data, COLUMNS)
+    return data, time.perf_counter() - start
+
+
+# Customers per (state_code, city) and each customer's state name from a join
+# num_cities is the number of distinct cities in data, small runs do not draw them all
+def group_and_join(case, data, num_rows, num_cities):
+    states = states_table()
+    if case == "python_str":
+        counts = Counter(zip(data["state_code"], data["city"]))
+        names = dict(zip(states["state_code"], states["state_name"]))
+        joined = list(map(names.__getitem__, data["state_code"]))
+    elif case == "python_codes":
+        counts = Counter(zip(data["state_code"][0], data["city"][0]))
+        codes, dictionary = data["state_code"]
+        names = dict(zip(states["state_code"], states["state_name"]))
+        names = [names[value] for value in dictionary.values]
+        joined = list(map(names.__getitem__, codes))
+    elif case.startswith("pandas"):
+        counts = data.groupby(COLUMNS, observed=True).size()
+        joined = data.merge(pd.DataFrame(states), on="state_code")
+    elif case.startswith("arrow"):
+        counts = data.group_by(COLUMNS).aggregate([([], "count_all")])
+        joined = data.join(pa.table(states), "state_code")
+    else:
+        states = pl.DataFrame(states).with_columns(
+            pl.col("state_code").cast(data.schema["state_code"])
+        )
+        counts = data.group_by(COLUMNS).len()
+        joined = data.join(states, on="state_code")
+    assert len(counts) == num_cities and len(joined) == num_rows
+
+
+def column_bytes(case, data):
+    if case.startswith("python"):
+        return sum(python_column_bytes(data[name]) for name in COLUMNS)
+    if case.startswith("pandas"):
+        return int(data[COLUMNS].memory_usage(deep=True, index=False).sum())
+    if case.startswith("arrow"):
+        return data.select(COLUMNS).nbytes
+    return data.select(COLUMNS).estimated_size()
+
+
+def run_case(case, num_rows):
+    num_rows = int(num_rows)
+    num_cities = len(np.unique(create_city_ids(num_rows)))
+    with pl.StringCache():
+        data, encode_seconds = build(case, num_rows)
+
+        def group_by_and_join():
+            group_and_join(case, data, num_rows, num_cities)
+            return {
+                "rows": num_rows,
+                "columns_mb": round(column_bytes(case, data) / 1024**2, 1),
+                "encode_s": round(encode_seconds, 3),
+            }
+
+        report(group_by_and_join)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        print_table(
+            [
+                {"case": case, **run_isolated(__spec__.name, case, args.rows)}
+                for case in args.cases
+            ]
+        )
+
+# Run this with the command python -m benchmarks.bench_dictionary_encoding --rows 10000000
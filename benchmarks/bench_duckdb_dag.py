@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_utils import print_table, report, run_isolated, written_bytes
+from transform_functions import purchases_dag
+
+CASES = ["tables", "dag", "views"]
+OUTPUTS = ["total_purchase_by_gender", "average_purchase_by_age_group"]
+
+
+# SampleData style table of num_rows rows with 1% exact duplicates and 1% missing ages
+def create_sample_table(conn, num_rows):
+    conn.execute(
+        """
+        CREATE TABLE data AS
+        SELECT
+            i % (? * 99 // 100) AS Customer_ID,
+            ['Emma Rodriguez', 'Ivy Martinez', 'Liam Smith', 'Noah Lee'][1 + i % 4]
+                AS Customer_Name,
+            CASE WHEN i % 97 = 0 THEN NULL ELSE 18 + hash(i % (? * 99 // 100)) % 53 END
+                AS Age,
+            CASE WHEN hash(i % (? * 99 // 100)) % 2 = 0 THEN 'Female' ELSE 'Male' END
+                AS Gender,
+            CAST((hash(i % (? * 99 // 100)) % 110000) / 100 AS FLOAT) AS Purchase_Amount,
+            DATE '2024-09-23' AS Purchase_Date
+        FROM range(?) t(i)
+        """,
+        [num_rows, num_rows, num_rows, num_rows, num_rows],
+    )
+    conn.execute("CHECKPOINT")
+
+
+def run_case(case, db_path, num_rows):
+    conn = duckdb.connect(db_path)
+    conn.execute("SET memory_limit = '2GB'")
+    create_sample_table(conn, int(num_rows))
+    dag = purchases_dag("data")
+
+    def transform():
+        size_before = os.path.getsize(db_path)
+        written_before = written_bytes()
+        if case == "tables":
+            # One table per step like the original DuckDB section
+            for name in dag.steps:
+                conn.execute(f"CREATE TABLE {name} AS {dag.steps[name]}")
+            results = [
+                conn.execute(f"SELECT * FROM {name}").fetchall() for name in OUTPUTS
+            ]
+        elif case == "dag":
+            results = [dag.fetchall(conn, name) for name in OUTPUTS]
+        else:
+            dag.create_views(conn)
+            results = [
+                conn.execute(f"SELECT * FROM {name}").fetchall() for name in OUTPUTS
+            ]
+        conn.execute("CHECKPOINT")
+        assert all(results)
+        return {
+            "rows": int(num_rows),
+            "written_mb": round((written_bytes() - written_before) / 1024**2, 1),
+            "db_growth_mb": round(
+                (os.path.getsize(db_path) - size_before) / 1024**2, 1
+            ),
+        }
+
+    report(transform)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=3, metavar=("CASE", "DB_PATH", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = [
+                {
+                    "case": case,
+                    **run_isolated(
+                        __spec__.name,
+                        case,
+                        os.path.join(tmp_dir, f"{case}.duckdb"),
+                        args.rows,
+                    ),
+                }
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_duckdb_dag --rows 100000000
@@ -0,0 +1,116 @@
+import argparse
+import os
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import PurchaseAggregates, purchases_dag
+
+CASES = ["recompute", "incremental"]
+OUTPUTS = ["total_purchase_by_gender", "average_purchase_by_age_group"]
+
+
+# SampleData style table with one row per Customer_ID and 1% missing ages
+def create_keyed_table(conn, num_rows):
+    conn.execute(
+        """
+        CREATE TABLE data AS
+        SELECT
+            CAST(i AS INTEGER) AS Customer_ID,
+            ['Emma Rodriguez', 'Ivy Martinez', 'Liam Smith', 'Noah Lee'][1 + i % 4]
+                AS Customer_Name,
+            CASE WHEN i % 97 = 0 THEN NULL ELSE CAST(18 + hash(i) % 53 AS INTEGER) END
+                AS Age,
+            CASE WHEN hash(i) % 2 = 0 THEN 'Female' ELSE 'Male' END AS Gender,
+            CAST((hash(i) % 110000) / 100 AS FLOAT) AS Purchase_Amount,
+            DATE '2024-09-23' AS Purchase_Date
+        FROM range(?) t(i)
+        """,
+        [num_rows],
+    )
+    conn.execute("CHECKPOINT")
+
+
+# Batch of changed rows as Arrow: half replace existing customers, half are new
+def change_batch(conn, num_rows, batch, batch_rows):
+    return conn.execute(
+        """
+        SELECT
+            CAST(CASE WHEN i % 2 = 0 THEN hash(i) % ? ELSE ? + i END AS INTEGER)
+                AS Customer_ID,
+            'Changed Customer' AS Customer_Name,
+            CAST(18 + hash(i + 1) % 53 AS INTEGER) AS Age,
+            CASE WHEN i % 3 = 0 THEN 'Female' ELSE 'Male' END AS Gender,
+            CAST((hash(i + 2) % 110000) / 100 AS FLOAT) AS Purchase_Amount,
+            DATE '2024-09-24' AS Purchase_Date
+        FROM range(?, ?) t(i)
+        """,
+        [num_rows, num_rows, batch * batch_rows, (batch + 1) * batch_rows],
+    ).arrow()
+
+
+def run_case(case, db_path, num_rows, batches, batch_rows):
+    num_rows, batches, batch_rows = int(num_rows), int(batches), int(batch_rows)
+    conn = duckdb.connect(db_path)
+    conn.execute("SET memory_limit = '2GB'")
+    create_keyed_table(conn, num_rows)
+    dag = purchases_dag("data")
+    aggregates = PurchaseAggregates(conn)
+    if case == "incremental":
+        aggregates.rebuild()
+    changes = [change_batch(conn, num_rows, i, batch_rows) for i in range(batches)]
+
+    def refresh():
+        for change in changes:
+            if case == "incremental":
+                aggregates.upsert(change)
+                results = aggregates.results()
+            else:
+                # Apply the same change with plain DML, then recompute both outputs
+                conn.register("change", change)
+                conn.execute(
+                    "DELETE FROM data WHERE Customer_ID IN "
+                    "(SELECT Customer_ID FROM change)"
+                )
+                conn.execute("INSERT INTO data SELECT * FROM change")
+                conn.unregister("change")
+                results = [dag.fetchall(conn, name) for name in OUTPUTS]
+            assert all(results)
+        return {"rows": batches * batch_rows, "table_rows": num_rows}
+
+    report(refresh)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument(
+        "--case", nargs=5, metavar=("CASE", "DB_PATH", "ROWS", "BATCHES", "BATCH_ROWS")
+    )
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = [
+                {
+                    "case": case,
+                    **run_isolated(
+                        __spec__.name,
+                        case,
+                        os.path.join(tmp_dir, f"{case}.duckdb"),
+                        args.rows,
+                        args.batches,
+                        args.batch_rows,
+                    ),
+                }
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_incremental_aggregates --rows 10000000
@@ -0,0 +1,88 @@
+import argparse
+import gzip
+import time
+
+import duckdb
+from moto import mock_aws
+
+from benchmarks.bench_utils import print_table
+from s3_functions import ingest_s3_prefix, make_s3_client
+
+BUCKET = "noaa-ghcn-pds"
+PREFIX = "csv.gz/by_station/"
+
+
+# Upload num_objects synthetic station files to the local S3 stand-in
+def create_stations(s3_client, num_objects, rows_per_object):
+    s3_client.create_bucket(Bucket=BUCKET)
+    for i in range(num_objects):
+        body = "".join(
+            f"STATION{i:05d},{19000101 + day},PRCP,{day % 500},,,a,0700\n"
+            for day in range(rows_per_object)
+        )
+        s3_client.put_object(
+            Bucket=BUCKET,
+            Key=f"{PREFIX}STATION{i:05d}.csv.gz",
+            Body=gzip.compress(body.encode()),
+        )
+
+
+def run_case(s3_client, concurrency):
+    duckdb_conn = duckdb.connect()
+    duckdb_conn.execute(
+        """
+        CREATE TABLE WeatherData (
+            id TEXT,
+            date TEXT,
+            element TEXT,
+            value INTEGER,
+            m_flag TEXT,
+            q_flag TEXT,
+            s_flag TEXT,
+            obs_time TEXT
+        )
+        """
+    )
+    stats = ingest_s3_prefix(
+        s3_client, BUCKET, PREFIX, duckdb_conn, "WeatherData", concurrency=concurrency
+    )
+    duckdb_conn.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=1000)
+    parser.add_argument("--rows-per-object", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    # moto's in-process S3 stands in for S3, a before-call hook adds latency to
+    # every GetObject to emulate the network round trip
+    with mock_aws():
+        s3_client = make_s3_client(
+            max_pool_connections=max(args.concurrency), region_name="us-east-1"
+        )
+        create_stations(s3_client, args.objects, args.rows_per_object)
+        s3_client.meta.events.register(
+            "before-call.s3.GetObject",
+            lambda **kwargs: time.sleep(args.latency_ms / 1000),
+        )
+
+        results = []
+        for concurrency in args.concurrency:
+            stats = run_case(s3_client, concurrency)
+            results.append(
+                {
+                    "concurrency": concurrency,
+                    "objects": stats["objects"],
+                    "rows": stats["rows"],
+                    "seconds": stats["seconds"],
+                    "objects_per_sec": stats["objects_per_sec"],
+                    "retries": stats["retries"],
+                }
+            )
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_ingest_s3_prefix --objects 1000
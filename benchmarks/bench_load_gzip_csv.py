@@ -0,0 +1,80 @@
+import argparse
+import csv
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+import duckdb
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from extract_load_functions import insert_rows
+from s3_functions import WEATHER_COLUMNS, load_gzip_csv
+
+CASES = ["read_decompress_list", "streaming"]
+
+
+# Write a synthetic GHCN style csv.gz file of about megabytes of uncompressed CSV
+def create_weather_file(path, megabytes):
+    block = "".join(
+        f"ASN{i % 1000:08d},{19000101 + i % 36500},PRCP,{i % 500},,,a,0700\n"
+        for i in range(100_000)
+    ).encode()
+    with gzip.open(path, "wb", compresslevel=1) as file:
+        for _ in range(max(1, megabytes * 1024 * 1024 // len(block))):
+            file.write(block)
+
+
+def run_case(case, path):
+    # A file backed database with a small buffer pool so the loaded rows do not
+    # count towards peak RSS
+    duckdb_conn = duckdb.connect(f"{path}.{case}.duckdb")
+    duckdb_conn.execute("SET memory_limit = '256MB'")
+    duckdb_conn.execute(
+        """
+        CREATE TABLE WeatherData (
+            id TEXT,
+            date TEXT,
+            element TEXT,
+            value INTEGER,
+            m_flag TEXT,
+            q_flag TEXT,
+            s_flag TEXT,
+            obs_time TEXT
+        )
+        """
+    )
+
+    def load():
+        with open(path, "rb") as file:
+            if case == "streaming":
+                return load_gzip_csv(file, duckdb_conn, "WeatherData")
+            # The original approach: four full in-memory copies of the file
+            csv_data = gzip.decompress(file.read()).decode("utf-8")
+            data = list(csv.reader(StringIO(csv_data)))
+            insert_rows(duckdb_conn, "WeatherData", list(WEATHER_COLUMNS), data)
+            return len(data)
+
+    report(load)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=2048)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "PATH"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "weather.csv.gz")
+            create_weather_file(path, args.megabytes)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, path)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_load_gzip_csv --megabytes 2048
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_transfer_table import create_sqlite_customers
+from benchmarks.bench_utils import print_table
+from extract_load_functions import parallel_extract
+
+
+def run_case(sqlite_db, num_slices):
+    sqlite_conn = sqlite3.connect(sqlite_db)
+    duckdb_conn = duckdb.connect()
+    duckdb_conn.execute(
+        """
+        CREATE TABLE Customer (
+            customer_id INTEGER,
+            zipcode TEXT,
+            city TEXT,
+            state_code TEXT,
+            datetime_created TIMESTAMP,
+            datetime_updated TIMESTAMP
+        )
+        """
+    )
+    stats = parallel_extract(
+        sqlite_conn, duckdb_conn, "Customer", num_slices=num_slices
+    )
+    sqlite_conn.close()
+    duckdb_conn.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--slices", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_db = os.path.join(tmp_dir, "tpch.db")
+        create_sqlite_customers(sqlite_db, args.rows)
+
+        results = []
+        for num_slices in args.slices:
+            stats = run_case(sqlite_db, num_slices)
+            results.append(
+                {
+                    "slices": num_slices,
+                    "rows": stats["rows"],
+                    "seconds": stats["seconds"],
+                    "rows_per_sec": stats["rows_per_sec"],
+                    "speedup": (
+                        round(results[0]["seconds"] / stats["seconds"], 2)
+                        if results
+                        else 1.0
+                    ),
+                }
+            )
+        print_table(results)
+        print("Per-slice throughput with", num_slices, "slices:")
+        print_table(stats["slices"])
+
+# Run this with the command python -m benchmarks.bench_parallel_extract --rows 5000000
@@ -0,0 +1,57 @@
+import argparse
+import csv
+import os
+import tempfile
+
+import pyarrow as pa
+
+from benchmarks.bench_bulk_load_csv import create_customers_csv
+from benchmarks.bench_utils import print_table, report, run_isolated
+from csv_functions import read_csv_columns_mmap
+
+CASES = ["csv_reader", "mmap_strings", "mmap_typed"]
+COLUMNS = ["customer_id", "datetime_updated"]
+COLUMN_TYPES = {"customer_id": pa.int64(), "datetime_updated": pa.timestamp("us")}
+
+
+def run_case(case, csv_path):
+    def read():
+        if case == "csv_reader":
+            # One str per field of every line, then keep the two columns needed
+            # for incremental loads
+            num_rows = 0
+            with open(csv_path, newline="") as file:
+                reader = csv.reader(file)
+                header = next(reader)
+                indexes = [header.index(column) for column in COLUMNS]
+                for row in reader:
+                    customer_id, datetime_updated = (row[i] for i in indexes)
+                    num_rows += 1
+            return num_rows
+        column_types = COLUMN_TYPES if case == "mmap_typed" else None
+        batches = read_csv_columns_mmap(csv_path, COLUMNS, column_types)
+        return sum(batch.num_rows for batch in batches)
+
+    report(read)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "CSV_PATH"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "customers.csv")
+            create_customers_csv(csv_path, args.rows)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_read_csv_columns_mmap --rows 10000000
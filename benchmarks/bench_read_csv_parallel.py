@@ -0,0 +1,57 @@
+import argparse
+import csv
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from benchmarks.bench_bulk_load_csv import create_customers_csv
+from benchmarks.bench_utils import print_table, report, run_isolated
+from csv_functions import read_csv_parallel
+
+CASES = ["dict_reader", "pyarrow_read_csv", "parallel_1", "parallel_2", "parallel_4"]
+COLUMN_TYPES = {"zipcode": pa.string()}
+
+
+def run_case(case, csv_path):
+    def read():
+        if case == "dict_reader":
+            # The csv.DictReader loop used by the transform and setup scripts
+            with open(csv_path, "r") as file:
+                return sum(1 for _ in csv.DictReader(file))
+        if case == "pyarrow_read_csv":
+            convert_options = pv.ConvertOptions(column_types=COLUMN_TYPES)
+            return pv.read_csv(csv_path, convert_options=convert_options).num_rows
+        workers = int(case.split("_")[1])
+        batches = read_csv_parallel(
+            csv_path,
+            workers=workers,
+            chunk_size=16 * 1024 * 1024,
+            column_types=COLUMN_TYPES,
+        )
+        return sum(batch.num_rows for batch in batches)
+
+    report(read)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "CSV_PATH"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "customers.csv")
+            create_customers_csv(csv_path, args.rows)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_read_csv_parallel --rows 10000000
@@ -0,0 +1,58 @@
+import argparse
+import random
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from cleaning_functions import iter_unique
+
+CASES = ["list_and_set", "iter_unique", "iter_unique_spill"]
+
+
+# The original list based implementation, kept here as the baseline
+def list_and_set(data, unique_key):
+    data_unique = []
+    unique_key_set = set()
+    for row in data:
+        if row[unique_key] not in unique_key_set:
+            data_unique.append(row)
+            unique_key_set.add(row[unique_key])
+    return data_unique
+
+
+# Synthetic customer rows where roughly half of the rows are duplicates
+def synthetic_rows(num_rows):
+    rng = random.Random(0)
+    for i in range(num_rows):
+        yield {"Customer_ID": rng.randrange(num_rows // 2), "Row": i}
+
+
+def run_case(case, num_rows):
+    if case == "list_and_set":
+        list_and_set(list(synthetic_rows(num_rows)), "Customer_ID")
+        return num_rows
+    max_keys = 100_000 if case == "iter_unique_spill" else None
+    unique_rows = iter_unique(
+        synthetic_rows(num_rows), "Customer_ID", max_keys=max_keys
+    )
+    for _ in unique_rows:
+        pass
+    return num_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10**6, 10**7, 10**8])
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        case, num_rows = args.case
+        report(lambda: run_case(case, int(num_rows)))
+    else:
+        results = []
+        for num_rows in args.rows:
+            for case in CASES:
+                result = run_isolated(__spec__.name, case, num_rows)
+                results.append({"case": case, "input_rows": num_rows, **result})
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_remove_duplicates --rows 1000000
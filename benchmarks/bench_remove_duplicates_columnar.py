@@ -0,0 +1,77 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from cleaning_functions import remove_duplicates
+
+CASES = ["dict_loop", "pandas", "polars", "pyarrow", "numpy"]
+
+
+# Synthetic sample data where roughly half of the rows are duplicate customers
+def synthetic_frame(num_rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "Customer_ID": rng.integers(0, max(1, num_rows // 2), num_rows),
+            "Age": rng.integers(18, 71, num_rows),
+            "Purchase_Amount": rng.uniform(10, 1000, num_rows).round(2),
+        }
+    )
+
+
+# Convert the input outside of the timed section, only the dedup itself is measured
+def run_case(case, num_rows):
+    df = synthetic_frame(num_rows)
+    if case == "dict_loop":
+        data = df.to_dict("records")
+    elif case == "pandas":
+        data = df
+    elif case == "polars":
+        data = pl.from_pandas(df)
+    elif case == "pyarrow":
+        data = pa.Table.from_pandas(df, preserve_index=False)
+    else:
+        data = df.to_records(index=False)
+    del df
+
+    def dedup():
+        remove_duplicates(data, "Customer_ID")
+        return num_rows
+
+    report(dedup)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10**5, 10**6, 10**7, 10**8]
+    )
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        case, num_rows = args.case
+        run_case(case, int(num_rows))
+    else:
+        results = []
+        for num_rows in args.rows:
+            cases = {
+                case: run_isolated(__spec__.name, case, num_rows) for case in CASES
+            }
+            for case, result in cases.items():
+                speedup = cases["dict_loop"]["seconds"] / max(result["seconds"], 0.001)
+                results.append(
+                    {
+                        "case": case,
+                        "input_rows": num_rows,
+                        **result,
+                        "speedup": round(speedup, 1),
+                    }
+                )
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_remove_duplicates_columnar --rows 100000 1000000
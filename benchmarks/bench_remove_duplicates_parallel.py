@@ -0,0 +1,57 @@
+import argparse
+import os
+import random
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from cleaning_functions import iter_unique, iter_unique_parallel
+
+
+# Synthetic customer rows where roughly half of the rows are duplicates
+def synthetic_rows(num_rows):
+    rng = random.Random(0)
+    return [
+        {"Customer_ID": rng.randrange(num_rows // 2), "Row": i} for i in range(num_rows)
+    ]
+
+
+# workers=0 runs the single core iter_unique as the baseline
+def run_case(workers, num_rows):
+    data = synthetic_rows(num_rows)
+
+    def dedup():
+        if workers == 0:
+            unique_rows = iter_unique(data, "Customer_ID")
+        else:
+            unique_rows = iter_unique_parallel(data, "Customer_ID", workers=workers)
+        for _ in unique_rows:
+            pass
+        return num_rows
+
+    report(dedup)
+
+
+if __name__ == "__main__":
+    cpu_count = os.cpu_count()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10**7)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, 8, 16, 32, 64, cpu_count} & set(range(cpu_count + 1))),
+    )
+    parser.add_argument("--case", nargs=2, type=int, metavar=("WORKERS", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        baseline = run_isolated(__spec__.name, 0, args.rows)
+        results = [{"workers": "serial", **baseline, "speedup": 1.0}]
+        for workers in args.workers:
+            result = run_isolated(__spec__.name, workers, args.rows)
+            speedup = round(baseline["seconds"] / max(result["seconds"], 0.001), 2)
+            results.append({"workers": workers, **result, "speedup": speedup})
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_remove_duplicates_parallel --rows 10000000
@@ -0,0 +1,107 @@
+import argparse
+import os
+import tempfile
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import (
+    load_csv_split_name,
+    split_name,
+    split_name_sql,
+    split_names_arrow,
+)
+
+CASES = [
+    "stdlib_split_name",
+    "pandas_split_expand",
+    "arrow_split_pattern",
+    "duckdb_split_sql",
+    "duckdb_load",
+    "duckdb_load_split",
+]
+# Two word names with some single word and three word names
+NAMES = [
+    "Emma Rodriguez",
+    "Ivy Martinez",
+    "Liam Smith",
+    "Noah Lee",
+    "Cher",
+    "Mary Ann Smith",
+    "Olivia Brown",
+    "Lucas Silva",
+]
+
+
+def create_names(num_rows):
+    indexes = np.random.default_rng(0).integers(0, len(NAMES), num_rows)
+    return pa.array(NAMES).take(pa.array(indexes))
+
+
+def run_case(case, csv_path, num_rows):
+    num_rows = int(num_rows)
+    if case.startswith("duckdb_load"):
+        conn = duckdb.connect()
+        name_columns = "First_Name VARCHAR, Last_Name VARCHAR"
+        if case == "duckdb_load":
+            name_columns = "Customer_Name VARCHAR"
+        conn.execute(f"CREATE TABLE data (Customer_ID BIGINT, {name_columns})")
+    else:
+        names = create_names(num_rows)
+        if case == "stdlib_split_name":
+            names = [{"Customer_Name": name} for name in names.to_pylist()]
+        elif case == "pandas_split_expand":
+            names = names.to_pandas()
+        elif case == "duckdb_split_sql":
+            conn = duckdb.connect()
+            conn.register("names_table", pa.table({"Customer_Name": names}))
+            conn.execute("CREATE TABLE names AS SELECT * FROM names_table")
+
+    def split():
+        if case == "stdlib_split_name":
+            for row in split_name(names):
+                pass
+        elif case == "pandas_split_expand":
+            parts = names.str.split(" ", n=1, expand=True)
+            parts[1] = parts[1].fillna("")
+        elif case == "arrow_split_pattern":
+            split_names_arrow(names)
+        elif case == "duckdb_split_sql":
+            conn.execute(f"CREATE TABLE split AS SELECT {split_name_sql()} FROM names")
+        elif case == "duckdb_load":
+            conn.execute("INSERT INTO data SELECT * FROM read_csv(?)", [csv_path])
+        else:
+            load_csv_split_name(conn, "data", csv_path)
+        return num_rows
+
+    report(split)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=3, metavar=("CASE", "CSV_PATH", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "names.csv")
+            names = create_names(args.rows)
+            pv.write_csv(
+                pa.table({"Customer_ID": np.arange(args.rows), "Customer_Name": names}),
+                csv_path,
+            )
+            del names
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path, args.rows)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_split_name --rows 10000000
@@ -0,0 +1,74 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import to_records
+
+CASES = [
+    "iterrows",
+    "pandas_dicts",
+    "pandas_tuples",
+    "pandas_view",
+    "arrow_dicts",
+    "arrow_view",
+]
+
+
+# sample_data.csv style DataFrame with num_rows rows
+def create_sample_df(num_rows):
+    rng = np.random.default_rng(0)
+    names = np.array(["Emma Rodriguez", "Ivy Martinez", "Liam Smith", "Noah Lee"])
+    return pd.DataFrame(
+        {
+            "Customer_ID": np.arange(num_rows),
+            "Customer_Name": names[rng.integers(0, len(names), num_rows)],
+            "Age": rng.integers(18, 71, num_rows),
+            "Gender": np.where(rng.random(num_rows) < 0.5, "Female", "Male"),
+            "Purchase_Amount": rng.uniform(5, 1000, num_rows).round(2),
+            "Purchase_Date": "2024-09-23",
+        }
+    )
+
+
+def run_case(case, num_rows):
+    df = create_sample_df(int(num_rows))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Build the records and read one field of every row, like the transform steps do
+    def convert():
+        if case == "iterrows":
+            records = [row.to_dict() for _, row in df.iterrows()]
+        elif case.startswith("pandas"):
+            records = to_records(df, case.split("_")[1])
+        else:
+            records = to_records(table, case.split("_")[1])
+        if case == "pandas_tuples":
+            total = sum(record[4] for record in records)
+        else:
+            total = sum(record["Purchase_Amount"] for record in records)
+        assert total > 0
+        return len(records)
+
+    report(convert)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        results = [
+            {"case": case, **run_isolated(__spec__.name, case, args.rows)}
+            for case in args.cases
+        ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_to_records --rows 1000000
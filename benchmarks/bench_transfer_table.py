@@ -0,0 +1,103 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+import duckdb
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from extract_load_functions import load_sqlite_extension, transfer_table
+
+CASES = ["fetchall_executemany", "batched", "scanner"]
+CITIES = [("sao paulo", "SP"), ("franca", "SP"), ("rio de janeiro", "RJ")]
+
+
+# Build a SQLite Customer table with num_rows synthetic customers
+def create_sqlite_customers(path, num_rows):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE Customer (
+            customer_id INTEGER PRIMARY KEY,
+            zipcode TEXT,
+            city TEXT,
+            state_code TEXT,
+            datetime_created TEXT,
+            datetime_updated TEXT
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO Customer VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                i,
+                f"{rng.randrange(100000):05d}",
+                *rng.choice(CITIES),
+                "2017-10-18 00:00:00",
+                "2017-10-18 00:00:00",
+            )
+            for i in range(num_rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_case(case, sqlite_db):
+    sqlite_conn = sqlite3.connect(sqlite_db)
+    duckdb_conn = duckdb.connect()
+    duckdb_conn.execute(
+        """
+        CREATE TABLE Customer (
+            customer_id INTEGER,
+            zipcode TEXT,
+            city TEXT,
+            state_code TEXT,
+            datetime_created TIMESTAMP,
+            datetime_updated TIMESTAMP
+        )
+        """
+    )
+    if case == "scanner" and not load_sqlite_extension(duckdb_conn):
+        raise SystemExit("DuckDB sqlite extension is not available")
+
+    def transfer():
+        if case == "fetchall_executemany":
+            customers = sqlite_conn.execute("SELECT * FROM Customer").fetchall()
+            duckdb_conn.executemany(
+                "INSERT INTO Customer VALUES (?, ?, ?, ?, ?, ?)", customers
+            )
+            return len(customers)
+        return transfer_table(sqlite_conn, duckdb_conn, "Customer", strategy=case)
+
+    report(transfer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=2, metavar=("CASE", "SQLITE_DB"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sqlite_db = os.path.join(tmp_dir, "tpch.db")
+            create_sqlite_customers(sqlite_db, args.rows)
+            results = []
+            for case in args.cases:
+                try:
+                    results.append(
+                        {"case": case, **run_isolated(__spec__.name, case, sqlite_db)}
+                    )
+                except Exception as error:
+                    print(f"{case} failed: {error}")
+            print_table(results)
+
+# The fetchall + executemany baseline inserts row by row and is very slow on millions of rows
+# Run this with the command python -m benchmarks.bench_transfer_table --rows 5000000 --cases batched scanner
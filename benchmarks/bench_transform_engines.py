@@ -0,0 +1,121 @@
+import argparse
+import os
+import tempfile
+
+import duckdb
+import pandas as pd
+
+from benchmarks.bench_transform_pipeline import create_sample_csv
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import (
+    AGE_GROUP_SQL,
+    AGE_GROUPS,
+    GENDER_CODES,
+    GENDER_SQL,
+    read_rows,
+    transform_purchases,
+    transform_purchases_polars,
+)
+
+CASES = [
+    "stdlib_streaming",
+    "pandas",
+    "duckdb_tables",
+    "polars_lazy",
+    "polars_streaming",
+]
+
+
+# The transform with eager pandas steps, like 3-data-transform-questions.py
+def transform_pandas(path):
+    df = pd.read_csv(path)
+    df = df.drop_duplicates(subset="Customer_ID")
+    df = df.fillna({"Age": 0, "Purchase_Amount": 0.0})
+    df = df[(df["Age"] <= 100) & (df["Purchase_Amount"] <= 1000)]
+    # Categorical codes instead of Series.map, Female is 0 and Male 1
+    df = df.assign(Gender=GENDER_CODES.codes(df["Gender"]))
+    names = df["Customer_Name"].str.split(" ", n=1, expand=True)
+    df = df.assign(First_Name=names[0], Last_Name=names[1].fillna(""))
+    df = df.drop(columns="Customer_Name")
+    totals = df.groupby("Gender")["Purchase_Amount"].sum()
+    age_groups = AGE_GROUPS.categorical(df["Age"].to_numpy())
+    averages = df.groupby(age_groups, observed=True)["Purchase_Amount"].mean()
+    return totals.to_dict(), averages.to_dict()
+
+
+# The DuckDB section of 3-data-transform-solutions.py: one table per step
+def transform_duckdb_tables(path):
+    con = duckdb.connect()
+    con.execute(
+        "CREATE TABLE data (Customer_ID INTEGER, Customer_Name VARCHAR, Age INTEGER, "
+        "Gender VARCHAR, Purchase_Amount FLOAT, Purchase_Date DATE)"
+    )
+    con.execute(f"COPY data FROM '{path}' WITH HEADER CSV")
+    con.execute("CREATE TABLE data_unique AS SELECT DISTINCT * FROM data")
+    con.execute(
+        "CREATE TABLE data_cleaned_missing AS SELECT Customer_ID, Customer_Name, "
+        "COALESCE(Age, 0) AS Age, Gender, COALESCE(Purchase_Amount, 0.0) AS "
+        "Purchase_Amount, Purchase_Date FROM data_unique"
+    )
+    con.execute(
+        "CREATE TABLE data_cleaned_outliers AS SELECT * FROM data_cleaned_missing "
+        "WHERE Age <= 100 AND Purchase_Amount <= 1000"
+    )
+    con.execute(
+        f"CREATE TABLE data_cleaned_gender AS SELECT *, {GENDER_SQL} AS Gender_Binary "
+        "FROM data_cleaned_outliers"
+    )
+    con.execute(
+        "CREATE TABLE data_cleaned AS SELECT Customer_ID, "
+        "SPLIT_PART(Customer_Name, ' ', 1) AS First_Name, "
+        "SPLIT_PART(Customer_Name, ' ', 2) AS Last_Name, Age, Gender_Binary, "
+        "Purchase_Amount, Purchase_Date FROM data_cleaned_gender"
+    )
+    totals = con.execute(
+        "SELECT Gender_Binary, SUM(Purchase_Amount) FROM data_cleaned_gender "
+        "GROUP BY Gender_Binary"
+    ).fetchall()
+    averages = con.execute(
+        f"SELECT {AGE_GROUP_SQL} AS Age_Group, AVG(Purchase_Amount) "
+        "FROM data_cleaned GROUP BY Age_Group"
+    ).fetchall()
+    return dict(totals), dict(averages)
+
+
+TRANSFORMS = {
+    "stdlib_streaming": lambda path: transform_purchases(read_rows(path)),
+    "pandas": transform_pandas,
+    "duckdb_tables": transform_duckdb_tables,
+    "polars_lazy": lambda path: transform_purchases_polars(path, streaming=False),
+    "polars_streaming": lambda path: transform_purchases_polars(path, streaming=True),
+}
+
+
+def run_case(case, csv_path, num_rows):
+    def transform():
+        TRANSFORMS[case](csv_path)
+        return int(num_rows)
+
+    report(transform)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=3, metavar=("CASE", "CSV_PATH", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "sample_data.csv")
+            create_sample_csv(csv_path, args.rows)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path, args.rows)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_transform_engines --rows 10000000
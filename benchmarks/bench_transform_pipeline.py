@@ -0,0 +1,137 @@
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from benchmarks.bench_utils import print_table, report, run_isolated
+from transform_functions import read_rows, transform_purchases
+
+CASES = ["multi_pass", "streaming"]
+FIRST_NAMES = ["Emma", "Ivy", "Liam", "Noah", "Olivia", "Ava", "Mia", "Lucas"]
+LAST_NAMES = ["Rodriguez", "Martinez", "Smith", "Johnson", "Brown", "Lee"]
+
+
+# Write a sample_data.csv style file with num_rows rows, about 1% of them duplicates,
+# 1% with a missing age and 1% outliers
+def create_sample_csv(path, num_rows):
+    rng = random.Random(0)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            [
+                "Customer_ID",
+                "Customer_Name",
+                "Age",
+                "Gender",
+                "Purchase_Amount",
+                "Purchase_Date",
+            ]
+        )
+        for i in range(num_rows):
+            roll = rng.random()
+            writer.writerow(
+                [
+                    rng.randrange(i) if roll < 0.01 and i else i,
+                    f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    "" if 0.01 <= roll < 0.02 else rng.randint(18, 70),
+                    rng.choice(["Female", "Male"]),
+                    1500.0 if 0.02 <= roll < 0.03 else round(rng.uniform(5, 1000), 2),
+                    "2024-09-23",
+                ]
+            )
+
+
+# The list based version of 3-data-transform-solutions.py: read everything, then
+# one pass per step and a list of amounts per age group
+def transform_multi_pass(path):
+    data = []
+    with open(path, "r", newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            data.append(row)
+
+    data_unique = []
+    customer_ids_seen = set()
+    for row in data:
+        if row["Customer_ID"] not in customer_ids_seen:
+            data_unique.append(row)
+            customer_ids_seen.add(row["Customer_ID"])
+
+    for row in data_unique:
+        if not row["Age"]:
+            row["Age"] = 0
+        if not row["Purchase_Amount"]:
+            row["Purchase_Amount"] = 0.0
+
+    data_cleaned = [
+        row
+        for row in data_unique
+        if int(row["Age"]) <= 100 and float(row["Purchase_Amount"]) <= 1000
+    ]
+
+    for row in data_cleaned:
+        if row["Gender"] == "Female":
+            row["Gender"] = 0
+        elif row["Gender"] == "Male":
+            row["Gender"] = 1
+
+    for row in data_cleaned:
+        first_name, last_name = row["Customer_Name"].split(" ", 1)
+        row["First_Name"] = first_name
+        row["Last_Name"] = last_name
+        del row["Customer_Name"]
+
+    total_purchase_by_gender = {0: 0.0, 1: 0.0}
+    for row in data_cleaned:
+        total_purchase_by_gender[row["Gender"]] += float(row["Purchase_Amount"])
+
+    age_groups = {"18-30": [], "31-40": [], "41-50": [], "51-60": [], "61-70": []}
+    for row in data_cleaned:
+        age = int(row["Age"])
+        if age <= 30:
+            age_groups["18-30"].append(float(row["Purchase_Amount"]))
+        elif age <= 40:
+            age_groups["31-40"].append(float(row["Purchase_Amount"]))
+        elif age <= 50:
+            age_groups["41-50"].append(float(row["Purchase_Amount"]))
+        elif age <= 60:
+            age_groups["51-60"].append(float(row["Purchase_Amount"]))
+        else:
+            age_groups["61-70"].append(float(row["Purchase_Amount"]))
+
+    average_purchase_by_age_group = {
+        group: sum(amounts) / len(amounts) for group, amounts in age_groups.items()
+    }
+    return total_purchase_by_gender, average_purchase_by_age_group, len(data)
+
+
+def run_case(case, csv_path, num_rows):
+    def transform():
+        if case == "multi_pass":
+            return transform_multi_pass(csv_path)[2]
+        transform_purchases(read_rows(csv_path))
+        return int(num_rows)
+
+    report(transform)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--case", nargs=3, metavar=("CASE", "CSV_PATH", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(*args.case)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "sample_data.csv")
+            create_sample_csv(csv_path, args.rows)
+            results = [
+                {"case": case, **run_isolated(__spec__.name, case, csv_path, args.rows)}
+                for case in args.cases
+            ]
+        print_table(results)
+
+# Run this with the command python -m benchmarks.bench_transform_pipeline --rows 1000000
@@ -0,0 +1,56 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+# Bytes this process has written to storage so far, from /proc/self/io on Linux
+def written_bytes():
+    with open("/proc/self/io") as file:
+        for line in file:
+            if line.startswith("write_bytes:"):
+                return int(line.split()[1])
+    return 0
+
+
+# Peak resident set size of the current process in MB (ru_maxrss is in KB on Linux)
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Time a callable that returns the number of rows it processed and print the result as JSON
+# The callable can also return a dict with "rows" and extra measurements to report
+def report(run):
+    start = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - start
+    extra = {}
+    if isinstance(rows, dict):
+        extra = rows
+        rows = extra.pop("rows")
+    result = {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds) if seconds else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra,
+    }
+    print(json.dumps(result))
+
+
+# Run one benchmark case in a fresh interpreter so peak RSS is not shared between cases
+def run_isolated(module, *args):
+    command = [sys.executable, "-m", module, "--case", *map(str, args)]
+    output = subprocess.run(command, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# Print a list of dicts as a fixed width table
+def print_table(results):
+    columns = list(results[0])
+    print(" | ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print(" | ".join(f"{str(result[column]):>14}" for column in columns))
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from extract_load_functions import quote
+
+
+# Version of a local file from its modification time and size
+def file_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+# Version of a local file from a hash of its content, for when mtimes are not reliable
+def content_version(path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# On-disk cache of extracted data as Parquet files, addressed by source URI + version
+# (an ETag, mtime or content hash) so a changed source is a new entry
+# Entries are evicted least recently used first once the cache exceeds max_bytes,
+# stats counts hits, misses and evictions
+class ColumnarCache:
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.last_used_ns = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, source_uri, version):
+        key = hashlib.sha256(f"{source_uri}\n{version}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + ".parquet")
+
+    # Record the entry as most recently used in its mtime, strictly increasing so
+    # entries used in quick succession keep their order on coarse filesystem clocks
+    def _touch(self, path):
+        self.last_used_ns = max(time.time_ns(), self.last_used_ns + 1)
+        os.utime(path, ns=(self.last_used_ns, self.last_used_ns))
+
+    # Path of the cached entry or None, a hit marks the entry as recently used
+    def get(self, source_uri, version):
+        path = self.path(source_uri, version)
+        try:
+            self._touch(path)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return path
+
+    # Write an Arrow table, or a record batch reader batch by batch, as the entry
+    # for source_uri + version and evict older entries over the budget
+    # Written to a temporary file and renamed so readers never see a partial entry
+    def put(self, source_uri, version, data):
+        path = self.path(source_uri, version)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            if isinstance(data, pa.Table):
+                pq.write_table(data, tmp_path)
+            else:
+                with pq.ParquetWriter(tmp_path, data.schema) as writer:
+                    for batch in data:
+                        writer.write_batch(batch)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._touch(path)
+        self.evict(keep=path)
+        return path
+
+    # Path of the cached entry, calling extract() to create it on a miss
+    # extract returns an Arrow table or a record batch reader
+    def get_or_extract(self, source_uri, version, extract):
+        return self.get(source_uri, version) or self.put(source_uri, version, extract())
+
+    # Remove least recently used entries until the cache fits in max_bytes,
+    # the keep entry (the one just written) is never removed
+    def evict(self, keep=None):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".parquet"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def size_bytes(self):
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith(".parquet")
+        )
+
+    # Share of lookups answered from the cache
+    def hit_rate(self):
+        return self.stats["hits"] / max(1, self.stats["hits"] + self.stats["misses"])
+
+
+# Cached Parquet copy of a local CSV file, re-parsed only when the file changes
+def cache_csv_file(cache, csv_path, convert_options=None):
+    return cache.get_or_extract(
+        "file://" + os.path.abspath(csv_path),
+        file_version(csv_path),
+        lambda: pv.read_csv(csv_path, convert_options=convert_options),
+    )
+
+
+# Insert a cached Parquet file into a DuckDB table by column name with read_parquet,
+# returns the number of rows inserted
+def load_parquet(duckdb_conn, table, parquet_path):
+    return duckdb_conn.execute(
+        f"INSERT INTO {quote(table)} BY NAME SELECT * FROM read_parquet(?)",
+        [parquet_path],
+    ).fetchone()[0]
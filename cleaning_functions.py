@@ -1,15 +1,477 @@
-# Simple function to remove duplicates
+import hashlib
+import heapq
+import math
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import compress
+from multiprocessing.shared_memory import SharedMemory
+from operator import itemgetter
+
+
+# Build the dedup key for a row, a tuple of values when unique_key is composite
+def _row_key(row, unique_key):
+    if isinstance(unique_key, str):
+        return row[unique_key]
+    return tuple(row[key] for key in unique_key)
+
+
+SPILL_BATCH_SIZE = 4096
+
+
+# Buffers records per partition file and pickles them in batches
+class _SpillWriter:
+    def __init__(self, paths):
+        self.files = [open(path, "wb") for path in paths]
+        self.buffers = [[] for _ in paths]
+
+    def write(self, partition, record):
+        buffer = self.buffers[partition]
+        buffer.append(record)
+        if len(buffer) >= SPILL_BATCH_SIZE:
+            pickle.dump(buffer, self.files[partition], pickle.HIGHEST_PROTOCOL)
+            buffer.clear()
 
+    def close(self):
+        for file, buffer in zip(self.files, self.buffers):
+            if buffer:
+                pickle.dump(buffer, file, pickle.HIGHEST_PROTOCOL)
+            file.close()
 
-def remove_duplicates(data, unique_key):
-    data_unique = []
-    unique_key_set = set()
 
-    for row in data:
-        if row[unique_key] not in unique_key_set:
-            data_unique.append(row)
-            unique_key_set.add(row[unique_key])
+# Read back every record from a spill file
+def _read_records(path):
+    with open(path, "rb") as file:
+        while True:
+            try:
+                yield from pickle.load(file)
+            except EOFError:
+                return
+
+
+# Dedup one spill partition into a run sorted by input index
+# Once a partition turns out to hold more than max_keys distinct keys it is split
+# again with a differently salted hash, so only about max_keys keys are ever held
+# in memory however the keys were distributed over the partitions
+def _dedup_partition(path, keep, max_keys, spill_partitions, depth, run_paths):
+    survivors = {}
+    for index, key, row in _read_records(path):
+        if keep == "last" or key not in survivors:
+            survivors[key] = (index, row)
+            if len(survivors) > max_keys:
+                break
     else:
-        print(f"duplicate customer id")
+        os.remove(path)
+        # index -1 marks keys that were already yielded before the spill
+        run = sorted(
+            (record for record in survivors.values() if record[0] >= 0),
+            key=itemgetter(0),
+        )
+        del survivors
+        run_path = path + ".run"
+        with open(run_path, "wb") as file:
+            for start in range(0, len(run), SPILL_BATCH_SIZE):
+                batch = run[start : start + SPILL_BATCH_SIZE]
+                pickle.dump(batch, file, pickle.HIGHEST_PROTOCOL)
+        run_paths.append(run_path)
+        return
+
+    del survivors
+    sub_paths = [f"{path}.{i}" for i in range(spill_partitions)]
+    writer = _SpillWriter(sub_paths)
+    try:
+        for record in _read_records(path):
+            writer.write(hash((depth, record[1])) % spill_partitions, record)
+    finally:
+        writer.close()
+    os.remove(path)
+    for sub_path in sub_paths:
+        _dedup_partition(
+            sub_path, keep, max_keys, spill_partitions, depth + 1, run_paths
+        )
+
+
+# Hash partition the remaining rows to disk, dedup each partition in memory and
+# k-way merge the sorted runs so the output keeps the input order
+def _spilled_unique(
+    rows, seen, unique_key, keep, max_keys, spill_dir, spill_partitions
+):
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        partition_paths = [
+            os.path.join(tmp_dir, f"partition-{i}.pkl") for i in range(spill_partitions)
+        ]
+        writer = _SpillWriter(partition_paths)
+        try:
+            # Keys already held in memory are written first so they shadow later rows
+            if keep == "first":
+                for key in seen:
+                    writer.write(hash(key) % spill_partitions, (-1, key, None))
+            else:
+                for key, (index, row) in seen.items():
+                    writer.write(hash(key) % spill_partitions, (index, key, row))
+            seen.clear()
+
+            for index, row in rows:
+                key = _row_key(row, unique_key)
+                writer.write(hash(key) % spill_partitions, (index, key, row))
+        finally:
+            writer.close()
+
+        run_paths = []
+        for path in partition_paths:
+            _dedup_partition(path, keep, max_keys, spill_partitions, 0, run_paths)
+
+        runs = [_read_records(path) for path in run_paths]
+        for _, row in heapq.merge(*runs, key=itemgetter(0)):
+            yield row
+
+
+# Generator that yields unique rows from any iterable
+# unique_key can be a column name or a list/tuple of column names (composite key)
+# keep="first" yields rows as soon as they are seen, keep="last" yields once the input is exhausted
+# Once more than max_keys keys are held in memory the rest of the input is spilled to
+# disk in spill_partitions hash partitions, deduped one at a time within the same budget
+def iter_unique(
+    data,
+    unique_key,
+    keep="first",
+    max_keys=None,
+    spill_dir=None,
+    spill_partitions=16,
+):
+    if keep not in ("first", "last"):
+        raise ValueError(f"keep must be 'first' or 'last', got {keep!r}")
+    if max_keys is not None and max_keys < 1:
+        raise ValueError(f"max_keys must be at least 1, got {max_keys}")
+    if spill_partitions < 2:
+        raise ValueError(f"spill_partitions must be at least 2, got {spill_partitions}")
+
+    # keep="last" uses a dict ordered by last occurrence, re-inserting on every repeat
+    seen = set() if keep == "first" else {}
+    single_key = isinstance(unique_key, str)
+    rows = enumerate(data)
+    for index, row in rows:
+        key = row[unique_key] if single_key else _row_key(row, unique_key)
+        if keep == "first":
+            if key in seen:
+                continue
+            seen.add(key)
+            yield row
+        else:
+            seen.pop(key, None)
+            seen[key] = (index, row)
+
+        if max_keys is not None and len(seen) > max_keys:
+            yield from _spilled_unique(
+                rows, seen, unique_key, keep, max_keys, spill_dir, spill_partitions
+            )
+            return
+
+    if keep == "last":
+        for _, row in seen.values():
+            yield row
+
+
+# Bloom filter backed by a bytearray, sized for expected_items keys at error_rate
+class BloomFilter:
+    def __init__(self, expected_items, error_rate=0.01):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        expected_items = max(1, expected_items)
+        self.num_bits = math.ceil(
+            -expected_items * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.num_hashes = max(1, round(self.num_bits / expected_items * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    # Double hashing: k bit positions derived from one 128 bit digest of hash(key),
+    # so keys that compare equal (1, 1.0 and True) get the same positions like in a set
+    def _positions(self, key):
+        key_hash = hash(key).to_bytes(8, "little", signed=True)
+        digest = hashlib.blake2b(key_hash, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    # Add a key and return True if it was (possibly) already present
+    def add(self, key):
+        bits = self.bits
+        present = True
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                present = False
+                bits[p >> 3] |= mask
+        return present
+
+    # Expected false positive rate given how many bits are currently set
+    def estimated_error_rate(self):
+        fill = int.from_bytes(self.bits, "little").bit_count() / self.num_bits
+        return fill**self.num_hashes
+
+
+# Counters filled in by iter_unique_approx
+@dataclass
+class DedupStats:
+    rows_in: int = 0
+    rows_out: int = 0
+    flagged: int = 0  # rows the filter reported as already seen
+    bits_per_key: float = None
+    estimated_false_positive_rate: float = None
+    false_positives: int = None  # only measured when confirm=True
+    false_positive_rate: float = None
+
+
+# Approximate dedup with a Bloom filter using about 10 bits per key at error_rate=0.01
+# Without confirm, a unique row is dropped with probability of about error_rate
+# With confirm=True the data is read twice and rows the filter flagged are checked
+# against an exact set, so the output matches iter_unique(keep="first")
+def iter_unique_approx(
+    data, unique_key, expected_items, error_rate=0.01, confirm=False, stats=None
+):
+    if confirm and iter(data) is data:
+        raise TypeError("confirm=True needs data that can be iterated twice")
+    stats = DedupStats() if stats is None else stats
+    bloom = BloomFilter(expected_items, error_rate)
+    stats.bits_per_key = bloom.num_bits / max(1, expected_items)
 
-    return data_unique
+    # candidates maps every flagged key to the index where it was first flagged
+    candidates = {}
+    for index, row in enumerate(data):
+        stats.rows_in += 1
+        key = _row_key(row, unique_key)
+        if bloom.add(key):
+            stats.flagged += 1
+            if confirm:
+                candidates.setdefault(key, index)
+        elif not confirm:
+            stats.rows_out += 1
+            yield row
+    stats.estimated_false_positive_rate = bloom.estimated_error_rate()
+    if not confirm:
+        return
+
+    # Second pass: a candidate whose first occurrence was flagged is a false positive
+    del bloom
+    stats.false_positives = 0
+    confirmed = set()
+    for index, row in enumerate(data):
+        key = _row_key(row, unique_key)
+        if key in candidates:
+            if key in confirmed:
+                continue
+            confirmed.add(key)
+            if candidates[key] == index:
+                stats.false_positives += 1
+        stats.rows_out += 1
+        yield row
+    stats.false_positive_rate = stats.false_positives / max(1, stats.rows_out)
+
+
+# Rows being deduped by iter_unique_parallel, set before its worker processes are forked
+# so they read the rows from the parent's memory instead of receiving pickled copies
+# The lock keeps calls from different threads from replacing each other's rows
+_parallel_rows = None
+_parallel_lock = threading.Lock()
+
+
+# Getter for the dedup key of a row, equal keys give equal values like _row_key
+def _key_getter(unique_key):
+    if isinstance(unique_key, str):
+        return itemgetter(unique_key)
+    return itemgetter(*unique_key)
+
+
+# Worker: split the row indices of one chunk into shards by key hash
+# Forked workers share the parent's hash seed, so equal keys land in the same shard
+def _partition_chunk(start, stop, unique_key, num_shards):
+    rows = _parallel_rows
+    get_key = _key_getter(unique_key)
+    shards = [array("q") for _ in range(num_shards)]
+    appends = [shard.append for shard in shards]
+    for i in range(start, stop):
+        appends[hash(get_key(rows[i])) % num_shards](i)
+    return [shard.tobytes() for shard in shards]
+
+
+# Worker: dedup the (ascending) row indices of one shard and set the shared mask byte
+# of every surviving row, shards own disjoint rows so no locking is needed
+def _dedup_shard(mask_name, shard, unique_key, keep):
+    rows = _parallel_rows
+    get_key = _key_getter(unique_key)
+    indices = array("q")
+    indices.frombytes(shard)
+    shm = SharedMemory(name=mask_name)
+    mask = shm.buf
+    try:
+        seen = set()
+        for i in reversed(indices) if keep == "last" else indices:
+            key = get_key(rows[i])
+            if key not in seen:
+                seen.add(key)
+                mask[i] = 1
+    finally:
+        mask.release()
+        shm.close()
+
+
+# Dedup across a process pool forked from this process: each worker reads the rows it
+# needs directly, hash partitions the row indices of one chunk into one shard per
+# worker, then dedups one shard and marks its surviving rows in a shared byte mask
+# The rows are yielded in input order with itertools.compress over the mask, so the
+# parent process does no per-row Python work
+# Needs the fork start method (Linux and macOS), calls from several threads run one at
+# a time, and forking while other threads hold locks (e.g. a DuckDB query running) can
+# deadlock the workers
+def iter_unique_parallel(data, unique_key, keep="first", workers=None, chunk_size=None):
+    global _parallel_rows
+    if keep not in ("first", "last"):
+        raise ValueError(f"keep must be 'first' or 'last', got {keep!r}")
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise RuntimeError(
+            "iter_unique_parallel needs the fork start method, use iter_unique instead"
+        )
+    if not hasattr(data, "__getitem__"):
+        data = list(data)
+    workers = workers or os.cpu_count()
+    num_rows = len(data)
+    chunk_size = chunk_size or max(1, math.ceil(num_rows / (workers * 4)))
+
+    with _parallel_lock:
+        mask = SharedMemory(create=True, size=max(1, num_rows))
+        _parallel_rows = data
+        try:
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                chunk_jobs = [
+                    pool.submit(
+                        _partition_chunk,
+                        start,
+                        min(start + chunk_size, num_rows),
+                        unique_key,
+                        workers,
+                    )
+                    for start in range(0, num_rows, chunk_size)
+                ]
+                chunk_shards = [job.result() for job in chunk_jobs]
+                shard_jobs = [
+                    pool.submit(
+                        _dedup_shard,
+                        mask.name,
+                        b"".join(shards[shard] for shards in chunk_shards),
+                        unique_key,
+                        keep,
+                    )
+                    for shard in range(workers)
+                ]
+                for job in shard_jobs:
+                    job.result()
+            survivors = bytes(mask.buf[:num_rows])
+        finally:
+            _parallel_rows = None
+            mask.close()
+            mask.unlink()
+
+    yield from compress(data, survivors)
+
+
+COLUMNAR_LIBRARIES = ("pandas", "polars", "pyarrow", "numpy")
+
+
+# True for pandas/polars DataFrames, Arrow Tables and NumPy structured arrays (and any
+# other object of those libraries, which remove_duplicates_columnar rejects),
+# checked by module name so none of those libraries have to be imported
+def _is_columnar(data):
+    return type(data).__module__.split(".")[0] in COLUMNAR_LIBRARIES
+
+
+# Vectorised dedup that returns the same type it was given, keeping first-seen order
+def remove_duplicates_columnar(data, unique_key, keep="first"):
+    if keep not in ("first", "last"):
+        raise ValueError(f"keep must be 'first' or 'last', got {keep!r}")
+    keys = [unique_key] if isinstance(unique_key, str) else list(unique_key)
+    library = type(data).__module__.split(".")[0]
+
+    if library == "pandas":
+        import pandas as pd
+
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError(
+                f"pandas input must be a DataFrame, got {type(data).__name__}"
+            )
+        return data.drop_duplicates(subset=keys, keep=keep)
+
+    if library == "polars":
+        import polars as pl
+
+        if not isinstance(data, (pl.DataFrame, pl.LazyFrame)):
+            raise TypeError(
+                f"polars input must be a DataFrame or LazyFrame, got {type(data).__name__}"
+            )
+        return data.unique(subset=keys, keep=keep, maintain_order=True)
+
+    if library == "pyarrow":
+        import numpy as np
+        import pyarrow as pa
+
+        if isinstance(data, pa.RecordBatch):
+            table = pa.Table.from_batches([data])
+        elif isinstance(data, pa.Table):
+            table = data
+        else:
+            raise TypeError(
+                f"pyarrow input must be a Table or RecordBatch, got {type(data).__name__}"
+            )
+        # Hash aggregate the row index per key, then take the surviving rows in order
+        aggregation = "min" if keep == "first" else "max"
+        survivors = (
+            table.select(keys)
+            .append_column("__row_index", pa.array(np.arange(data.num_rows)))
+            .group_by(keys, use_threads=False)
+            .aggregate([("__row_index", aggregation)])
+        )
+        indices = np.sort(survivors.column(f"__row_index_{aggregation}").to_numpy())
+        return data.take(indices)
+
+    if library == "numpy":
+        import pandas as pd
+
+        if data.dtype.names is None:
+            raise TypeError("NumPy input must be a structured array with named fields")
+        key_columns = pd.DataFrame({key: data[key] for key in keys}, copy=False)
+        mask = ~key_columns.duplicated(keep=keep).to_numpy()
+        return data[mask]
+
+    raise TypeError(f"Unsupported columnar input {type(data).__name__}")
+
+
+# Simple function to remove duplicates
+# method="exact" uses iter_unique, method="bloom" uses iter_unique_approx and
+# method="parallel" uses iter_unique_parallel
+# DataFrames, Arrow Tables and NumPy structured arrays go to remove_duplicates_columnar,
+# which only supports method="exact"
+def remove_duplicates(data, unique_key, method="exact", **options):
+    if _is_columnar(data):
+        if method != "exact":
+            raise ValueError(
+                f"method={method!r} only applies to rows, "
+                f"{type(data).__name__} input is always deduped exactly"
+            )
+        return remove_duplicates_columnar(data, unique_key, **options)
+    if method == "exact":
+        return list(iter_unique(data, unique_key, **options))
+    if method == "bloom":
+        return list(iter_unique_approx(data, unique_key, **options))
+    if method == "parallel":
+        return list(iter_unique_parallel(data, unique_key, **options))
+    raise ValueError(f"Unknown dedup method {method!r}")
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+from extract_load_functions import insert_rows, quote
+
+USER_AGENT = "python-for-data-engineering-crawler"
+
+# Only <a href> tags are turned into soup objects, the rest of the page is skipped
+LINKS_ONLY = SoupStrainer("a", href=True)
+
+
+# Absolute http(s) links of an HTML page without #fragments, parsed with lxml
+def extract_links(html, base_url):
+    soup = BeautifulSoup(html, "lxml", parse_only=LINKS_ONLY)
+    links = []
+    for tag in soup.find_all("a", href=True):
+        url = urldefrag(urljoin(base_url, tag["href"].strip())).url
+        if urlsplit(url).scheme in ("http", "https"):
+            links.append(url)
+    return links
+
+
+# Set of URLs stored as 64-bit blake2b digests instead of the URL strings
+# Two different URLs share a digest with a probability of about n^2 / 2^65
+class UrlSeenSet:
+    def __init__(self):
+        self.digests = set()
+
+    @staticmethod
+    def _digest(url):
+        return int.from_bytes(
+            hashlib.blake2b(url.encode(), digest_size=8).digest(), "little"
+        )
+
+    # Add a URL, returns False if it was already seen
+    def add(self, url):
+        digest = self._digest(url)
+        if digest in self.digests:
+            return False
+        self.digests.add(digest)
+        return True
+
+    def __contains__(self, url):
+        return self._digest(url) in self.digests
+
+    def __len__(self):
+        return len(self.digests)
+
+
+# robots.txt rules of a host, missing robots.txt allows everything and
+# 401/403 disallows everything like urllib.robotparser does
+def _fetch_robots(session, origin, timeout):
+    robots = RobotFileParser(origin + "/robots.txt")
+    try:
+        response = session.get(origin + "/robots.txt", timeout=timeout)
+    except requests.RequestException:
+        robots.parse([])
+        return robots
+    if response.status_code in (401, 403):
+        robots.disallow_all = True
+    elif response.status_code == 200:
+        robots.parse(response.text.splitlines())
+    else:
+        robots.parse([])
+    return robots
+
+
+# HTML body of a page or None for errors and non-HTML responses
+def _fetch_page(session, url, timeout):
+    response = session.get(url, timeout=timeout)
+    content_type = response.headers.get("Content-Type", "")
+    if response.status_code != 200 or "html" not in content_type:
+        return None
+    return response.text
+
+
+async def _crawl(session, start_urls, duckdb_conn, table, options, stats):
+    loop = asyncio.get_running_loop()
+    fetchers = ThreadPoolExecutor(options["concurrency"])
+    concurrency = asyncio.Semaphore(options["concurrency"])
+    host_slots = defaultdict(lambda: asyncio.Semaphore(options["per_host"]))
+    host_turns = defaultdict(asyncio.Lock)
+    next_start = {}
+    robots = {}
+    robots_locks = defaultdict(asyncio.Lock)
+    edges = []
+
+    def run(function, *args):
+        return loop.run_in_executor(fetchers, function, *args)
+
+    async def allowed(url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        async with robots_locks[origin]:
+            if origin not in robots:
+                robots[origin] = await run(
+                    _fetch_robots, session, origin, options["timeout"]
+                )
+        return robots[origin]
+
+    # Take a global slot no sooner than the host's robots.txt Crawl-delay after its
+    # previous request started, one request at a time per host so per_host requests
+    # cannot start in the same turn
+    async def take_turn(host, delay):
+        async with host_turns[host]:
+            wait = next_start.get(host, 0) - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await concurrency.acquire()
+            next_start[host] = loop.time() + delay
+
+    # Fetch and parse one page under the global and per-host limits
+    async def visit(url):
+        rules = await allowed(url)
+        if not rules.can_fetch(options["user_agent"], url):
+            stats["disallowed"] += 1
+            return []
+        host = urlsplit(url).netloc
+        delay = rules.crawl_delay(options["user_agent"])
+        async with host_slots[host]:
+            if delay:
+                await take_turn(host, float(delay))
+            else:
+                await concurrency.acquire()
+            try:
+                html = await run(_fetch_page, session, url, options["timeout"])
+            except requests.RequestException:
+                html = None
+            finally:
+                concurrency.release()
+        if html is None:
+            stats["errors"] += 1
+            return []
+        stats["pages"] += 1
+        return await run(extract_links, html, url)
+
+    async def flush():
+        if edges and duckdb_conn is not None:
+            batch = edges[:]
+            edges.clear()
+            await run(insert_rows, duckdb_conn, table, ["source", "target"], batch)
+
+    seen = UrlSeenSet()
+    frontier = [url for url in start_urls if seen.add(url)]
+    allowed_hosts = options["allowed_hosts"] or {
+        urlsplit(url).netloc for url in frontier
+    }
+    try:
+        for depth in range(options["max_depth"] + 1):
+            frontier = frontier[: options["max_pages"] - stats["pages"]]
+            if not frontier:
+                break
+            next_frontier = []
+            for url, links in zip(
+                frontier, await asyncio.gather(*map(visit, frontier))
+            ):
+                for link in links:
+                    edges.append((url, link))
+                    if urlsplit(link).netloc in allowed_hosts and seen.add(link):
+                        next_frontier.append(link)
+                if len(edges) >= options["batch_size"]:
+                    await flush()
+            frontier = next_frontier if depth < options["max_depth"] else []
+        await flush()
+    finally:
+        fetchers.shutdown()
+    stats["urls_seen"] = len(seen)
+
+
+# Breadth-first crawl from start_urls with asyncio, up to max_depth links away and
+# max_pages pages, staying on the start hosts unless allowed_hosts is given
+# Requests run on a thread pool: at most concurrency at once and per_host per host,
+# robots.txt rules and Crawl-delay are respected for user_agent, with a Crawl-delay
+# a host gets one request per delay however large per_host is
+# Every (source, target) link found is inserted into the DuckDB table in batches of
+# batch_size rows when duckdb_conn is given
+# Returns page, error and robots.txt disallowed counts, unique URLs seen and pages/sec
+def crawl(
+    start_urls,
+    duckdb_conn=None,
+    table="Links",
+    max_pages=100,
+    max_depth=2,
+    concurrency=16,
+    per_host=2,
+    allowed_hosts=None,
+    user_agent=USER_AGENT,
+    timeout=10,
+    batch_size=1000,
+):
+    if duckdb_conn is not None:
+        duckdb_conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(table)} (source TEXT, target TEXT)"
+        )
+    session = requests.Session()
+    session.headers["User-Agent"] = user_agent
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    options = {
+        "max_pages": max_pages,
+        "max_depth": max_depth,
+        "concurrency": concurrency,
+        "per_host": per_host,
+        "allowed_hosts": allowed_hosts,
+        "user_agent": user_agent,
+        "timeout": timeout,
+        "batch_size": batch_size,
+    }
+    stats = {"pages": 0, "errors": 0, "disallowed": 0, "urls_seen": 0}
+    start = time.perf_counter()
+    with session:
+        asyncio.run(_crawl(session, start_urls, duckdb_conn, table, options, stats))
+    seconds = time.perf_counter() - start
+    stats["seconds"] = round(seconds, 3)
+    stats["pages_per_sec"] = round(stats["pages"] / seconds, 1) if seconds else None
+    return stats
@@ -0,0 +1,169 @@
+import csv
+import io
+import math
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+
+# Header row of a CSV file as a list of column names
+def read_header(path):
+    with open(path, newline="") as file:
+        return next(csv.reader(file))
+
+
+# Split a file into about num_chunks (start, end) byte ranges that each end on a newline,
+# skipping the header line
+# Quoted fields containing newlines are not supported by newline-aligned splitting
+def chunk_offsets(path, num_chunks):
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        start = len(file.readline())
+        offsets = [start]
+        for i in range(1, num_chunks):
+            file.seek(start + (size - start) * i // num_chunks)
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            if position > offsets[-1]:
+                offsets.append(position)
+    if offsets[-1] < size:
+        offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+# Worker: parse one byte range of the file with pyarrow's CSV reader
+def _parse_chunk(path, byte_range, column_names, column_types):
+    start, end = byte_range
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return pv.read_csv(
+        io.BytesIO(data),
+        read_options=pv.ReadOptions(column_names=column_names, use_threads=False),
+        convert_options=pv.ConvertOptions(column_types=column_types),
+    )
+
+
+# Parse a large CSV file with a header row in a process pool, chunk_size bytes per task,
+# and yield Arrow record batches in file order
+# At most 2 * workers parsed chunks are held at a time
+# Without column_types the types inferred from the first chunk are used for all chunks,
+# pass column_types when the first chunk is not representative
+# Low-cardinality columns such as city can be given pa.dictionary(pa.int32(), pa.string())
+# in column_types to be read as dictionary arrays
+def read_csv_parallel(
+    path, workers=None, chunk_size=64 * 1024 * 1024, column_types=None
+):
+    workers = workers or os.cpu_count()
+    column_names = read_header(path)
+    num_chunks = max(1, math.ceil(os.path.getsize(path) / chunk_size))
+    ranges = deque(chunk_offsets(path, num_chunks))
+    if not ranges:
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        first = _parse_chunk(path, ranges.popleft(), column_names, column_types)
+        column_types = column_types or first.schema
+        yield from first.to_batches()
+
+        pending = deque()
+        while ranges or pending:
+            while ranges and len(pending) < 2 * workers:
+                pending.append(
+                    pool.submit(
+                        _parse_chunk, path, ranges.popleft(), column_names, column_types
+                    )
+                )
+            yield from pending.popleft().result().to_batches()
+
+
+# Gather the bytes of one column out of a window into an Arrow string array,
+# the only copy made is of the selected field bytes
+def _column_from_window(window, starts, ends):
+    lengths = ends - starts
+    offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    return pa.LargeStringArray.from_buffers(
+        len(starts), pa.py_buffer(offsets), pa.py_buffer(window[positions])
+    )
+
+
+# Parse the selected columns of one newline-aligned window of the mapped file
+def _parse_window(mapped, start, end, num_columns, indexes, names, column_types):
+    window = np.frombuffer(mapped, dtype=np.uint8, count=end - start, offset=start)
+    if window[-1] != ord("\n"):
+        window = np.append(window, np.uint8(ord("\n")))
+    if np.any(window == ord('"')):
+        raise ValueError("Quoted fields are not supported by the mmap reader")
+
+    delimiters = np.flatnonzero((window == ord(",")) | (window == ord("\n")))
+    if len(delimiters) % num_columns:
+        raise ValueError(
+            f"Rows in bytes {start}-{end} do not have {num_columns} fields"
+        )
+    delimiters = delimiters.reshape(-1, num_columns)
+    line_starts = np.concatenate(([0], delimiters[:-1, -1] + 1))
+
+    arrays = []
+    for index, name in zip(indexes, names):
+        starts = line_starts if index == 0 else delimiters[:, index - 1] + 1
+        ends = delimiters[:, index].copy()
+        if index == num_columns - 1:
+            # Drop the \r of \r\n line endings
+            ends -= window[ends - 1] == ord("\r")
+        values = _column_from_window(window, starts, ends)
+        if name in column_types:
+            values = pc.cast(values, column_types[name])
+        arrays.append(values)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+# Read only the named columns of a large unquoted CSV file with a header row
+# The file is memory-mapped and scanned window_size bytes at a time with NumPy,
+# field boundaries are found on the mapped bytes without building per-line str
+# objects and only the selected fields are copied out, as Arrow string columns
+# cast to column_types where given
+# Pages of finished windows are released so memory stays flat for files larger than RAM
+def read_csv_columns_mmap(
+    path, columns, column_types=None, window_size=4 * 1024 * 1024
+):
+    header = read_header(path)
+    indexes = [header.index(column) for column in columns]
+    num_chunks = max(1, math.ceil(os.path.getsize(path) / window_size))
+    ranges = chunk_offsets(path, num_chunks)
+    if not ranges:
+        return
+
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        for start, end in ranges:
+            yield _parse_window(
+                mapped,
+                start,
+                end,
+                len(header),
+                indexes,
+                list(columns),
+                column_types or {},
+            )
+            page_start = start - start % mmap.PAGESIZE
+            page_end = end - end % mmap.PAGESIZE
+            if page_end > page_start:
+                mapped.madvise(mmap.MADV_DONTNEED, page_start, page_end - page_start)
+    finally:
+        # A parse error's traceback can still reference a NumPy view of the
+        # mapping, it is then unmapped when the traceback is released
+        try:
+            mapped.close()
+        except BufferError:
+            pass
@@ -36,25 +36,23 @@ CREATE TABLE IF NOT EXISTS Customer (
 
 
 # Function to read CSV and insert data into the table
+# executemany streams the DictReader rows through one prepared statement in a single transaction,
+# WAL and synchronous=OFF skip the per-row journal syncs while loading
 def insert_data_from_csv(csv_file):
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = OFF")
     with open(csv_file, "r") as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            cursor.execute(
-                """
-                INSERT INTO Customer (customer_id, zipcode, city, state_code, datetime_created, datetime_updated)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    row["customer_id"],
-                    row["zipcode"],
-                    row["city"],
-                    row["state_code"],
-                    row["datetime_created"],
-                    row["datetime_updated"],
-                ),
-            )
+        cursor.executemany(
+            """
+            INSERT INTO Customer (customer_id, zipcode, city, state_code, datetime_created, datetime_updated)
+            VALUES (:customer_id, :zipcode, :city, :state_code, :datetime_created, :datetime_updated)
+        """,
+            reader,
+        )
     conn.commit()
+    cursor.execute("PRAGMA synchronous = FULL")
+    cursor.execute("PRAGMA journal_mode = DELETE")
 
 
 # Insert data from CSV file
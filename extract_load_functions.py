@@ -0,0 +1,415 @@
+import csv
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import pathname2url
+
+import duckdb
+import pyarrow as pa
+
+
+# Quote an identifier for use in DuckDB or SQLite SQL
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Insert an Arrow table into a DuckDB table by column name, DuckDB reads the
+# Arrow buffers directly so no Python row objects are created
+def insert_arrow(duckdb_conn, table, arrow_table):
+    columns = ", ".join(quote(name) for name in arrow_table.column_names)
+    duckdb_conn.register("arrow_batch", arrow_table)
+    try:
+        duckdb_conn.execute(
+            f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM arrow_batch"
+        )
+    finally:
+        duckdb_conn.unregister("arrow_batch")
+
+
+# Turn a batch of row tuples into an Arrow table, one column at a time
+# dictionary_columns are dictionary encoded, each distinct value of a low-cardinality
+# column such as city or state_code is then stored once with integer codes per row
+def rows_to_arrow(columns, rows, dictionary_columns=()):
+    arrays = {}
+    for name, values in zip(columns, zip(*rows)):
+        arrays[name] = pa.array(values)
+        if name in dictionary_columns:
+            arrays[name] = arrays[name].dictionary_encode()
+    return pa.table(arrays)
+
+
+# Insert a batch of row tuples into a DuckDB table as one Arrow table
+def insert_rows(duckdb_conn, table, columns, rows, dictionary_columns=()):
+    insert_arrow(duckdb_conn, table, rows_to_arrow(columns, rows, dictionary_columns))
+
+
+# Path of the main database file behind a sqlite3 connection
+def sqlite_path(sqlite_conn):
+    for _, name, path in sqlite_conn.execute("PRAGMA database_list"):
+        if name == "main" and path:
+            return path
+    raise ValueError("SQLite connection is not backed by a database file")
+
+
+# Install and load DuckDB's sqlite extension, False if it is not available
+def load_sqlite_extension(duckdb_conn):
+    try:
+        duckdb_conn.execute("INSTALL sqlite")
+        duckdb_conn.execute("LOAD sqlite")
+        return True
+    except duckdb.IOException:
+        return False
+
+
+# Let DuckDB read the SQLite file itself with its sqlite scanner
+def _transfer_with_scanner(sqlite_conn, duckdb_conn, table, target):
+    path = sqlite_path(sqlite_conn)
+    return duckdb_conn.execute(
+        f"INSERT INTO {quote(target)} SELECT * FROM sqlite_scan(?, ?)", [path, table]
+    ).fetchone()[0]
+
+
+# Read batch_size rows at a time and insert each batch as an Arrow table,
+# so at most one batch of rows is held in memory
+def _transfer_in_batches(sqlite_conn, duckdb_conn, table, target, batch_size):
+    cursor = sqlite_conn.execute(f"SELECT * FROM {quote(table)}")
+    columns = [column[0] for column in cursor.description]
+    num_rows = 0
+    while rows := cursor.fetchmany(batch_size):
+        insert_rows(duckdb_conn, target, columns, rows)
+        num_rows += len(rows)
+    return num_rows
+
+
+# Copy a table from SQLite to an existing DuckDB table with the same columns, named
+# target or the same as the SQLite table
+# strategy="scanner" uses DuckDB's sqlite extension, strategy="batched" uses fetchmany,
+# strategy="auto" tries the scanner and falls back to batches if the extension is missing
+# Returns the number of rows copied
+def transfer_table(
+    sqlite_conn,
+    duckdb_conn,
+    table,
+    strategy="auto",
+    batch_size=100_000,
+    target=None,
+):
+    if strategy not in ("auto", "scanner", "batched"):
+        raise ValueError(f"Unknown transfer strategy {strategy!r}")
+    target = target or table
+    if strategy != "batched":
+        if load_sqlite_extension(duckdb_conn):
+            return _transfer_with_scanner(sqlite_conn, duckdb_conn, table, target)
+        if strategy == "scanner":
+            raise RuntimeError("DuckDB sqlite extension is not available")
+    return _transfer_in_batches(sqlite_conn, duckdb_conn, table, target, batch_size)
+
+
+# Create the table that stores one high-water mark per extracted source table
+def _create_extract_state(duckdb_conn):
+    duckdb_conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS extract_state (
+            table_name TEXT PRIMARY KEY,
+            high_water_mark TEXT,
+            extracted_at TIMESTAMP
+        )
+        """
+    )
+
+
+# High-water mark saved by the last incremental extract of table, None if there is none
+def get_high_water_mark(duckdb_conn, table):
+    _create_extract_state(duckdb_conn)
+    row = duckdb_conn.execute(
+        "SELECT high_water_mark FROM extract_state WHERE table_name = ?", [table]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _has_primary_key(duckdb_conn, table):
+    return (
+        duckdb_conn.execute(
+            """
+        SELECT COUNT(*) FROM duckdb_constraints()
+        WHERE table_name = ? AND constraint_type = 'PRIMARY KEY'
+        """,
+            [table],
+        ).fetchone()[0]
+        > 0
+    )
+
+
+# Upsert a batch of rows on key_column: INSERT OR REPLACE when the DuckDB table has a
+# primary key, otherwise delete the existing keys and insert the new versions
+def _upsert_rows(duckdb_conn, table, columns, rows, key_column, has_primary_key):
+    column_list = ", ".join(quote(name) for name in columns)
+    duckdb_conn.register("upsert_batch", rows_to_arrow(columns, rows))
+    try:
+        if has_primary_key:
+            duckdb_conn.execute(
+                f"INSERT OR REPLACE INTO {quote(table)} ({column_list}) "
+                f"SELECT {column_list} FROM upsert_batch"
+            )
+        else:
+            duckdb_conn.execute(
+                f"DELETE FROM {quote(table)} WHERE {quote(key_column)} IN "
+                f"(SELECT {quote(key_column)} FROM upsert_batch)"
+            )
+            duckdb_conn.execute(
+                f"INSERT INTO {quote(table)} ({column_list}) "
+                f"SELECT {column_list} FROM upsert_batch"
+            )
+    finally:
+        duckdb_conn.unregister("upsert_batch")
+
+
+# Pull only the rows of a SQLite table updated since the last run and upsert them into
+# the DuckDB table of the same name, the high-water mark is saved in the DuckDB
+# extract_state table in the same transaction as the data
+# Rows updated at the high-water mark itself are read again by the next run (>= rather
+# than >) since updated_column values can share a second, upserting them again is harmless
+# full_refresh=True empties the DuckDB table and reloads everything
+# Rows with a NULL updated_column are only picked up by the first or a full extract
+# Returns the number of rows upserted
+def incremental_extract(
+    sqlite_conn,
+    duckdb_conn,
+    table,
+    key_column="customer_id",
+    updated_column="datetime_updated",
+    full_refresh=False,
+    batch_size=100_000,
+):
+    _create_extract_state(duckdb_conn)
+    high_water_mark = None if full_refresh else get_high_water_mark(duckdb_conn, table)
+    has_primary_key = _has_primary_key(duckdb_conn, table)
+
+    query = f"SELECT * FROM {quote(table)}"
+    params = []
+    if high_water_mark is not None:
+        query += f" WHERE {quote(updated_column)} >= ?"
+        params.append(high_water_mark)
+    query += f" ORDER BY {quote(updated_column)}"
+    cursor = sqlite_conn.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    updated_index = columns.index(updated_column)
+
+    # DuckDB cannot re-insert a deleted primary key in the same transaction,
+    # so a full refresh empties the table in its own transaction first
+    # The high-water mark is dropped with the rows, if the reload then fails the
+    # next run is a full extract instead of an incremental one over an empty table
+    if full_refresh:
+        duckdb_conn.begin()
+        try:
+            duckdb_conn.execute(f"DELETE FROM {quote(table)}")
+            duckdb_conn.execute(
+                "DELETE FROM extract_state WHERE table_name = ?", [table]
+            )
+            duckdb_conn.commit()
+        except Exception:
+            duckdb_conn.rollback()
+            raise
+
+    num_rows = 0
+    duckdb_conn.begin()
+    try:
+        while rows := cursor.fetchmany(batch_size):
+            _upsert_rows(duckdb_conn, table, columns, rows, key_column, has_primary_key)
+            num_rows += len(rows)
+            high_water_mark = rows[-1][updated_index] or high_water_mark
+        duckdb_conn.execute(
+            "INSERT OR REPLACE INTO extract_state VALUES (?, ?, current_timestamp)",
+            [table, high_water_mark],
+        )
+        duckdb_conn.commit()
+    except Exception:
+        duckdb_conn.rollback()
+        raise
+    return num_rows
+
+
+# Split the inclusive key range [low, high] into at most num_slices contiguous ranges
+def key_ranges(low, high, num_slices):
+    step = max(1, math.ceil((high - low + 1) / num_slices))
+    return [
+        (start, min(start + step - 1, high)) for start in range(low, high + 1, step)
+    ]
+
+
+# Put an item on a bounded queue, giving up once the writer has stopped
+def _put(batches, item, stop):
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+    raise RuntimeError("DuckDB writer stopped")
+
+
+# Reader thread: stream one key range from its own read-only SQLite connection
+def _read_slice(uri, table, key_column, key_range, batch_size, batches, stop):
+    start = time.perf_counter()
+    num_rows = 0
+    conn = None
+    try:
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        cursor = conn.execute(
+            f"SELECT * FROM {quote(table)} WHERE {quote(key_column)} BETWEEN ? AND ?",
+            key_range,
+        )
+        columns = [column[0] for column in cursor.description]
+        while rows := cursor.fetchmany(batch_size):
+            _put(batches, (columns, rows), stop)
+            num_rows += len(rows)
+    finally:
+        if conn is not None:
+            conn.close()
+        _put(batches, None, stop)
+    seconds = time.perf_counter() - start
+    return {
+        "slice": key_range,
+        "rows": num_rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(num_rows / seconds) if seconds else None,
+    }
+
+
+# Read a SQLite table in num_slices primary key ranges, each on its own read-only
+# connection in a thread pool, and stream the batches through a bounded queue into
+# a single DuckDB writer
+# All batches are inserted in one transaction, a failed reader or insert rolls it back
+# so the table never holds part of the extract
+# dictionary_columns are dictionary encoded in the Arrow batches handed to DuckDB
+# Returns the overall row count and throughput plus per-slice stats
+def parallel_extract(
+    sqlite_conn,
+    duckdb_conn,
+    table,
+    key_column="customer_id",
+    num_slices=4,
+    batch_size=50_000,
+    queue_size=8,
+    dictionary_columns=(),
+):
+    uri = "file:" + pathname2url(os.path.abspath(sqlite_path(sqlite_conn))) + "?mode=ro"
+    low, high = sqlite_conn.execute(
+        f"SELECT MIN({quote(key_column)}), MAX({quote(key_column)}) FROM {quote(table)}"
+    ).fetchone()
+    ranges = key_ranges(low, high, num_slices) if low is not None else []
+
+    start = time.perf_counter()
+    num_rows = 0
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    with ThreadPoolExecutor(max(1, len(ranges))) as pool:
+        readers = [
+            pool.submit(
+                _read_slice,
+                uri,
+                table,
+                key_column,
+                key_range,
+                batch_size,
+                batches,
+                stop,
+            )
+            for key_range in ranges
+        ]
+        duckdb_conn.begin()
+        try:
+            try:
+                running = len(readers)
+                while running:
+                    try:
+                        batch = batches.get(timeout=0.1)
+                    except queue.Empty:
+                        # A reader that failed before its end marker is not waited for
+                        for reader in readers:
+                            if reader.done() and reader.exception() is not None:
+                                raise reader.exception()
+                        continue
+                    if batch is None:
+                        running -= 1
+                        continue
+                    insert_rows(duckdb_conn, table, *batch, dictionary_columns)
+                    num_rows += len(batch[1])
+            finally:
+                stop.set()
+            slices = [reader.result() for reader in readers]
+            duckdb_conn.commit()
+        except Exception:
+            duckdb_conn.rollback()
+            raise
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": num_rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(num_rows / seconds) if seconds else None,
+        "slices": slices,
+    }
+
+
+# Quote a string as a SQL literal
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+# DuckDB parses the file itself with read_csv, using the target table's column types
+# so nothing is sniffed (zip codes such as 09790 stay text)
+def _bulk_load_duckdb(duckdb_conn, table, csv_path, header):
+    column_types = dict(
+        duckdb_conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = ?",
+            [table],
+        ).fetchall()
+    )
+    csv_columns = ", ".join(
+        f"{_literal(name)}: {_literal(column_types[name])}" for name in header
+    )
+    column_list = ", ".join(quote(name) for name in header)
+    return duckdb_conn.execute(
+        f"INSERT INTO {quote(table)} ({column_list}) SELECT {column_list} "
+        f"FROM read_csv(?, header = true, columns = {{{csv_columns}}})",
+        [str(csv_path)],
+    ).fetchone()[0]
+
+
+# SQLite streams the csv.reader rows through a single executemany in one transaction,
+# with WAL and synchronous=OFF while loading
+def _bulk_load_sqlite(sqlite_conn, table, csv_path):
+    journal_mode = sqlite_conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = sqlite_conn.execute("PRAGMA synchronous").fetchone()[0]
+    sqlite_conn.execute("PRAGMA journal_mode = WAL")
+    sqlite_conn.execute("PRAGMA synchronous = OFF")
+    try:
+        with open(csv_path, newline="") as file, sqlite_conn:
+            reader = csv.reader(file)
+            header = next(reader)
+            placeholders = ", ".join("?" for _ in header)
+            column_list = ", ".join(quote(name) for name in header)
+            return sqlite_conn.executemany(
+                f"INSERT INTO {quote(table)} ({column_list}) VALUES ({placeholders})",
+                reader,
+            ).rowcount
+    finally:
+        sqlite_conn.execute(f"PRAGMA synchronous = {synchronous}")
+        sqlite_conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+
+
+# Load a CSV file with a header row into an existing DuckDB or SQLite table,
+# matching CSV columns to table columns by name
+# Returns the number of rows loaded
+def bulk_load_csv(conn, table, csv_path):
+    if isinstance(conn, sqlite3.Connection):
+        return _bulk_load_sqlite(conn, table, csv_path)
+    with open(csv_path, newline="") as file:
+        header = next(csv.reader(file))
+    return _bulk_load_duckdb(conn, table, csv_path, header)
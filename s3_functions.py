@@ -0,0 +1,296 @@
+import asyncio
+import io
+import mmap
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pyarrow as pa
+import pyarrow.csv as pv
+from botocore import UNSIGNED
+from botocore.client import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from extract_load_functions import insert_arrow
+
+# Columns of the NOAA GHCN by_station csv.gz files, which have no header row
+WEATHER_COLUMNS = {
+    "id": pa.string(),
+    "date": pa.string(),
+    "element": pa.string(),
+    "value": pa.int64(),
+    "m_flag": pa.string(),
+    "q_flag": pa.string(),
+    "s_flag": pa.string(),
+    "obs_time": pa.string(),
+}
+
+
+def _csv_options(columns, block_size):
+    return {
+        "read_options": pv.ReadOptions(
+            column_names=list(columns), block_size=block_size
+        ),
+        "convert_options": pv.ConvertOptions(column_types=columns),
+    }
+
+
+# Record batch reader over a gzip compressed, headerless CSV file object
+# The file is decompressed incrementally and parsed into Arrow record batches of
+# about block_size bytes, so memory stays constant however large the file is
+def open_gzip_csv(fileobj, columns=WEATHER_COLUMNS, block_size=1024 * 1024):
+    return pv.open_csv(
+        pa.input_stream(fileobj, compression="gzip"),
+        **_csv_options(columns, block_size),
+    )
+
+
+# Stream a gzip compressed, headerless CSV file object into a DuckDB table
+# limit stops after that many rows, returns the number of rows loaded
+def load_gzip_csv(
+    fileobj,
+    duckdb_conn,
+    table,
+    columns=WEATHER_COLUMNS,
+    block_size=1024 * 1024,
+    limit=None,
+):
+    reader = open_gzip_csv(fileobj, columns, block_size)
+    num_rows = 0
+    for batch in reader:
+        if limit is not None and num_rows + batch.num_rows > limit:
+            batch = batch.slice(0, limit - num_rows)
+        insert_arrow(duckdb_conn, table, pa.Table.from_batches([batch]))
+        num_rows += batch.num_rows
+        if num_rows == limit:
+            break
+    return num_rows
+
+
+# Stream one gzip compressed CSV object from S3 into a DuckDB table
+def load_s3_gzip_csv(s3_client, bucket, key, duckdb_conn, table, **options):
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    with response["Body"] as body:
+        return load_gzip_csv(body, duckdb_conn, table, **options)
+
+
+# Parquet copy of a gzip compressed CSV object in a ColumnarCache, keyed by the
+# object's ETag so it is only downloaded and parsed again when the object changes
+# Returns the path of the cached Parquet file
+def cache_s3_gzip_csv(s3_client, bucket, key, cache, columns=WEATHER_COLUMNS):
+    source_uri = f"s3://{bucket}/{key}"
+    etag = s3_client.head_object(Bucket=bucket, Key=key)["ETag"]
+    path = cache.get(source_uri, etag)
+    if path is None:
+        response = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag)
+        with response["Body"] as body:
+            path = cache.put(source_uri, etag, open_gzip_csv(body, columns))
+    return path
+
+
+# Download an object with parallel ranged GETs of part_size bytes into a
+# memory-mapped temporary file, each part is written straight to its offset
+# Every part is requested with IfMatch on the object's ETag so a concurrent
+# overwrite fails the download instead of mixing two versions
+# Returns the file positioned at its start, the caller closes it unless a part failed
+def download_s3_object_ranged(
+    s3_client, bucket, key, part_size=8 * 1024 * 1024, max_workers=8
+):
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    size = head["ContentLength"]
+    file = tempfile.TemporaryFile()
+    if size == 0:
+        return file
+    try:
+        file.truncate(size)
+        with mmap.mmap(file.fileno(), size) as mapped:
+
+            def fetch_part(start):
+                end = min(start + part_size, size) - 1
+                response = s3_client.get_object(
+                    Bucket=bucket,
+                    Key=key,
+                    Range=f"bytes={start}-{end}",
+                    IfMatch=head["ETag"],
+                )
+                with response["Body"] as body:
+                    mapped[start : end + 1] = body.read()
+
+            with ThreadPoolExecutor(max_workers) as pool:
+                list(pool.map(fetch_part, range(0, size, part_size)))
+            mapped.flush()
+    except BaseException:
+        file.close()
+        raise
+    return file
+
+
+# Download one large gzip compressed CSV object with ranged GETs and load it
+# into a DuckDB table with load_gzip_csv
+def load_s3_gzip_csv_ranged(
+    s3_client,
+    bucket,
+    key,
+    duckdb_conn,
+    table,
+    part_size=8 * 1024 * 1024,
+    max_workers=8,
+    **options,
+):
+    with download_s3_object_ranged(
+        s3_client, bucket, key, part_size, max_workers
+    ) as file:
+        return load_gzip_csv(file, duckdb_conn, table, **options)
+
+
+# S3 error codes worth retrying, anything else (e.g. NoSuchKey, AccessDenied) fails fast
+RETRYABLE_ERROR_CODES = {
+    "500",
+    "503",
+    "InternalError",
+    "RequestTimeout",
+    "ServiceUnavailable",
+    "SlowDown",
+    "Throttling",
+}
+
+
+# boto3 S3 client whose connection pool can serve max_pool_connections requests at once
+# unsigned=True gives anonymous access for public buckets such as noaa-ghcn-pds
+def make_s3_client(max_pool_connections=32, unsigned=False, **client_kwargs):
+    config = Config(max_pool_connections=max_pool_connections)
+    if unsigned:
+        config = config.merge(Config(signature_version=UNSIGNED))
+    return boto3.client("s3", config=config, **client_kwargs)
+
+
+# All object keys under a prefix, following list_objects_v2 pagination
+def list_keys(s3_client, bucket, prefix):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            yield item["Key"]
+
+
+def _is_retryable(error):
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return isinstance(error, BotoCoreError)
+
+
+# Download an object on a thread of pool, retrying with exponential backoff and jitter
+async def _download(pool, s3_client, bucket, key, retries, backoff, stats):
+    def get_object_bytes():
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        with response["Body"] as body:
+            return body.read()
+
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, get_object_bytes
+            )
+        except (BotoCoreError, ClientError) as error:
+            if attempt == retries or not _is_retryable(error):
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(backoff * 2**attempt + random.uniform(0, backoff))
+
+
+def _read_gzip_csv_bytes(data, columns):
+    stream = pa.input_stream(io.BytesIO(data), compression="gzip")
+    return pv.read_csv(stream, **_csv_options(columns, 1024 * 1024))
+
+
+async def _ingest(s3_client, keys, bucket, duckdb_conn, table, options, stats):
+    concurrency = options["concurrency"]
+    semaphore = asyncio.Semaphore(concurrency)
+    parsed = asyncio.Queue(maxsize=concurrency)
+    loop = asyncio.get_running_loop()
+    # One thread per download slot, asyncio's default executor has only cpu_count + 4
+    # threads and would cap the requests in flight below concurrency
+    pool = ThreadPoolExecutor(concurrency)
+
+    # Decompression and parsing run on worker threads so the network and CPU overlap
+    # The semaphore is held until the parsed table is on the queue, so when the writer
+    # falls behind at most concurrency objects are downloaded or parsed and waiting,
+    # plus the concurrency tables in the queue
+    async def fetch(key):
+        async with semaphore:
+            data = await _download(
+                pool,
+                s3_client,
+                bucket,
+                key,
+                options["retries"],
+                options["backoff"],
+                stats,
+            )
+            arrow_table = await loop.run_in_executor(
+                pool, _read_gzip_csv_bytes, data, options["columns"]
+            )
+            del data
+            await parsed.put(arrow_table)
+
+    # Single DuckDB writer on its own thread, it keeps draining the queue after
+    # a failed insert so the downloads never block on a full queue
+    async def write():
+        error = None
+        with ThreadPoolExecutor(1) as writer:
+            while (arrow_table := await parsed.get()) is not None:
+                if error is not None:
+                    continue
+                try:
+                    await loop.run_in_executor(
+                        writer, insert_arrow, duckdb_conn, table, arrow_table
+                    )
+                    stats["rows"] += arrow_table.num_rows
+                except Exception as insert_error:
+                    error = insert_error
+        if error is not None:
+            raise error
+
+    writer_task = asyncio.create_task(write())
+    with pool:
+        results = await asyncio.gather(*map(fetch, keys), return_exceptions=True)
+    await parsed.put(None)
+    await writer_task
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            stats["failed"][key] = repr(result)
+        else:
+            stats["objects"] += 1
+
+
+# Load every gzip compressed CSV object under a prefix into a DuckDB table,
+# downloading up to concurrency objects at a time
+# Objects that still fail after the retries are reported in stats["failed"]
+# Returns object/row counts, objects/sec and the number of retries
+def ingest_s3_prefix(
+    s3_client,
+    bucket,
+    prefix,
+    duckdb_conn,
+    table,
+    concurrency=16,
+    retries=3,
+    backoff=0.5,
+    max_objects=None,
+    columns=WEATHER_COLUMNS,
+):
+    start = time.perf_counter()
+    keys = list(list_keys(s3_client, bucket, prefix))[:max_objects]
+    stats = {"objects": 0, "rows": 0, "retries": 0, "failed": {}}
+    options = {
+        "concurrency": concurrency,
+        "retries": retries,
+        "backoff": backoff,
+        "columns": columns,
+    }
+    asyncio.run(_ingest(s3_client, keys, bucket, duckdb_conn, table, options, stats))
+    seconds = time.perf_counter() - start
+    stats["seconds"] = round(seconds, 3)
+    stats["objects_per_sec"] = round(stats["objects"] / seconds, 1) if seconds else None
+    return stats
@@ -0,0 +1,158 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import duckdb
+import pytest
+
+from api_functions import EXCHANGES_SCHEMA, ApiExtractor, load_records, validate_schema
+
+EXCHANGES = [{"exchangeId": f"exchange-{i}", "rank": str(i + 1)} for i in range(25)]
+
+
+# Local stand-in for the CoinCap API: limit/offset pagination, ETags and one 429
+class StubHandler(BaseHTTPRequestHandler):
+    throttled = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/v2/throttled" and url.path not in self.throttled:
+            self.throttled.add(url.path)
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", len(EXCHANGES)))
+        body = json.dumps({"data": EXCHANGES[offset : offset + limit]}).encode()
+        etag = f'"{offset}-{limit}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_pages_reads_every_page(base_url):
+    with ApiExtractor() as extractor:
+        records = extractor.fetch_pages(
+            f"{base_url}/v2/exchanges", page_size=4, concurrency=3
+        )
+
+    assert records == EXCHANGES
+
+
+def test_get_json_uses_cache_on_not_modified(base_url, tmp_path):
+    url = f"{base_url}/v2/exchanges"
+    with ApiExtractor(cache_dir=tmp_path) as extractor:
+        first = extractor.fetch_pages(url, page_size=10, concurrency=2)
+    with ApiExtractor(cache_dir=tmp_path) as extractor:
+        second = extractor.fetch_pages(url, page_size=10, concurrency=2)
+
+        assert second == first == EXCHANGES
+        assert extractor.stats["cache_hits"] == extractor.stats["requests"] == 4
+        assert extractor.cache_hit_rate() == 1.0
+
+
+def test_get_json_retries_rate_limited_requests(base_url):
+    with ApiExtractor(backoff=0) as extractor:
+        body = extractor.get_json(f"{base_url}/v2/throttled")
+
+        assert body == {"data": EXCHANGES}
+        assert extractor.stats == {"requests": 2, "cache_hits": 0, "retries": 1}
+
+
+@pytest.fixture
+def duckdb_conn():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE Exchanges (
+            id TEXT,
+            name TEXT,
+            rank INTEGER,
+            percentTotalVolume FLOAT,
+            volumeUsd FLOAT,
+            tradingPairs TEXT,
+            socket BOOLEAN,
+            exchangeUrl TEXT,
+            updated BIGINT
+        )
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def test_load_records_coerces_types_and_nulls(duckdb_conn):
+    records = [
+        {
+            "exchangeId": "binance",
+            "name": "Binance",
+            "rank": "1",
+            "percentTotalVolume": "25.5",
+            "volumeUsd": "1000.25",
+            "tradingPairs": "1000",
+            "socket": True,
+            "exchangeUrl": "https://www.binance.com/",
+            "updated": 1717000000000,
+        },
+        {
+            "exchangeId": "gdax",
+            "name": "Coinbase Pro",
+            "rank": "2",
+            "percentTotalVolume": "",
+            "volumeUsd": None,
+            "tradingPairs": "",
+            "socket": False,
+            "updated": 1717000000001,
+        },
+    ]
+
+    assert load_records(duckdb_conn, "Exchanges", records, EXCHANGES_SCHEMA) == 2
+    assert duckdb_conn.execute("SELECT * FROM Exchanges ORDER BY rank").fetchall() == [
+        (
+            "binance",
+            "Binance",
+            1,
+            25.5,
+            1000.25,
+            "1000",
+            True,
+            "https://www.binance.com/",
+            1717000000000,
+        ),
+        ("gdax", "Coinbase Pro", 2, None, None, "", False, None, 1717000000001),
+    ]
+
+
+def test_validate_schema_reports_mismatches(duckdb_conn):
+    validate_schema(duckdb_conn, "Exchanges", EXCHANGES_SCHEMA)
+
+    schema = EXCHANGES_SCHEMA + [("baseId", "baseId", "TEXT")]
+    schema[2] = ("rank", "rank", "BIGINT")
+    with pytest.raises(ValueError, match="rank: schema BIGINT, table INTEGER"):
+        validate_schema(duckdb_conn, "Exchanges", schema)
+    with pytest.raises(ValueError, match="baseId: schema TEXT, table missing"):
+        validate_schema(duckdb_conn, "Exchanges", schema)
@@ -0,0 +1,85 @@
+import os
+
+import duckdb
+import pyarrow as pa
+
+from cache_functions import ColumnarCache, cache_csv_file, load_parquet
+
+CUSTOMERS_CSV = "data/customers.csv"
+
+
+def make_table(num_rows):
+    return pa.table(
+        {"id": list(range(num_rows)), "name": [f"n{i}" for i in range(num_rows)]}
+    )
+
+
+def test_put_and_get_round_trip_by_uri_and_version(tmp_path):
+    cache = ColumnarCache(str(tmp_path))
+    path = cache.put("s3://bucket/key", '"etag-1"', make_table(10))
+
+    assert cache.get("s3://bucket/key", '"etag-1"') == path
+    assert cache.get("s3://bucket/key", '"etag-2"') is None
+    assert cache.get("s3://bucket/other", '"etag-1"') is None
+    assert cache.hit_rate() == 1 / 3
+    assert duckdb.sql(f"SELECT COUNT(*) FROM read_parquet('{path}')").fetchone() == (
+        10,
+    )
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    table = make_table(1000)
+    cache = ColumnarCache(str(tmp_path))
+    entry_size = os.path.getsize(cache.put("a", "1", table))
+    cache.max_bytes = 2 * entry_size
+    cache.put("b", "1", table)
+    cache.get("a", "1")
+    cache.put("c", "1", table)
+
+    assert cache.get("b", "1") is None
+    assert cache.get("a", "1") and cache.get("c", "1")
+    assert cache.stats["evictions"] == 1
+    assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_entry_larger_than_budget_is_kept(tmp_path):
+    cache = ColumnarCache(str(tmp_path), max_bytes=1)
+    cache.put("a", "1", make_table(10))
+    path = cache.put("b", "1", make_table(10))
+
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_failed_put_leaves_no_entry(tmp_path):
+    def batches():
+        yield make_table(10).to_batches()[0]
+        raise OSError("connection reset")
+
+    reader = pa.RecordBatchReader.from_batches(make_table(1).schema, batches())
+    cache = ColumnarCache(str(tmp_path))
+    try:
+        cache.put("a", "1", reader)
+    except OSError:
+        pass
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_csv_file_reparses_only_on_change(tmp_path):
+    csv_path = tmp_path / "customers.csv"
+    csv_path.write_bytes(open(CUSTOMERS_CSV, "rb").read())
+    cache = ColumnarCache(str(tmp_path / "cache"))
+    first = cache_csv_file(cache, str(csv_path))
+    assert cache_csv_file(cache, str(csv_path)) == first
+
+    with open(csv_path, "a") as file:
+        file.write("101,01001,franca,SP,2017-10-18 00:00:00,2017-10-18 00:00:00\n")
+    changed = cache_csv_file(cache, str(csv_path))
+
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE Customer AS SELECT * FROM read_csv(?) LIMIT 0", [CUSTOMERS_CSV]
+    )
+    assert changed != first
+    assert cache.stats == {"hits": 1, "misses": 2, "evictions": 0}
+    assert load_parquet(conn, "Customer", changed) == 101
@@ -1,4 +1,20 @@
-from cleaning_functions import remove_duplicates
+import itertools
+import multiprocessing
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pytest
+
+import cleaning_functions
+from cleaning_functions import (
+    DedupStats,
+    iter_unique,
+    iter_unique_parallel,
+    remove_duplicates,
+)
 
 
 def test_remove_duplicates():
@@ -26,4 +42,202 @@ def test_remove_duplicates():
     assert unique_data == expected_data
 
 
+def test_remove_duplicates_composite_key_keep_last():
+    data = [
+        {"Customer_ID": 1, "Purchase_Date": "2024-01-01", "Amount": 10},
+        {"Customer_ID": 1, "Purchase_Date": "2024-01-02", "Amount": 20},
+        {"Customer_ID": 1, "Purchase_Date": "2024-01-01", "Amount": 30},  # Duplicate
+        {"Customer_ID": 2, "Purchase_Date": "2024-01-01", "Amount": 40},
+    ]
+
+    unique_data = remove_duplicates(data, ["Customer_ID", "Purchase_Date"], keep="last")
+
+    assert [row["Amount"] for row in unique_data] == [20, 30, 40]
+
+
+def test_iter_unique_is_lazy():
+    rows = ({"Customer_ID": i % 5} for i in itertools.count())
+
+    first_rows = list(itertools.islice(iter_unique(rows, "Customer_ID"), 5))
+
+    assert [row["Customer_ID"] for row in first_rows] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_iter_unique_spill_matches_in_memory(tmp_path, keep):
+    rng = random.Random(42)
+    data = [{"Customer_ID": rng.randrange(500), "Row": i} for i in range(5000)]
+
+    in_memory = list(iter_unique(data, "Customer_ID", keep=keep))
+    spilled = list(
+        iter_unique(data, "Customer_ID", keep=keep, max_keys=50, spill_dir=tmp_path)
+    )
+
+    assert spilled == in_memory
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_iter_unique_spill_repartitions_within_budget(tmp_path, monkeypatch, keep):
+    rng = random.Random(5)
+    data = [{"Customer_ID": rng.randrange(400), "Row": i} for i in range(3000)]
+    partitions = []
+    spill_writer = cleaning_functions._SpillWriter
+
+    def counting_spill_writer(paths):
+        partitions.extend(paths)
+        return spill_writer(paths)
+
+    monkeypatch.setattr(cleaning_functions, "_SpillWriter", counting_spill_writer)
+    spilled = list(
+        iter_unique(
+            data,
+            "Customer_ID",
+            keep=keep,
+            max_keys=10,
+            spill_dir=tmp_path,
+            spill_partitions=4,
+        )
+    )
+
+    assert spilled == list(iter_unique(data, "Customer_ID", keep=keep))
+    # 400 keys over 4 partitions only fit a budget of 10 after splitting them again
+    assert len(partitions) > 40
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_remove_duplicates_bloom_confirm_is_exact():
+    rng = random.Random(7)
+    data = [{"Customer_ID": rng.randrange(2000)} for _ in range(10000)]
+    stats = DedupStats()
+
+    # A loose error rate makes sure the filter produces false positives
+    unique_data = remove_duplicates(
+        data,
+        "Customer_ID",
+        method="bloom",
+        expected_items=2000,
+        error_rate=0.2,
+        confirm=True,
+        stats=stats,
+    )
+
+    assert unique_data == remove_duplicates(data, "Customer_ID")
+    assert stats.rows_in == 10000
+    assert stats.rows_out == len(unique_data)
+    assert stats.false_positives > 0
+    assert stats.false_positive_rate == stats.false_positives / stats.rows_out
+
+
+def test_remove_duplicates_bloom_treats_equal_keys_of_different_types_as_one():
+    data = [{"k": 1}, {"k": 1.0}, {"k": True}]
+
+    unique_data = remove_duplicates(
+        data, "k", method="bloom", expected_items=10, confirm=True
+    )
+
+    assert unique_data == remove_duplicates(data, "k") == [{"k": 1}]
+
+
+def test_remove_duplicates_bloom_bits_per_key():
+    data = [{"Customer_ID": i} for i in range(10000)]
+    stats = DedupStats()
+
+    unique_data = remove_duplicates(
+        data, "Customer_ID", method="bloom", expected_items=10000, stats=stats
+    )
+
+    assert 9 < stats.bits_per_key < 10
+    # Without confirmation only false positives are dropped
+    assert len(unique_data) >= 10000 * 0.97
+    assert stats.false_positive_rate is None
+
+
+@pytest.mark.parametrize(
+    "to_columnar, to_rows",
+    [
+        (pd.DataFrame, lambda df: df.to_dict("records")),
+        (pl.DataFrame, lambda df: df.to_dicts()),
+        (pa.Table.from_pylist, lambda table: table.to_pylist()),
+        (pa.RecordBatch.from_pylist, lambda batch: batch.to_pylist()),
+        (
+            lambda rows: pd.DataFrame(rows).to_records(index=False),
+            lambda array: pd.DataFrame(array).to_dict("records"),
+        ),
+    ],
+)
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_remove_duplicates_columnar_matches_rows(to_columnar, to_rows, keep):
+    rng = random.Random(3)
+    data = [
+        {"Customer_ID": rng.randrange(50), "Gender": rng.choice("MF"), "Row": i}
+        for i in range(500)
+    ]
+    unique_key = ["Customer_ID", "Gender"]
+
+    unique_data = remove_duplicates(to_columnar(data), unique_key, keep=keep)
+
+    assert to_rows(unique_data) == remove_duplicates(data, unique_key, keep=keep)
+
+
+def test_remove_duplicates_columnar_rejects_row_methods_and_unsupported_types():
+    df = pd.DataFrame({"Customer_ID": [1, 2, 1]})
+
+    with pytest.raises(ValueError, match="bloom"):
+        remove_duplicates(df, "Customer_ID", method="bloom", expected_items=3)
+    with pytest.raises(TypeError, match="DataFrame"):
+        remove_duplicates(df["Customer_ID"], "Customer_ID")
+    with pytest.raises(TypeError, match="DataFrame or LazyFrame"):
+        remove_duplicates(pl.Series("Customer_ID", [1, 2, 1]), "Customer_ID")
+    with pytest.raises(TypeError, match="Table or RecordBatch"):
+        remove_duplicates(pa.chunked_array([[1, 2, 1]]), "Customer_ID")
+
+
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_remove_duplicates_parallel_matches_exact(keep):
+    rng = random.Random(11)
+    data = [
+        {"Customer_ID": rng.randrange(300), "Gender": rng.choice("MF"), "Row": i}
+        for i in range(3000)
+    ]
+    unique_key = ["Customer_ID", "Gender"]
+
+    unique_data = remove_duplicates(
+        data, unique_key, method="parallel", keep=keep, workers=3, chunk_size=500
+    )
+
+    assert unique_data == remove_duplicates(data, unique_key, keep=keep)
+
+
+def test_iter_unique_parallel_single_key_from_a_generator():
+    rows = ({"email": f"user{i % 7}@example.com", "Row": i} for i in range(100))
+    unique_rows = list(iter_unique_parallel(rows, "email", workers=2, chunk_size=9))
+
+    assert [row["Row"] for row in unique_rows] == list(range(7))
+
+
+def test_iter_unique_parallel_calls_from_threads_do_not_mix_rows():
+    datasets = [
+        [{"Customer_ID": (i * n) % 50, "Set": n} for i in range(500)] for n in (1, 3)
+    ]
+
+    with ThreadPoolExecutor(2) as pool:
+        results = list(
+            pool.map(
+                lambda data: list(iter_unique_parallel(data, "Customer_ID", workers=2)),
+                datasets,
+            )
+        )
+
+    for data, unique_data in zip(datasets, results):
+        assert unique_data == remove_duplicates(data, "Customer_ID")
+
+
+def test_iter_unique_parallel_needs_fork(monkeypatch):
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+
+    with pytest.raises(RuntimeError, match="fork"):
+        list(iter_unique_parallel([{"Customer_ID": 1}], "Customer_ID"))
+
+
 # Run this with the command python -m pytest ./tests
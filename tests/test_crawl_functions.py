@@ -0,0 +1,140 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import duckdb
+import pytest
+
+from crawl_functions import UrlSeenSet, crawl, extract_links
+
+# Local fixture site: / links to two sections, each links to its pages, /private is
+# disallowed by robots.txt and /missing is a 404
+SITE = {
+    "/": ["/a", "/b#top", "/private", "https://external.example/"],
+    "/a": ["/a/1", "/a/2", "/"],
+    "/b": ["/b/1", "/missing", "mailto:someone@example.com"],
+    "/a/1": ["/a/2"],
+    "/a/2": [],
+    "/b/1": ["/b/2"],
+    "/b/2": [],
+    "/private": ["/private/secret"],
+}
+ROBOTS_TXT = "User-agent: *\nDisallow: /private\n"
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    requests = []
+    starts = []
+    robots_txt = ROBOTS_TXT
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append(self.path)
+            cls.starts.append(time.monotonic())
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(0.01)
+            if self.path == "/robots.txt":
+                self._send(200, "text/plain", cls.robots_txt)
+            elif self.path in SITE:
+                anchors = "".join(f'<a href="{link}">x</a>' for link in SITE[self.path])
+                self._send(200, "text/html", f"<html><body>{anchors}</body></html>")
+            else:
+                self._send(404, "text/html", "not found")
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def _send(self, status, content_type, body):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    SiteHandler.requests = []
+    SiteHandler.starts = []
+    SiteHandler.max_active = 0
+    SiteHandler.robots_txt = ROBOTS_TXT
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_links_resolves_relative_links_and_drops_fragments():
+    html = '<p><a href="/a#x">a</a><a href="b">b</a><a href="mailto:x@y">m</a><a>no</a></p>'
+
+    assert extract_links(html, "http://host/dir/page") == [
+        "http://host/a",
+        "http://host/dir/b",
+    ]
+
+
+def test_url_seen_set():
+    seen = UrlSeenSet()
+
+    assert seen.add("http://host/a")
+    assert not seen.add("http://host/a")
+    assert "http://host/a" in seen and "http://host/b" not in seen
+    assert len(seen) == 1
+
+
+def test_crawl_is_breadth_first_and_respects_robots(site):
+    conn = duckdb.connect()
+    stats = crawl([site + "/"], conn, concurrency=4, per_host=2, batch_size=3)
+
+    pages = [path for path in SiteHandler.requests if path != "/robots.txt"]
+    assert sorted(pages[:1]) == ["/"]
+    assert sorted(pages[1:3]) == ["/a", "/b"]
+    assert sorted(pages) == sorted(
+        ["/", "/a", "/b", "/a/1", "/a/2", "/b/1", "/missing"]
+    )
+    assert SiteHandler.requests.count("/robots.txt") == 1
+    assert stats["pages"] == 6
+    assert stats["errors"] == 1
+    assert stats["disallowed"] == 1
+    assert conn.execute("SELECT COUNT(*) FROM Links").fetchone() == (11,)
+    assert conn.execute(
+        "SELECT target FROM Links WHERE source = ? ORDER BY target", [site + "/"]
+    ).fetchall() == [
+        (site + "/a",),
+        (site + "/b",),
+        (site + "/private",),
+        ("https://external.example/",),
+    ]
+
+
+def test_crawl_limits_depth_pages_and_per_host_concurrency(site):
+    assert crawl([site + "/"], max_depth=1)["pages"] == 3
+    assert crawl([site + "/"], max_pages=2)["pages"] == 2
+
+    SiteHandler.max_active = 0
+    crawl([site + "/"], concurrency=8, per_host=1)
+    assert SiteHandler.max_active == 1
+
+
+def test_crawl_delay_spaces_requests_to_a_host(site):
+    # urllib.robotparser only reads whole seconds
+    SiteHandler.robots_txt = ROBOTS_TXT + "Crawl-delay: 1\n"
+    stats = crawl([site + "/"], max_depth=1, concurrency=8, per_host=2)
+
+    assert stats["pages"] == 3
+    # Page requests start after robots.txt, spaced at least the delay apart
+    page_starts = SiteHandler.starts[1:]
+    gaps = [later - earlier for earlier, later in zip(page_starts, page_starts[1:])]
+    assert len(gaps) == 2 and min(gaps) >= 0.99
@@ -0,0 +1,135 @@
+import csv
+import datetime
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pytest
+
+from csv_functions import chunk_offsets, read_csv_columns_mmap, read_csv_parallel
+
+CUSTOMERS_CSV = "data/customers.csv"
+# Keep the leading zeros of zip codes such as 09790
+COLUMN_TYPES = {"zipcode": pa.string()}
+
+
+@pytest.mark.parametrize("num_chunks", [1, 3, 50, 100_000])
+def test_chunk_offsets_cover_the_file_on_line_boundaries(num_chunks):
+    with open(CUSTOMERS_CSV, "rb") as file:
+        data = file.read()
+    ranges = chunk_offsets(CUSTOMERS_CSV, num_chunks)
+
+    assert ranges[0][0] == data.index(b"\n") + 1
+    assert ranges[-1][1] == len(data)
+    assert all(
+        end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:])
+    )
+    assert all(data[end - 1 : end] == b"\n" for _, end in ranges[:-1])
+    assert len(ranges) <= num_chunks
+
+
+@pytest.mark.parametrize("chunk_size", [2_000, 64 * 1024 * 1024])
+def test_read_csv_parallel_matches_single_read(chunk_size):
+    expected = pv.read_csv(
+        CUSTOMERS_CSV, convert_options=pv.ConvertOptions(column_types=COLUMN_TYPES)
+    )
+    batches = list(
+        read_csv_parallel(
+            CUSTOMERS_CSV, workers=2, chunk_size=chunk_size, column_types=COLUMN_TYPES
+        )
+    )
+
+    assert pa.Table.from_batches(batches).equals(expected)
+    assert (
+        batches[0].column(batches[0].schema.get_field_index("zipcode"))[1].as_py()
+        == "09790"
+    )
+
+
+def test_read_csv_parallel_infers_types_from_first_chunk():
+    batches = list(read_csv_parallel(CUSTOMERS_CSV, workers=2, chunk_size=2_000))
+
+    assert len(batches) > 1
+    assert all(batch.schema == batches[0].schema for batch in batches)
+    assert sum(batch.num_rows for batch in batches) == 100
+
+
+@pytest.mark.parametrize("window_size", [500, 16 * 1024 * 1024])
+def test_read_csv_columns_mmap_matches_csv_reader(window_size):
+    with open(CUSTOMERS_CSV, newline="") as file:
+        expected = [
+            {"datetime_updated": row["datetime_updated"], "zipcode": row["zipcode"]}
+            for row in csv.DictReader(file)
+        ]
+    batches = read_csv_columns_mmap(
+        CUSTOMERS_CSV, ["datetime_updated", "zipcode"], window_size=window_size
+    )
+
+    assert pa.Table.from_batches(list(batches)).to_pylist() == expected
+
+
+def test_read_csv_columns_mmap_casts_and_handles_line_endings(tmp_path):
+    path = tmp_path / "customers.csv"
+    path.write_bytes(
+        b"customer_id,city,datetime_updated\r\n"
+        b"1,franca,2017-10-18 00:00:00\r\n"
+        b"2,,2017-10-19 12:30:00"
+    )
+    column_types = {"customer_id": pa.int64(), "datetime_updated": pa.timestamp("us")}
+    table = pa.Table.from_batches(
+        list(
+            read_csv_columns_mmap(
+                str(path), ["customer_id", "datetime_updated", "city"], column_types
+            )
+        )
+    )
+
+    assert table.to_pylist() == [
+        {
+            "customer_id": 1,
+            "datetime_updated": datetime.datetime(2017, 10, 18),
+            "city": "franca",
+        },
+        {
+            "customer_id": 2,
+            "datetime_updated": datetime.datetime(2017, 10, 19, 12, 30),
+            "city": "",
+        },
+    ]
+
+
+def test_read_csv_columns_mmap_rejects_quoted_fields(tmp_path):
+    path = tmp_path / "quoted.csv"
+    path.write_text('id,city\n1,"sao paulo, sp"\n')
+
+    with pytest.raises(ValueError, match="Quoted fields"):
+        list(read_csv_columns_mmap(str(path), ["city"]))
+
+
+def test_csv_readers_dictionary_encode_low_cardinality_columns():
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    column_types = {**COLUMN_TYPES, "city": dictionary, "state_code": dictionary}
+    expected = pv.read_csv(
+        CUSTOMERS_CSV, convert_options=pv.ConvertOptions(column_types=COLUMN_TYPES)
+    )
+
+    batches = list(
+        read_csv_parallel(
+            CUSTOMERS_CSV, workers=2, chunk_size=2_000, column_types=column_types
+        )
+    )
+    assert batches[0].schema.field("city").type == dictionary
+    assert pa.Table.from_batches(batches).to_pylist() == expected.to_pylist()
+
+    batches = list(
+        read_csv_columns_mmap(
+            CUSTOMERS_CSV,
+            ["city", "state_code"],
+            column_types=column_types,
+            window_size=500,
+        )
+    )
+    assert batches[0].schema.field("state_code").type == dictionary
+    assert (
+        pa.Table.from_batches(batches).to_pylist()
+        == expected.select(["city", "state_code"]).to_pylist()
+    )
@@ -0,0 +1,301 @@
+import csv
+import sqlite3
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+import extract_load_functions
+from extract_load_functions import (
+    bulk_load_csv,
+    get_high_water_mark,
+    incremental_extract,
+    key_ranges,
+    load_sqlite_extension,
+    parallel_extract,
+    rows_to_arrow,
+    transfer_table,
+)
+
+CUSTOMERS_CSV = Path(__file__).parent.parent / "data" / "customers.csv"
+CUSTOMERS = [
+    (1, "14409", "franca", "SP", "2017-10-18 00:00:00", "2017-10-18 00:00:00"),
+    (2, "09790", "sao bernardo do campo", "SP", "2017-10-18 00:00:00", None),
+    (3, "01151", "sao paulo", "SP", "2017-10-18 00:00:00", "2017-10-19 00:00:00"),
+]
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "tpch.db")
+    conn.execute(
+        """
+        CREATE TABLE Customer (
+            customer_id INTEGER PRIMARY KEY,
+            zipcode TEXT,
+            city TEXT,
+            state_code TEXT,
+            datetime_created TEXT,
+            datetime_updated TEXT
+        )
+        """
+    )
+    conn.executemany("INSERT INTO Customer VALUES (?, ?, ?, ?, ?, ?)", CUSTOMERS)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def duckdb_conn():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE Customer (
+            customer_id INTEGER,
+            zipcode TEXT,
+            city TEXT,
+            state_code TEXT,
+            datetime_created TIMESTAMP,
+            datetime_updated TIMESTAMP
+        )
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def read_customers(duckdb_conn):
+    return duckdb_conn.execute(
+        """
+        SELECT customer_id, zipcode, city, state_code,
+            strftime(datetime_created, '%Y-%m-%d %H:%M:%S'),
+            strftime(datetime_updated, '%Y-%m-%d %H:%M:%S')
+        FROM Customer ORDER BY customer_id
+        """
+    ).fetchall()
+
+
+@pytest.mark.parametrize("strategy", ["auto", "scanner", "batched"])
+def test_transfer_table(sqlite_conn, duckdb_conn, strategy):
+    if strategy == "scanner" and not load_sqlite_extension(duckdb_conn):
+        pytest.skip("DuckDB sqlite extension is not available")
+
+    num_rows = transfer_table(
+        sqlite_conn, duckdb_conn, "Customer", strategy=strategy, batch_size=2
+    )
+
+    assert num_rows == 3
+    assert read_customers(duckdb_conn) == CUSTOMERS
+
+
+def test_transfer_table_into_another_table(sqlite_conn, duckdb_conn):
+    duckdb_conn.execute("CREATE TABLE CustomerCopy AS SELECT * FROM Customer LIMIT 0")
+
+    num_rows = transfer_table(
+        sqlite_conn, duckdb_conn, "Customer", strategy="batched", target="CustomerCopy"
+    )
+
+    assert num_rows == 3
+    assert read_customers(duckdb_conn) == []
+    assert duckdb_conn.execute(
+        "SELECT customer_id FROM CustomerCopy ORDER BY customer_id"
+    ).fetchall() == [(customer[0],) for customer in CUSTOMERS]
+
+
+@pytest.mark.parametrize("primary_key", [False, True])
+def test_incremental_extract_upserts_changed_rows(
+    sqlite_conn, duckdb_conn, primary_key
+):
+    if primary_key:
+        duckdb_conn.execute("ALTER TABLE Customer RENAME TO Customer_no_pk")
+        duckdb_conn.execute(
+            "CREATE TABLE Customer (customer_id INTEGER PRIMARY KEY, zipcode TEXT, "
+            "city TEXT, state_code TEXT, datetime_created TIMESTAMP, "
+            "datetime_updated TIMESTAMP)"
+        )
+
+    assert incremental_extract(sqlite_conn, duckdb_conn, "Customer") == 3
+    assert get_high_water_mark(duckdb_conn, "Customer") == "2017-10-19 00:00:00"
+
+    # One updated customer and one new customer since the last run
+    sqlite_conn.execute(
+        "UPDATE Customer SET city = 'campinas', "
+        "datetime_updated = '2017-10-20 00:00:00' WHERE customer_id = 1"
+    )
+    sqlite_conn.execute(
+        "INSERT INTO Customer VALUES "
+        "(4, '08775', 'mogi das cruzes', 'SP', '2017-10-20 00:00:00', "
+        "'2017-10-20 00:00:00')"
+    )
+    sqlite_conn.commit()
+
+    # Rows at the high-water mark are read again: customer 3 and then 1 and 4
+    assert incremental_extract(sqlite_conn, duckdb_conn, "Customer") == 3
+    assert incremental_extract(sqlite_conn, duckdb_conn, "Customer") == 2
+    assert (
+        read_customers(duckdb_conn)
+        == sqlite_conn.execute("SELECT * FROM Customer ORDER BY customer_id").fetchall()
+    )
+
+    assert (
+        incremental_extract(sqlite_conn, duckdb_conn, "Customer", full_refresh=True)
+        == 4
+    )
+    assert len(read_customers(duckdb_conn)) == 4
+
+
+def test_incremental_extract_picks_up_rows_written_at_the_mark(
+    sqlite_conn, duckdb_conn
+):
+    incremental_extract(sqlite_conn, duckdb_conn, "Customer")
+    # Written after the last run within the same second as the high-water mark
+    sqlite_conn.execute(
+        "INSERT INTO Customer VALUES "
+        "(4, '08775', 'mogi das cruzes', 'SP', '2017-10-18 00:00:00', "
+        "'2017-10-19 00:00:00')"
+    )
+    sqlite_conn.commit()
+
+    incremental_extract(sqlite_conn, duckdb_conn, "Customer")
+    assert [row[0] for row in read_customers(duckdb_conn)] == [1, 2, 3, 4]
+
+
+def test_failed_full_refresh_falls_back_to_a_full_extract(
+    sqlite_conn, duckdb_conn, monkeypatch
+):
+    assert incremental_extract(sqlite_conn, duckdb_conn, "Customer") == 3
+
+    upsert_rows = extract_load_functions._upsert_rows
+    calls = []
+
+    def fail_on_second_batch(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        upsert_rows(*args)
+
+    monkeypatch.setattr(extract_load_functions, "_upsert_rows", fail_on_second_batch)
+    with pytest.raises(RuntimeError):
+        incremental_extract(
+            sqlite_conn, duckdb_conn, "Customer", full_refresh=True, batch_size=1
+        )
+    monkeypatch.undo()
+
+    assert read_customers(duckdb_conn) == []
+    assert get_high_water_mark(duckdb_conn, "Customer") is None
+    assert incremental_extract(sqlite_conn, duckdb_conn, "Customer") == 3
+    assert read_customers(duckdb_conn) == CUSTOMERS
+
+
+def test_key_ranges_cover_every_key():
+    assert key_ranges(1, 10, 3) == [(1, 4), (5, 8), (9, 10)]
+    assert key_ranges(5, 6, 4) == [(5, 5), (6, 6)]
+
+
+@pytest.mark.parametrize("num_slices", [1, 2, 8])
+def test_parallel_extract(sqlite_conn, duckdb_conn, num_slices):
+    stats = parallel_extract(
+        sqlite_conn,
+        duckdb_conn,
+        "Customer",
+        num_slices=num_slices,
+        batch_size=1,
+        queue_size=1,
+    )
+
+    assert stats["rows"] == 3
+    assert sum(slice_stats["rows"] for slice_stats in stats["slices"]) == 3
+    assert read_customers(duckdb_conn) == CUSTOMERS
+
+
+def test_parallel_extract_rolls_back_a_failed_insert(
+    sqlite_conn, duckdb_conn, monkeypatch
+):
+    inserted = []
+    insert_rows = extract_load_functions.insert_rows
+
+    def fail_on_third_batch(*args):
+        if len(inserted) == 2:
+            raise duckdb.ConversionException("bad batch")
+        insert_rows(*args)
+        inserted.append(args)
+
+    monkeypatch.setattr(extract_load_functions, "insert_rows", fail_on_third_batch)
+    with pytest.raises(duckdb.ConversionException):
+        parallel_extract(sqlite_conn, duckdb_conn, "Customer", batch_size=1)
+
+    assert len(inserted) == 2
+    assert read_customers(duckdb_conn) == []
+
+
+def test_parallel_extract_raises_when_a_reader_cannot_connect(
+    sqlite_conn, duckdb_conn, monkeypatch
+):
+    def fail_to_connect(*args, **kwargs):
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(extract_load_functions.sqlite3, "connect", fail_to_connect)
+    with pytest.raises(sqlite3.OperationalError):
+        parallel_extract(sqlite_conn, duckdb_conn, "Customer", num_slices=2)
+
+    assert read_customers(duckdb_conn) == []
+
+
+def test_parallel_extract_dictionary_encodes_columns(sqlite_conn, duckdb_conn):
+    stats = parallel_extract(
+        sqlite_conn,
+        duckdb_conn,
+        "Customer",
+        num_slices=2,
+        dictionary_columns=("city", "state_code"),
+    )
+
+    assert stats["rows"] == 3
+    assert read_customers(duckdb_conn) == CUSTOMERS
+
+
+def test_rows_to_arrow_dictionary_columns():
+    columns = ["customer_id", "zipcode", "city", "state_code"]
+    rows = [customer[:4] for customer in CUSTOMERS]
+    table = rows_to_arrow(columns, rows, dictionary_columns=("state_code",))
+
+    assert pa.types.is_dictionary(table.schema.field("state_code").type)
+    assert table.column("state_code").chunk(0).dictionary.to_pylist() == ["SP"]
+    assert not pa.types.is_dictionary(table.schema.field("city").type)
+    assert table.to_pylist() == rows_to_arrow(columns, rows).to_pylist()
+
+
+def test_parallel_extract_empty_table(sqlite_conn, duckdb_conn):
+    sqlite_conn.execute("DELETE FROM Customer")
+    sqlite_conn.commit()
+
+    assert parallel_extract(sqlite_conn, duckdb_conn, "Customer")["rows"] == 0
+
+
+def test_bulk_load_csv_into_sqlite(sqlite_conn):
+    sqlite_conn.execute("DELETE FROM Customer")
+    sqlite_conn.commit()
+
+    assert bulk_load_csv(sqlite_conn, "Customer", CUSTOMERS_CSV) == 100
+    assert sqlite_conn.execute(
+        "SELECT * FROM Customer WHERE customer_id = 2"
+    ).fetchone() == (
+        2,
+        "09790",
+        "sao bernardo do campo",
+        "SP",
+        "2017-10-18 00:00:00",
+        "2017-10-18 00:00:00",
+    )
+    # The load pragmas are restored afterwards
+    assert sqlite_conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+
+
+def test_bulk_load_csv_into_duckdb(duckdb_conn):
+    assert bulk_load_csv(duckdb_conn, "Customer", CUSTOMERS_CSV) == 100
+
+    with open(CUSTOMERS_CSV, newline="") as file:
+        expected = [(int(row[0]), *row[1:]) for row in list(csv.reader(file))[1:]]
+    assert read_customers(duckdb_conn) == expected
@@ -0,0 +1,324 @@
+import gzip
+import tempfile
+import threading
+import time
+
+import boto3
+import duckdb
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+import s3_functions
+from cache_functions import ColumnarCache, load_parquet
+from extract_load_functions import insert_arrow
+from s3_functions import (
+    cache_s3_gzip_csv,
+    download_s3_object_ranged,
+    ingest_s3_prefix,
+    load_s3_gzip_csv,
+    load_s3_gzip_csv_ranged,
+    make_s3_client,
+)
+
+BUCKET = "noaa-ghcn-pds"
+KEY = "csv.gz/by_station/ASN00002022.csv.gz"
+
+
+def weather_csv(num_rows):
+    return "".join(
+        f"ASN00002022,{18900101 + i},PRCP,{i},,,a,{'0700' if i % 2 else ''}\n"
+        for i in range(num_rows)
+    ).encode()
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key=KEY, Body=gzip.compress(weather_csv(1000)))
+        yield client
+
+
+@pytest.fixture
+def duckdb_conn():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE WeatherData (
+            id TEXT,
+            date TEXT,
+            element TEXT,
+            value INTEGER,
+            m_flag TEXT,
+            q_flag TEXT,
+            s_flag TEXT,
+            obs_time TEXT
+        )
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def test_load_s3_gzip_csv_streams_in_batches(s3_client, duckdb_conn):
+    num_rows = load_s3_gzip_csv(
+        s3_client, BUCKET, KEY, duckdb_conn, "WeatherData", block_size=4096
+    )
+
+    assert num_rows == 1000
+    assert duckdb_conn.execute(
+        "SELECT * FROM WeatherData WHERE value IN (0, 1) ORDER BY value"
+    ).fetchall() == [
+        ("ASN00002022", "18900101", "PRCP", 0, "", "", "a", ""),
+        ("ASN00002022", "18900102", "PRCP", 1, "", "", "a", "0700"),
+    ]
+
+
+def test_load_s3_gzip_csv_limit(s3_client, duckdb_conn):
+    num_rows = load_s3_gzip_csv(
+        s3_client, BUCKET, KEY, duckdb_conn, "WeatherData", block_size=4096, limit=250
+    )
+
+    assert num_rows == 250
+    assert duckdb_conn.execute("SELECT COUNT(*) FROM WeatherData").fetchone() == (250,)
+
+
+def put_stations(s3_client, num_stations):
+    for i in range(num_stations):
+        s3_client.put_object(
+            Bucket=BUCKET,
+            Key=f"csv.gz/by_station/STATION{i:03d}.csv.gz",
+            Body=gzip.compress(weather_csv(10 + i)),
+        )
+
+
+def test_ingest_s3_prefix(duckdb_conn):
+    with mock_aws():
+        s3_client = make_s3_client(max_pool_connections=4, region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+        put_stations(s3_client, 20)
+        s3_client.put_object(Bucket=BUCKET, Key="csv.gz/other.csv.gz", Body=b"")
+
+        stats = ingest_s3_prefix(
+            s3_client,
+            BUCKET,
+            "csv.gz/by_station/",
+            duckdb_conn,
+            "WeatherData",
+            concurrency=4,
+        )
+
+    assert stats["objects"] == 20
+    assert stats["failed"] == {}
+    assert stats["rows"] == sum(10 + i for i in range(20))
+    assert duckdb_conn.execute("SELECT COUNT(*) FROM WeatherData").fetchone() == (
+        stats["rows"],
+    )
+
+
+def test_ingest_s3_prefix_bounds_objects_in_memory(duckdb_conn, monkeypatch):
+    in_memory = []
+    peak = []
+    read_gzip_csv_bytes = s3_functions._read_gzip_csv_bytes
+
+    def read_and_count(data, columns):
+        in_memory.append(1)
+        peak.append(len(in_memory))
+        return read_gzip_csv_bytes(data, columns)
+
+    # A slow writer that falls behind the downloads
+    def slow_insert(duckdb_conn, table, arrow_table):
+        time.sleep(0.02)
+        in_memory.pop()
+        insert_arrow(duckdb_conn, table, arrow_table)
+
+    monkeypatch.setattr(s3_functions, "_read_gzip_csv_bytes", read_and_count)
+    monkeypatch.setattr(s3_functions, "insert_arrow", slow_insert)
+    with mock_aws():
+        s3_client = make_s3_client(region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+        put_stations(s3_client, 20)
+
+        stats = ingest_s3_prefix(
+            s3_client,
+            BUCKET,
+            "csv.gz/by_station/",
+            duckdb_conn,
+            "WeatherData",
+            concurrency=2,
+        )
+
+    assert stats["objects"] == 20
+    # 2 being parsed or waiting to be queued, 2 in the queue and 1 being inserted
+    assert max(peak) <= 5
+
+
+# Stand-in client that throttles the first request for every key
+class ThrottlingClient:
+    def __init__(self, s3_client):
+        self.s3_client = s3_client
+        self.throttled = set()
+
+    def get_paginator(self, name):
+        return self.s3_client.get_paginator(name)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.throttled:
+            self.throttled.add(Key)
+            raise ClientError({"Error": {"Code": "SlowDown"}}, "GetObject")
+        return self.s3_client.get_object(Bucket=Bucket, Key=Key)
+
+
+# Stand-in client that counts the get_object calls running at once
+class InFlightClient:
+    def __init__(self, s3_client):
+        self.s3_client = s3_client
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def get_paginator(self, name):
+        return self.s3_client.get_paginator(name)
+
+    def get_object(self, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.05)
+            return self.s3_client.get_object(**kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.mark.parametrize("concurrency", [2, 12])
+def test_ingest_s3_prefix_runs_concurrency_requests_at_once(
+    s3_client, duckdb_conn, concurrency
+):
+    put_stations(s3_client, 24)
+    client = InFlightClient(s3_client)
+
+    stats = ingest_s3_prefix(
+        client,
+        BUCKET,
+        "csv.gz/by_station/STATION",
+        duckdb_conn,
+        "WeatherData",
+        concurrency=concurrency,
+    )
+
+    assert stats["objects"] == 24
+    assert client.peak == concurrency
+
+
+def test_ingest_s3_prefix_retries_throttled_requests(s3_client, duckdb_conn):
+    put_stations(s3_client, 3)
+
+    stats = ingest_s3_prefix(
+        ThrottlingClient(s3_client),
+        BUCKET,
+        "csv.gz/by_station/STATION",
+        duckdb_conn,
+        "WeatherData",
+        backoff=0.01,
+    )
+
+    assert stats["objects"] == 3
+    assert stats["retries"] == 3
+
+
+def test_ingest_s3_prefix_reports_failed_objects(s3_client, duckdb_conn):
+    put_stations(s3_client, 2)
+
+    stats = ingest_s3_prefix(
+        ThrottlingClient(s3_client),
+        BUCKET,
+        "csv.gz/by_station/STATION",
+        duckdb_conn,
+        "WeatherData",
+        retries=0,
+    )
+
+    assert stats["objects"] == 0
+    assert sorted(stats["failed"]) == [
+        "csv.gz/by_station/STATION000.csv.gz",
+        "csv.gz/by_station/STATION001.csv.gz",
+    ]
+
+
+@pytest.mark.parametrize("part_size", [1000, 4096, 10**9])
+def test_download_s3_object_ranged_is_byte_identical(s3_client, part_size):
+    expected = s3_client.get_object(Bucket=BUCKET, Key=KEY)["Body"].read()
+
+    with download_s3_object_ranged(
+        s3_client, BUCKET, KEY, part_size=part_size, max_workers=4
+    ) as file:
+        assert file.read() == expected
+
+
+def test_download_s3_object_ranged_empty_object(s3_client):
+    s3_client.put_object(Bucket=BUCKET, Key="empty.csv.gz", Body=b"")
+
+    with download_s3_object_ranged(s3_client, BUCKET, "empty.csv.gz") as file:
+        assert file.read() == b""
+
+
+# Stand-in client whose object is overwritten after the first part was downloaded
+class OverwrittenClient:
+    def __init__(self, s3_client):
+        self.s3_client = s3_client
+
+    def head_object(self, **kwargs):
+        return self.s3_client.head_object(**kwargs)
+
+    def get_object(self, Range, **kwargs):
+        if not Range.startswith("bytes=0-"):
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+        return self.s3_client.get_object(Range=Range, **kwargs)
+
+
+def test_download_s3_object_ranged_closes_the_file_on_failure(s3_client, monkeypatch):
+    files = []
+    temporary_file = tempfile.TemporaryFile
+
+    def tracked_temporary_file():
+        files.append(temporary_file())
+        return files[-1]
+
+    monkeypatch.setattr(s3_functions.tempfile, "TemporaryFile", tracked_temporary_file)
+    with pytest.raises(ClientError):
+        download_s3_object_ranged(
+            OverwrittenClient(s3_client), BUCKET, KEY, part_size=1000, max_workers=1
+        )
+
+    assert len(files) == 1 and files[0].closed
+
+
+def test_load_s3_gzip_csv_ranged(s3_client, duckdb_conn):
+    num_rows = load_s3_gzip_csv_ranged(
+        s3_client, BUCKET, KEY, duckdb_conn, "WeatherData", part_size=1000
+    )
+
+    assert num_rows == 1000
+    assert duckdb_conn.execute("SELECT SUM(value) FROM WeatherData").fetchone() == (
+        sum(range(1000)),
+    )
+
+
+def test_cache_s3_gzip_csv_downloads_once_per_etag(s3_client, duckdb_conn, tmp_path):
+    cache = ColumnarCache(str(tmp_path))
+    first = cache_s3_gzip_csv(s3_client, BUCKET, KEY, cache)
+    second = cache_s3_gzip_csv(s3_client, BUCKET, KEY, cache)
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=gzip.compress(weather_csv(10)))
+    changed = cache_s3_gzip_csv(s3_client, BUCKET, KEY, cache)
+
+    assert first == second != changed
+    assert cache.stats == {"hits": 1, "misses": 2, "evictions": 0}
+    assert load_parquet(duckdb_conn, "WeatherData", first) == 1000
+    assert load_parquet(duckdb_conn, "WeatherData", changed) == 10
+    assert duckdb_conn.execute(
+        "SELECT * FROM WeatherData WHERE value = 1 ORDER BY obs_time LIMIT 1"
+    ).fetchone() == ("ASN00002022", "18900102", "PRCP", 1, "", "", "a", "0700")
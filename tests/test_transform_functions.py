@@ -0,0 +1,522 @@
+import csv
+
+import duckdb
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pytest
+
+from transform_functions import (
+    AGE_GROUP_SQL,
+    AGE_GROUPS,
+    Bins,
+    PurchaseAggregates,
+    TransformDag,
+    ValueDictionary,
+    age_group,
+    aggregate_purchases,
+    dictionary_encode,
+    encode_values,
+    fill_missing,
+    load_csv_split_name,
+    polars_age_group,
+    purchases_dag,
+    read_rows,
+    scan_purchases,
+    split_name,
+    split_name_arrow,
+    split_name_sql,
+    split_names_arrow,
+    to_records,
+    transform_purchases,
+    transform_purchases_polars,
+)
+
+SAMPLE_CSV = "data/sample_data.csv"
+
+
+# The multi-pass list version of 3-data-transform-solutions.py
+def transform_with_lists(path):
+    with open(path, newline="") as file:
+        data = list(csv.DictReader(file))
+    seen = set()
+    data = [
+        row
+        for row in data
+        if not (row["Customer_ID"] in seen or seen.add(row["Customer_ID"]))
+    ]
+    for row in data:
+        row["Age"] = int(row["Age"] or 0)
+        row["Purchase_Amount"] = float(row["Purchase_Amount"] or 0.0)
+    data = [row for row in data if row["Age"] <= 100 and row["Purchase_Amount"] <= 1000]
+    totals = {}
+    groups = {}
+    for row in data:
+        gender = {"Female": 0, "Male": 1}.get(row["Gender"], -1)
+        totals[gender] = totals.get(gender, 0.0) + row["Purchase_Amount"]
+        groups.setdefault(age_group(row["Age"]), []).append(row["Purchase_Amount"])
+    return totals, {
+        group: sum(amounts) / len(amounts) for group, amounts in groups.items()
+    }
+
+
+# sample_data.csv with a duplicate, a missing age and purchase amount, two outliers and
+# a missing and an unknown Gender
+@pytest.fixture
+def messy_csv(tmp_path):
+    path = tmp_path / "sample_data.csv"
+    lines = open(SAMPLE_CSV).read().splitlines()
+    lines += [
+        lines[1],
+        "200,Solo,,Male,,2024-09-23",
+        "201,Old Man,101,Male,1,2024-09-23",
+        "202,Big Spender,40,Female,1000.01,2024-09-23",
+        "203,Pat Doe,35,,50.5,2024-09-23",
+        "204,Sam Lee,45,Other,60.25,2024-09-23",
+    ]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+TRANSFORMS = {
+    "streaming": lambda path: transform_purchases(read_rows(path)),
+    "polars_lazy": lambda path: transform_purchases_polars(path, streaming=False),
+    "polars_streaming": transform_purchases_polars,
+}
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_transform_matches_multi_pass_version(transform, messy_csv):
+    totals, averages = TRANSFORMS[transform](messy_csv)
+    expected_totals, expected_averages = transform_with_lists(messy_csv)
+
+    assert totals == pytest.approx(expected_totals)
+    assert averages == pytest.approx(expected_averages)
+    assert list(averages) == sorted(expected_averages)
+
+
+def test_scan_purchases_splits_names_and_maps_gender(messy_csv):
+    rows = scan_purchases(messy_csv).collect().to_dicts()
+
+    assert len(rows) == 103
+    assert rows[0]["First_Name"] == "Emma" and rows[0]["Last_Name"] == "Rodriguez"
+    assert rows[-3]["First_Name"] == "Solo" and rows[-3]["Last_Name"] == ""
+    assert [row["Gender"] for row in rows[-2:]] == [-1, -1]
+    assert {row["Gender"] for row in rows} == {-1, 0, 1}
+    assert "Customer_Name" not in rows[0]
+
+
+def test_stages_are_lazy():
+    def rows():
+        yield {"Age": "", "Customer_Name": "Emma Rodriguez"}
+        raise AssertionError("read past the first row")
+
+    stream = split_name(fill_missing(rows(), {"Age": 0}))
+
+    assert next(stream) == {"Age": 0, "First_Name": "Emma", "Last_Name": "Rodriguez"}
+
+
+def test_value_dictionary_encodes_known_values_first():
+    genders = ValueDictionary(["Female", "Male"])
+    codes = genders.encode(["Male", "Female", "Other", "Male", None])
+
+    assert codes.typecode == "H" and list(codes) == [1, 0, 2, 1, 3]
+    assert genders.values == ["Female", "Male", "Other", None]
+    assert genders.decode(codes) == ["Male", "Female", "Other", "Male", None]
+    assert genders.to_arrow(codes).to_pylist() == genders.decode(codes)
+
+
+def test_value_dictionary_overflows_array_h():
+    with pytest.raises(OverflowError):
+        ValueDictionary().encode(range(70_000))
+
+
+def test_encode_values_shares_one_dictionary_across_rows():
+    states = ValueDictionary()
+    rows = [{"state_code": state} for state in ["SP", "RJ", "SP", "MG"]]
+    encoded = encode_values(rows, {"state_code": states})
+
+    assert [row["state_code"] for row in encoded] == [0, 1, 0, 2]
+    assert states.values == ["SP", "RJ", "MG"]
+
+
+def test_split_name_single_and_multi_word_names():
+    rows = [{"Customer_Name": "Cher"}, {"Customer_Name": "Mary Ann Smith"}]
+
+    assert [(row["First_Name"], row["Last_Name"]) for row in split_name(rows)] == [
+        ("Cher", ""),
+        ("Mary", "Ann Smith"),
+    ]
+
+
+NAMES = ["Emma Rodriguez", "Cher", "Mary Ann Smith", "", " Lead", "Trail ", "Zoë Ñandú"]
+EXPECTED_NAMES = [
+    (row["First_Name"], row["Last_Name"])
+    for row in split_name({"Customer_Name": name} for name in NAMES)
+]
+
+
+@pytest.mark.parametrize("string_type", [pa.string(), pa.large_string()])
+def test_split_names_arrow_matches_split_name(string_type):
+    names = pa.array(NAMES + [None], string_type)
+
+    first_names, last_names = split_names_arrow(names)
+    assert list(zip(first_names.to_pylist(), last_names.to_pylist())) == (
+        EXPECTED_NAMES + [(None, None)]
+    )
+
+    first_names, last_names = split_names_arrow(names.slice(1, 3))
+    assert list(zip(first_names.to_pylist(), last_names.to_pylist())) == (
+        EXPECTED_NAMES[1:4]
+    )
+
+    chunked = pa.chunked_array([NAMES[:2], [], NAMES[2:]], string_type)
+    first_names, last_names = split_names_arrow(chunked)
+    assert first_names.num_chunks == 3
+    assert list(zip(first_names.to_pylist(), last_names.to_pylist())) == EXPECTED_NAMES
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_split_name_arrow_replaces_the_name_column(batch):
+    table = pa.table({"Customer_ID": range(len(NAMES)), "Customer_Name": NAMES})
+    data = table.to_batches()[0] if batch else table
+    split = split_name_arrow(data)
+
+    assert type(split) is type(data)
+    assert split.column_names == ["Customer_ID", "First_Name", "Last_Name"]
+    assert to_records(split, "tuples") == [
+        (i, *names) for i, names in enumerate(EXPECTED_NAMES)
+    ]
+
+
+def test_split_name_sql_matches_split_name():
+    conn = duckdb.connect()
+    conn.register("names", pa.table({"Customer_Name": NAMES + [None]}))
+
+    assert conn.execute(f"SELECT {split_name_sql()} FROM names").fetchall() == (
+        EXPECTED_NAMES + [(None, None)]
+    )
+
+
+def test_load_csv_split_name_splits_inside_the_load(messy_csv):
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE purchases (Customer_ID INTEGER, First_Name VARCHAR, "
+        "Last_Name VARCHAR, Age INTEGER, Gender VARCHAR, Purchase_Amount FLOAT, "
+        "Purchase_Date DATE)"
+    )
+
+    assert load_csv_split_name(conn, "purchases", messy_csv) == 106
+    expected = [
+        (int(row["Customer_ID"]), row["First_Name"], row["Last_Name"])
+        for row in split_name(read_rows(messy_csv))
+    ]
+    assert (
+        conn.execute(
+            "SELECT Customer_ID, First_Name, Last_Name FROM purchases"
+        ).fetchall()
+        == expected
+    )
+
+
+@pytest.mark.parametrize(
+    "age, group",
+    [
+        (0, "0-17"),
+        (17, "0-17"),
+        (18, "18-30"),
+        (30, "18-30"),
+        (31, "31-40"),
+        (60, "51-60"),
+        (61, "61-70"),
+        (70, "61-70"),
+        (71, "71+"),
+        (100, "71+"),
+        (-1, "0-17"),
+        (30.5, "18-30"),
+    ],
+)
+def test_age_group_edges(age, group):
+    assert age_group(age) == group
+
+
+def test_age_groups_agree_across_engines():
+    ages = list(range(-3, 120))
+    expected = [age_group(age) for age in ages]
+    labels = np.asarray(AGE_GROUPS.labels, dtype=object)
+
+    assert list(labels[AGE_GROUPS.codes(np.array(ages))]) == expected
+    assert list(labels[AGE_GROUPS.codes(np.array(ages, dtype=np.float64))]) == expected
+    assert list(AGE_GROUPS.categorical(np.array(ages, dtype=np.int8))) == expected
+    assert (
+        pl.DataFrame({"Age": ages})
+        .select(polars_age_group(pl.col("Age")))
+        .to_series()
+        .to_list()
+        == expected
+    )
+    conn = duckdb.connect()
+    conn.register("ages", pa.table({"Age": ages}))
+    assert [
+        group
+        for (group,) in conn.execute(f"SELECT {AGE_GROUP_SQL} FROM ages").fetchall()
+    ] == expected
+
+
+def test_bins_reject_bad_specs():
+    with pytest.raises(ValueError):
+        Bins([18, 18, 30], ["a", "b"], below="low", above="high")
+    with pytest.raises(ValueError):
+        Bins([18, 30], ["a", "b"], below="low", above="high")
+
+
+def test_purchases_dag_matches_stdlib_transform(messy_csv):
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE data AS SELECT * FROM read_csv(?, header = true, "
+        "columns = {'Customer_ID': 'INTEGER', 'Customer_Name': 'VARCHAR', "
+        "'Age': 'INTEGER', 'Gender': 'VARCHAR', 'Purchase_Amount': 'FLOAT', "
+        "'Purchase_Date': 'DATE'})",
+        [messy_csv],
+    )
+    dag = purchases_dag("data")
+    expected_totals, expected_averages = transform_with_lists(messy_csv)
+
+    assert dict(dag.fetchall(conn, "total_purchase_by_gender")) == pytest.approx(
+        expected_totals
+    )
+    assert dict(dag.fetchall(conn, "average_purchase_by_age_group")) == pytest.approx(
+        expected_averages
+    )
+
+
+def test_aggregate_purchases_keeps_only_running_totals():
+    rows = ({"Gender": i % 2, "Age": 25, "Purchase_Amount": 1.0} for i in range(10))
+
+    assert aggregate_purchases(rows) == ({0: 5.0, 1: 5.0}, {"18-30": 1.0})
+
+
+SAMPLE_DF = pd.read_csv(SAMPLE_CSV)
+CONVERTERS = {
+    "pandas": lambda df: df,
+    "polars": pl.from_pandas,
+    "arrow": lambda df: pa.Table.from_pandas(df, preserve_index=False),
+}
+
+
+@pytest.mark.parametrize("library", CONVERTERS)
+def test_to_records_matches_iterrows(library):
+    data = CONVERTERS[library](SAMPLE_DF)
+    expected = [row.to_dict() for _, row in SAMPLE_DF.iterrows()]
+
+    assert to_records(data, "dicts") == expected
+    assert to_records(data, "tuples") == [tuple(row.values()) for row in expected]
+    assert to_records(data, "arrow").to_pylist() == expected
+    view = to_records(data, "view")
+    assert len(view) == len(expected)
+    assert [dict(row) for row in view] == expected
+    assert view[-1]["Customer_Name"] == expected[-1]["Customer_Name"]
+    assert [dict(row) for row in view[1:3]] == expected[1:3]
+
+
+@pytest.mark.parametrize("library", ["pandas", "polars", "arrow", "batch"])
+def test_dictionary_encode_keeps_values(library):
+    table = pa.table(
+        {
+            "customer_id": [1, 2, 3, 4],
+            "city": ["franca", "sao paulo", "franca", "rio de janeiro"],
+            "state_code": ["SP", "SP", "SP", "RJ"],
+        }
+    )
+    data = {
+        "pandas": table.to_pandas(),
+        "polars": pl.from_arrow(table),
+        "arrow": table,
+        "batch": table.to_batches()[0],
+    }[library]
+    encoded = dictionary_encode(data, ["city", "state_code"])
+
+    assert type(encoded) is type(data)
+    assert to_records(encoded, "tuples") == to_records(data, "tuples")
+    if library == "pandas":
+        assert str(encoded["city"].dtype) == "category"
+    elif library == "polars":
+        assert encoded["state_code"].dtype == pl.Categorical
+    else:
+        assert pa.types.is_dictionary(encoded.schema.field("city").type)
+        assert encoded.schema.field("customer_id").type == pa.int64()
+
+
+def test_to_records_rejects_unknown_format_and_input():
+    with pytest.raises(ValueError):
+        to_records(SAMPLE_DF, "json")
+    with pytest.raises(TypeError):
+        to_records([{"a": 1}])
+    with pytest.raises(IndexError):
+        to_records(SAMPLE_DF, "view")[len(SAMPLE_DF)]
+
+
+def test_to_records_arrow_keeps_nulls_and_types():
+    table = pa.table(
+        {
+            "id": pa.array([1, None]),
+            "name": ["a", None],
+            "day": pa.array([1, 2], pa.date32()),
+        }
+    )
+    expected = table.to_pylist()
+
+    assert to_records(table, "dicts") == expected
+    assert [dict(row) for row in to_records(table, "view")] == expected
+
+
+@pytest.fixture
+def sample_conn():
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE data (Customer_ID INTEGER, Customer_Name VARCHAR, Age INTEGER, "
+        "Gender VARCHAR, Purchase_Amount FLOAT, Purchase_Date DATE)"
+    )
+    conn.execute(f"COPY data FROM '{SAMPLE_CSV}' WITH HEADER CSV")
+    yield conn
+    conn.close()
+
+
+def test_dag_compiles_only_the_steps_an_output_needs():
+    dag = (
+        TransformDag()
+        .step("a", "SELECT 1 AS x")
+        .step("unused", "SELECT 2 AS x")
+        .step("b", "SELECT x + 1 AS x FROM a")
+        .step("c", "SELECT x * 10 AS x FROM b")
+    )
+
+    assert dag.dependencies("c") == ["a", "b", "c"]
+    assert dag.sql("a") == "SELECT 1 AS x"
+    assert '"unused"' not in dag.sql("c")
+    assert dag.fetchall(duckdb.connect(), "c") == [(20,)]
+    with pytest.raises(ValueError):
+        dag.step("a", "SELECT 3")
+    with pytest.raises(KeyError):
+        dag.sql("missing")
+
+
+def test_purchases_dag_matches_step_by_step_tables(sample_conn):
+    dag = purchases_dag("data")
+    for name in dag.steps:
+        sample_conn.execute(f"CREATE TABLE step_{name} AS {dag.sql(name)}")
+
+    for output in ["total_purchase_by_gender", "average_purchase_by_age_group"]:
+        expected = sample_conn.execute(f"SELECT * FROM step_{output}").fetchall()
+        assert sorted(dag.fetchall(sample_conn, output)) == sorted(expected)
+
+
+def test_materialize_stores_only_the_requested_output(sample_conn):
+    dag = purchases_dag("data")
+    dag.materialize(sample_conn, "total_purchase_by_gender", "totals")
+    tables = {row[0] for row in sample_conn.execute("SHOW TABLES").fetchall()}
+
+    assert tables == {"data", "totals"}
+    assert sample_conn.execute("SELECT COUNT(*) FROM totals").fetchone() == (2,)
+
+    dag.create_views(sample_conn)
+    assert sample_conn.execute(
+        "SELECT COUNT(*) FROM average_purchase_by_age_group"
+    ).fetchone() == (5,)
+
+
+def recompute(conn):
+    dag = purchases_dag("data")
+    totals = dict(dag.fetchall(conn, "total_purchase_by_gender"))
+    averages = dict(dag.fetchall(conn, "average_purchase_by_age_group"))
+    return totals, averages
+
+
+def assert_same_results(aggregates, conn):
+    totals, averages = aggregates.results()
+    expected_totals, expected_averages = recompute(conn)
+    assert totals == pytest.approx(expected_totals)
+    assert averages == pytest.approx(expected_averages)
+
+
+def test_incremental_aggregates_match_full_recompute(sample_conn):
+    aggregates = PurchaseAggregates(sample_conn)
+    aggregates.rebuild()
+    assert_same_results(aggregates, sample_conn)
+
+    existing = sample_conn.execute("SELECT * FROM data ORDER BY Customer_ID LIMIT 3")
+    changed = existing.arrow()
+    changed = changed.set_column(
+        changed.column_names.index("Gender"),
+        "Gender",
+        pa.array(["Female", "Male", "Male"]),
+    )
+    changed = changed.set_column(
+        changed.column_names.index("Purchase_Amount"),
+        "Purchase_Amount",
+        pa.array([10.0, 1_000_000.0, 55.5], pa.float32()),
+    )
+    new_rows = pa.table(
+        {
+            "Customer_ID": pa.array([1001, 1002], pa.int32()),
+            "Customer_Name": ["New Customer", "Other Customer"],
+            "Age": pa.array([25, None], pa.int32()),
+            "Gender": ["Female", None],
+            "Purchase_Amount": pa.array([120.0, 80.0], pa.float32()),
+            "Purchase_Date": pa.array(["2023-01-01", "2023-01-02"]).cast(pa.date32()),
+        }
+    )
+    aggregates.upsert(pa.concat_tables([changed, new_rows]))
+    assert sample_conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == 102
+    assert_same_results(aggregates, sample_conn)
+
+    aggregates.delete([1001, 1002, 4, 5])
+    assert sample_conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == 98
+    assert_same_results(aggregates, sample_conn)
+
+
+def test_incremental_aggregates_drop_empty_groups(sample_conn):
+    aggregates = PurchaseAggregates(sample_conn)
+    aggregates.rebuild()
+    keys = [
+        row[0] for row in sample_conn.execute("SELECT Customer_ID FROM data").fetchall()
+    ]
+    aggregates.delete(keys)
+    assert aggregates.results() == ({}, {})
+
+
+def test_incremental_aggregates_refill_an_emptied_group(sample_conn):
+    sample_conn.execute("DELETE FROM data")
+    sample_conn.execute(
+        "INSERT INTO data VALUES (1, 'Emma Rodriguez', 45, 'Female', 20.0, '2023-01-01')"
+    )
+    aggregates = PurchaseAggregates(sample_conn)
+    aggregates.rebuild()
+
+    # Every row of the Female and 41-50 groups is replaced
+    replaced = sample_conn.execute("SELECT * FROM data").arrow()
+    replaced = replaced.set_column(
+        replaced.column_names.index("Purchase_Amount"),
+        "Purchase_Amount",
+        pa.array([30.0], pa.float32()),
+    )
+    aggregates.upsert(replaced)
+    assert aggregates.results() == ({0: 30.0}, {"41-50": 30.0})
+    assert_same_results(aggregates, sample_conn)
+
+    aggregates.rebuild()
+    assert aggregates.results() == ({0: 30.0}, {"41-50": 30.0})
+
+    aggregates.delete([1])
+    assert aggregates.results() == ({}, {})
+
+
+def test_incremental_aggregates_roll_back_failed_changes(sample_conn):
+    aggregates = PurchaseAggregates(sample_conn)
+    aggregates.rebuild()
+    before = aggregates.results()
+    with pytest.raises(duckdb.Error):
+        aggregates.upsert(pa.table({"Customer_ID": [1], "No_Such_Column": ["x"]}))
+    assert aggregates.results() == before
+    assert_same_results(aggregates, sample_conn)
@@ -0,0 +1,806 @@
+import bisect
+import csv
+import re
+import textwrap
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping, Sequence
+
+from cleaning_functions import iter_unique
+from extract_load_functions import quote
+
+# Generator stages of the standard library transform: each takes an iterable of row
+# dicts and yields rows, so chaining them processes every row in a single pass
+# without keeping the data set in memory
+
+
+# Rows of a CSV file with a header row as dicts, one at a time
+def read_rows(path):
+    with open(path, "r", newline="") as csvfile:
+        yield from csv.DictReader(csvfile)
+
+
+# Drop rows whose unique_key was already seen, only the keys are kept in memory
+# (see iter_unique for spilling them to disk)
+def dedup_rows(rows, unique_key, **options):
+    return iter_unique(rows, unique_key, **options)
+
+
+# Replace empty values, e.g. {"Age": 0, "Purchase_Amount": 0.0}
+def fill_missing(rows, defaults):
+    defaults = tuple(defaults.items())
+    for row in rows:
+        for column, default in defaults:
+            if not row[column]:
+                row[column] = default
+        yield row
+
+
+# Convert columns with a function per column, e.g. {"Age": int}
+def cast_columns(rows, converters):
+    converters = tuple(converters.items())
+    for row in rows:
+        for column, convert in converters:
+            row[column] = convert(row[column])
+        yield row
+
+
+# Keep rows whose values are at most the given maximum per column
+def remove_outliers(rows, maximums):
+    maximums = tuple(maximums.items())
+    for row in rows:
+        for column, maximum in maximums:
+            if row[column] > maximum:
+                break
+        else:
+            yield row
+
+
+# Replace the values of a column through a mapping, values not in it are kept
+def map_values(rows, column, mapping):
+    for row in rows:
+        row[column] = mapping.get(row[column], row[column])
+        yield row
+
+
+# Dictionary encoding of a low-cardinality column such as Gender, state_code or city:
+# every distinct value gets the next integer code, so rows hold small shared ints
+# instead of one str per row and a column of codes fits in array("H")
+# Known values passed in first keep their order, ["Female", "Male"] encodes as 0, 1
+class ValueDictionary:
+    def __init__(self, values=()):
+        self.codes = {}
+        self.values = []
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    # Codes of a column as array("H"), 2 bytes per row, OverflowError past 65536 values
+    def encode(self, values):
+        return array("H", map(self.code, values))
+
+    def decode(self, codes):
+        return list(map(self.values.__getitem__, codes))
+
+    # Codes from encode() as an Arrow DictionaryArray with this dictionary
+    def to_arrow(self, codes):
+        import pyarrow as pa
+
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, pa.uint16()), pa.array(self.values)
+        )
+
+
+# Replace the values of each column with their code in its ValueDictionary,
+# values not seen before are added to the dictionary
+def encode_values(rows, dictionaries):
+    dictionaries = tuple(dictionaries.items())
+    for row in rows:
+        for column, dictionary in dictionaries:
+            row[column] = dictionary.code(row[column])
+        yield row
+
+
+# Split a full name into First_Name and Last_Name at the first space,
+# a single word name gets an empty Last_Name
+def split_name(rows, column="Customer_Name"):
+    for row in rows:
+        first_name, _, last_name = row.pop(column).partition(" ")
+        row["First_Name"] = first_name
+        row["Last_Name"] = last_name
+        yield row
+
+
+# First and last names of an Arrow string array of full names, split at the first space
+# like split_name() with Arrow kernels on the string buffers and no Python str per row:
+# split_pattern gives the one or two parts of each name, last names are taken from the
+# second parts and single word names get "", null names stay null
+def split_names_arrow(names):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(names, pa.ChunkedArray):
+        chunks = [split_names_arrow(chunk) for chunk in names.chunks]
+        return tuple(
+            pa.chunked_array([chunk[i] for chunk in chunks], type=names.type)
+            for i in range(2)
+        )
+    parts = pc.split_pattern(names, " ", max_splits=1)
+    first_names = pc.list_element(parts, 0)
+    offsets = parts.offsets.to_numpy()
+    no_last_name = np.diff(offsets) < 2
+    last_names = parts.values.take(pa.array(offsets[:-1] + 1, mask=no_last_name))
+    if names.null_count:
+        return first_names, pc.if_else(
+            pc.is_null(names), last_names, pc.fill_null(last_names, "")
+        )
+    return first_names, pc.fill_null(last_names, "")
+
+
+# Arrow Table or RecordBatch with the full name column replaced by First_Name and
+# Last_Name at the end, the columnar version of split_name()
+def split_name_arrow(data, column="Customer_Name"):
+    first_names, last_names = split_names_arrow(data.column(column))
+    names = [name for name in data.column_names if name != column]
+    return type(data).from_arrays(
+        [data.column(name) for name in names] + [first_names, last_names],
+        names=names + ["First_Name", "Last_Name"],
+    )
+
+
+# SQL select list splitting a full name column into First_Name and Last_Name at the
+# first space like split_name(), NULL names stay NULL
+def split_name_sql(column="Customer_Name"):
+    space = f"strpos({column}, ' ')"
+    return (
+        f"CASE WHEN {space} > 0 THEN substr({column}, 1, {space} - 1) "
+        f"ELSE {column} END AS First_Name,\n"
+        f"CASE WHEN {space} > 0 THEN substr({column}, {space} + 1) "
+        f"WHEN {column} IS NOT NULL THEN '' END AS Last_Name"
+    )
+
+
+# Insert a CSV file with a header row into a DuckDB table by column name, with the full
+# name column split into First_Name and Last_Name inside the load query
+# Returns the number of rows inserted
+def load_csv_split_name(duckdb_conn, table, csv_path, column="Customer_Name"):
+    return duckdb_conn.execute(
+        f"INSERT INTO {quote(table)} BY NAME "
+        f"SELECT * EXCLUDE ({quote(column)}), {split_name_sql(quote(column))} "
+        "FROM read_csv(?, header = true)",
+        [csv_path],
+    ).fetchone()[0]
+
+
+# Binning of numbers into labelled [edges[i], edges[i + 1]) ranges, with the below label
+# for values under edges[0] and the above label from edges[-1] so no value falls into a
+# neighbouring bin, compiled from the one spec for each engine:
+# label() looks up a precomputed table for the integers up to edges[-1] in row streams,
+# codes() maps NumPy arrays to label indexes with a lookup table for integer arrays and
+# searchsorted for floats, sql() and polars() build the same CASE/when expression
+class Bins:
+    def __init__(self, edges, labels, below, above, table_values=None):
+        edges = tuple(edges)
+        if any(low >= high for low, high in zip(edges, edges[1:])):
+            raise ValueError(f"Bin edges must be increasing: {edges}")
+        if len(labels) != len(edges) - 1:
+            raise ValueError(f"{len(edges) - 1} bins need as many labels: {labels}")
+        self.edges = edges
+        self.labels = (below, *labels, above)
+        # Label of every integer of table_values, by default 0 or edges[0] - 1 to edges[-1]
+        if table_values is None:
+            table_values = range(min(0, edges[0] - 1), edges[-1] + 1)
+        self.label_table = {
+            value: self.labels[bisect.bisect_right(edges, value)]
+            for value in table_values
+        }
+        self._code_type = "uint8" if len(self.labels) <= 256 else "int64"
+        self._code_table = None
+
+    # Label of one value, hot loops can index label_table directly and call this
+    # on a KeyError to skip a function call per row
+    def label(self, value):
+        try:
+            return self.label_table[value]
+        except KeyError:
+            return self.labels[bisect.bisect_right(self.edges, value)]
+
+    # Index into labels of every value of a NumPy array
+    def codes(self, values):
+        import numpy as np
+
+        values = np.asarray(values)
+        if values.dtype.kind not in "iu":
+            return np.searchsorted(self.edges, values, side="right").astype(
+                self._code_type
+            )
+        if self._code_table is None:
+            # Codes of edges[0] - 1 (below) to edges[-1] (above), values outside
+            # the range are clipped to its ends
+            self._code_table = np.searchsorted(
+                self.edges, np.arange(self.edges[0] - 1, self.edges[-1] + 1), "right"
+            ).astype(self._code_type)
+        low = self.edges[0] - 1
+        return self._code_table[np.clip(values, low, self.edges[-1]) - low]
+
+    # Labels of a NumPy array as a pandas Categorical ordered like the bins
+    def categorical(self, values):
+        import pandas as pd
+
+        return pd.Categorical.from_codes(self.codes(values), self.labels)
+
+    # SQL expression of the labels of column, NULL for NULL
+    def sql(self, column):
+        labels = ["'" + label.replace("'", "''") + "'" for label in self.labels]
+        lines = [
+            f"WHEN {column} < {edge} THEN {label}"
+            for edge, label in zip(self.edges, labels)
+        ]
+        lines.append(f"WHEN {column} >= {self.edges[-1]} THEN {labels[-1]}")
+        return "CASE\n    " + "\n    ".join(lines) + "\nEND"
+
+    # polars expression of the labels of a column expression, null for null
+    def polars(self, column):
+        import polars as pl
+
+        expression = pl
+        for edge, label in zip(self.edges, self.labels):
+            expression = expression.when(column < edge).then(pl.lit(label))
+        return expression.when(column >= self.edges[-1]).then(pl.lit(self.labels[-1]))
+
+
+# Fixed integer codes for the known values of a column, declared once and compiled for
+# each engine like Bins: code() for row streams, codes() for pandas/NumPy, sql() and
+# polars() build the same CASE/when expression
+# Any other value, including a missing one, gets the code -1 like pandas Categorical codes
+class CategoryCodes:
+    def __init__(self, values):
+        self.values = tuple(values)
+        self.codes_by_value = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value):
+        return self.codes_by_value.get(value, -1)
+
+    # Codes of a pandas Series or NumPy array, as the int8 codes of a pandas Categorical
+    def codes(self, values):
+        import pandas as pd
+
+        return pd.Categorical(values, categories=self.values).codes
+
+    # SQL expression of the codes of column, -1 for other values and NULL
+    def sql(self, column):
+        values = ["'" + value.replace("'", "''") + "'" for value in self.values]
+        lines = [
+            f"WHEN {column} = {value} THEN {code}" for code, value in enumerate(values)
+        ]
+        return "CASE " + " ".join(lines) + " ELSE -1 END"
+
+    # polars expression of the codes of a column expression, -1 for other values and null
+    def polars(self, column):
+        import polars as pl
+
+        expression = pl
+        for value, code in self.codes_by_value.items():
+            expression = expression.when(column == value).then(code)
+        return expression.otherwise(-1)
+
+
+# Binary Gender of the transform questions, 0 for Female and 1 for Male
+GENDER_CODES = CategoryCodes(["Female", "Male"])
+
+
+# Age groups of the transform questions, ages under 18 (including the 0 filled in for a
+# missing age) and over 70 get their own groups
+AGE_GROUPS = Bins(
+    [18, 31, 41, 51, 61, 71],
+    ["18-30", "31-40", "41-50", "51-60", "61-70"],
+    below="0-17",
+    above="71+",
+    table_values=range(0, 151),
+)
+age_group = AGE_GROUPS.label
+
+
+# Total purchase amount by Gender and average purchase amount by age group in one
+# pass, with a running sum and count per group instead of a list of amounts
+def aggregate_purchases(rows):
+    total_by_gender = defaultdict(float)
+    age_group_sums = defaultdict(float)
+    age_group_counts = defaultdict(int)
+    age_groups = AGE_GROUPS.label_table
+    for row in rows:
+        amount = row["Purchase_Amount"]
+        total_by_gender[row["Gender"]] += amount
+        try:
+            group = age_groups[row["Age"]]
+        except KeyError:
+            group = age_group(row["Age"])
+        age_group_sums[group] += amount
+        age_group_counts[group] += 1
+    average_by_age_group = {
+        group: age_group_sums[group] / age_group_counts[group]
+        for group in sorted(age_group_sums)
+    }
+    return dict(total_by_gender), average_by_age_group
+
+
+# The whole standard library transform of sample_data.csv style rows as one pipeline
+def transform_purchases(rows):
+    rows = dedup_rows(rows, "Customer_ID")
+    rows = fill_missing(rows, {"Age": 0, "Purchase_Amount": 0.0})
+    rows = cast_columns(rows, {"Age": int, "Purchase_Amount": float})
+    rows = remove_outliers(rows, {"Age": 100, "Purchase_Amount": 1000})
+    rows = encode_values(rows, {"Gender": GENDER_CODES})
+    rows = split_name(rows)
+    return aggregate_purchases(rows)
+
+
+# polars expression for the age groups of age_group()
+def polars_age_group(age):
+    return AGE_GROUPS.polars(age)
+
+
+# The cleaning steps of transform_purchases as a polars LazyFrame over scan_csv
+# Nothing is read until the frame is collected, then polars plans all steps together:
+# only the columns the query uses are parsed and filters run as early as they can
+# Gender is coded with GENDER_CODES
+def scan_purchases(path):
+    import polars as pl
+
+    name_parts = pl.col("Customer_Name").str.splitn(" ", 2)
+    return (
+        pl.scan_csv(path)
+        .unique(subset="Customer_ID", keep="first", maintain_order=True)
+        .with_columns(
+            pl.col("Age").fill_null(0),
+            pl.col("Purchase_Amount").fill_null(0.0),
+        )
+        .filter((pl.col("Age") <= 100) & (pl.col("Purchase_Amount") <= 1000))
+        .with_columns(
+            GENDER_CODES.polars(pl.col("Gender")).alias("Gender"),
+            name_parts.struct.field("field_0").alias("First_Name"),
+            name_parts.struct.field("field_1").fill_null("").alias("Last_Name"),
+        )
+        .drop("Customer_Name")
+    )
+
+
+# transform_purchases with polars, both aggregates are collected together
+# streaming=True processes the file in chunks, polars cannot share the scan and
+# cleaning steps between the two queries then, without streaming they run once
+def transform_purchases_polars(path, streaming=True):
+    import polars as pl
+
+    purchases = scan_purchases(path)
+    totals = purchases.group_by("Gender").agg(pl.col("Purchase_Amount").sum())
+    averages = (
+        purchases.group_by(polars_age_group(pl.col("Age")).alias("Age_Group"))
+        .agg(pl.col("Purchase_Amount").mean())
+        .sort("Age_Group")
+    )
+    totals, averages = pl.collect_all(
+        [totals, averages], streaming=streaming, comm_subplan_elim=not streaming
+    )
+    return (
+        dict(zip(totals["Gender"].to_list(), totals["Purchase_Amount"].to_list())),
+        dict(
+            zip(averages["Age_Group"].to_list(), averages["Purchase_Amount"].to_list())
+        ),
+    )
+
+
+# Transform steps declared as SQL SELECTs that read from source tables or earlier steps
+# Instead of a CREATE TABLE per step, a requested output is compiled into one query
+# with the steps it depends on as CTEs, so DuckDB plans them as one pipeline and only
+# the outputs that are asked for are computed or stored
+class TransformDag:
+    def __init__(self):
+        self.steps = {}
+
+    # Add a step, it can only reference steps declared before it
+    def step(self, name, sql):
+        if name in self.steps:
+            raise ValueError(f"Step {name} is already declared")
+        self.steps[name] = textwrap.dedent(sql).strip()
+        return self
+
+    # The steps an output needs, in declaration order
+    def dependencies(self, output):
+        if output not in self.steps:
+            raise KeyError(f"Unknown step {output}")
+        needed = {output}
+        for name in reversed(list(self.steps)):
+            if name in needed:
+                needed.update(
+                    step
+                    for step in self.steps
+                    if step != name
+                    and re.search(rf"\b{re.escape(step)}\b", self.steps[name])
+                )
+        return [name for name in self.steps if name in needed]
+
+    # One query that computes the output, with its dependencies as CTEs
+    def sql(self, output):
+        dependencies = self.dependencies(output)
+        if len(dependencies) == 1:
+            return self.steps[output]
+        ctes = ",\n".join(
+            f"{quote(name)} AS (\n{self.steps[name]}\n)" for name in dependencies
+        )
+        return f"WITH {ctes}\nSELECT * FROM {quote(output)}"
+
+    def fetchall(self, duckdb_conn, output):
+        return duckdb_conn.execute(self.sql(output)).fetchall()
+
+    # Store an output as a table, the steps before it are never stored
+    def materialize(self, duckdb_conn, output, table=None):
+        duckdb_conn.execute(
+            f"CREATE OR REPLACE TABLE {quote(table or output)} AS {self.sql(output)}"
+        )
+
+    # Declare every step as a view, DuckDB inlines the views when they are queried
+    def create_views(self, duckdb_conn):
+        for name, sql in self.steps.items():
+            duckdb_conn.execute(f"CREATE OR REPLACE VIEW {quote(name)} AS {sql}")
+
+
+# Age groups of the DuckDB transform as a SQL expression on Age
+AGE_GROUP_SQL = AGE_GROUPS.sql("Age")
+# Gender_Binary of the DuckDB transform as a SQL expression on Gender
+GENDER_SQL = GENDER_CODES.sql("Gender")
+
+
+# The DuckDB transform of 3-data-transform-solutions.py as a TransformDag over the
+# source table, with total_purchase_by_gender and average_purchase_by_age_group outputs
+def purchases_dag(source="data"):
+    return (
+        TransformDag()
+        .step("data_unique", f"SELECT DISTINCT * FROM {quote(source)}")
+        .step(
+            "data_cleaned_missing",
+            """
+            SELECT Customer_ID, Customer_Name, COALESCE(Age, 0) AS Age, Gender,
+                   COALESCE(Purchase_Amount, 0.0) AS Purchase_Amount, Purchase_Date
+            FROM data_unique
+            """,
+        )
+        .step(
+            "data_cleaned_outliers",
+            """
+            SELECT * FROM data_cleaned_missing
+            WHERE Age <= 100 AND Purchase_Amount <= 1000
+            """,
+        )
+        .step(
+            "data_cleaned_gender",
+            f"SELECT *, {GENDER_SQL} AS Gender_Binary FROM data_cleaned_outliers",
+        )
+        .step(
+            "data_cleaned",
+            f"SELECT Customer_ID, {split_name_sql()}, "
+            "Age, Gender_Binary, Purchase_Amount, Purchase_Date "
+            "FROM data_cleaned_gender",
+        )
+        .step(
+            "total_purchase_by_gender",
+            """
+            SELECT Gender_Binary, SUM(Purchase_Amount) AS Total_Purchase_Amount
+            FROM data_cleaned_gender
+            GROUP BY Gender_Binary
+            ORDER BY Gender_Binary
+            """,
+        )
+        .step(
+            "data_grouped",
+            f"SELECT *, {AGE_GROUP_SQL} AS Age_Group FROM data_cleaned",
+        )
+        .step(
+            "average_purchase_by_age_group",
+            """
+            SELECT Age_Group, AVG(Purchase_Amount) AS Average_Purchase_Amount
+            FROM data_grouped
+            GROUP BY Age_Group
+            ORDER BY Age_Group
+            """,
+        )
+    )
+
+
+# Running SUM and COUNT of value per group in a DuckDB state table, so an aggregate over
+# a growing table is refreshed from the changed rows instead of rescanning the table
+# group_by and value are SQL expressions over the rows passed to apply
+class AggregateStore:
+    def __init__(self, duckdb_conn, state_table, group_by, value, key_type="VARCHAR"):
+        self.duckdb_conn = duckdb_conn
+        self.state_table = quote(state_table)
+        self.group_by = group_by
+        self.value = value
+        duckdb_conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.state_table} "
+            f"(group_key {key_type} PRIMARY KEY, total DOUBLE, row_count BIGINT)"
+        )
+
+    # Add (sign=1) or subtract (sign=-1) the rows of each (rows_sql, sign) change as one
+    # signed delta per group, so a group emptied by one change and refilled by another
+    # is updated in place
+    def apply(self, changes):
+        rows_sql = " UNION ALL ".join(
+            f"SELECT {self.group_by} AS group_key, {self.value} AS value, "
+            f"{int(sign)} AS sign FROM ({sql})"
+            for sql, sign in changes
+        )
+        self.duckdb_conn.execute(
+            f"""
+            INSERT INTO {self.state_table}
+            SELECT group_key, SUM(sign * value), SUM(sign)
+            FROM ({rows_sql})
+            GROUP BY 1
+            ON CONFLICT (group_key) DO UPDATE SET
+                total = total + EXCLUDED.total,
+                row_count = row_count + EXCLUDED.row_count
+            """
+        )
+
+    # Remove groups left with no rows, once at the end of a transaction since DuckDB
+    # loses a key inserted again after it was deleted in the same transaction
+    def drop_empty_groups(self):
+        self.duckdb_conn.execute(f"DELETE FROM {self.state_table} WHERE row_count = 0")
+
+    # Zero every group, drop_empty_groups removes the ones that are not refilled
+    def reset(self):
+        self.duckdb_conn.execute(
+            f"UPDATE {self.state_table} SET total = 0, row_count = 0"
+        )
+
+    def totals(self):
+        return dict(
+            self.duckdb_conn.execute(
+                f"SELECT group_key, total FROM {self.state_table} ORDER BY group_key"
+            ).fetchall()
+        )
+
+    def averages(self):
+        return dict(
+            self.duckdb_conn.execute(
+                f"SELECT group_key, total / row_count FROM {self.state_table} "
+                "ORDER BY group_key"
+            ).fetchall()
+        )
+
+
+# Gender totals and age group averages of a purchases table kept up to date incrementally
+# upsert and delete change the table and apply the cleaned old rows (subtracted) and new
+# rows (added) as one delta to AggregateStore state tables in the same transaction
+# The table must have one row per key, rebuild() recomputes the state from the full table
+class PurchaseAggregates:
+    def __init__(self, duckdb_conn, table="data", key="Customer_ID"):
+        self.duckdb_conn = duckdb_conn
+        self.table = table
+        self.key = key
+        self.by_gender = AggregateStore(
+            duckdb_conn,
+            f"{table}_by_gender",
+            "Gender_Binary",
+            "Purchase_Amount",
+            key_type="INTEGER",
+        )
+        self.by_age_group = AggregateStore(
+            duckdb_conn, f"{table}_by_age_group", "Age_Group", "Purchase_Amount"
+        )
+
+    # Apply the cleaned rows of each (source, sign) change to both stores
+    def _apply(self, *changes):
+        changes = [
+            (purchases_dag(source).sql("data_grouped"), sign)
+            for source, sign in changes
+        ]
+        self.by_gender.apply(changes)
+        self.by_age_group.apply(changes)
+
+    def _in_transaction(self, change):
+        self.duckdb_conn.begin()
+        try:
+            change()
+            self.by_gender.drop_empty_groups()
+            self.by_age_group.drop_empty_groups()
+            self.duckdb_conn.execute("DROP TABLE IF EXISTS purchase_old")
+            self.duckdb_conn.commit()
+        except BaseException:
+            self.duckdb_conn.rollback()
+            raise
+
+    # Copy the current version of the rows whose key is in the keys relation
+    def _save_old_rows(self, keys):
+        self.duckdb_conn.execute(
+            f"CREATE TEMP TABLE purchase_old AS SELECT * FROM {quote(self.table)} "
+            f"WHERE {quote(self.key)} IN (SELECT {quote(self.key)} FROM {keys})"
+        )
+
+    def _delete_rows(self, keys):
+        self.duckdb_conn.execute(
+            f"DELETE FROM {quote(self.table)} WHERE {quote(self.key)} IN "
+            f"(SELECT {quote(self.key)} FROM {keys})"
+        )
+
+    # Full recompute of the state from the table
+    def rebuild(self):
+        def change():
+            self.by_gender.reset()
+            self.by_age_group.reset()
+            self._apply((self.table, 1))
+
+        self._in_transaction(change)
+
+    # Insert new rows and replace existing rows with the same key from an Arrow table
+    # that has every column of the table
+    # Replaced rows are deleted and re-inserted, cheaper to commit in DuckDB than an
+    # UPDATE scattered over the table but not possible for a PRIMARY KEY column
+    def upsert(self, arrow_table):
+        column_list = ", ".join(quote(name) for name in arrow_table.column_names)
+
+        def change():
+            self._save_old_rows("purchase_new")
+            self._delete_rows("purchase_new")
+            self.duckdb_conn.execute(
+                f"INSERT INTO {quote(self.table)} ({column_list}) "
+                f"SELECT {column_list} FROM purchase_new"
+            )
+            self._apply(("purchase_old", -1), ("purchase_new", 1))
+
+        self.duckdb_conn.register("purchase_new", arrow_table)
+        try:
+            self._in_transaction(change)
+        finally:
+            self.duckdb_conn.unregister("purchase_new")
+
+    # Delete the rows with the given keys
+    def delete(self, keys):
+        import pyarrow as pa
+
+        def change():
+            self._save_old_rows("purchase_deleted")
+            self._delete_rows("purchase_deleted")
+            self._apply(("purchase_old", -1))
+
+        self.duckdb_conn.register("purchase_deleted", pa.table({self.key: list(keys)}))
+        try:
+            self._in_transaction(change)
+        finally:
+            self.duckdb_conn.unregister("purchase_deleted")
+
+    # (total purchase amount by Gender_Binary, average purchase amount by age group)
+    def results(self):
+        return self.by_gender.totals(), self.by_age_group.averages()
+
+
+RECORD_FORMATS = ("dicts", "tuples", "arrow", "view")
+
+
+# Read-only mapping over one row of a RecordView, values are looked up in the
+# column lists when accessed so no dict is built for the row
+class RowView(Mapping):
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, column):
+        return self._columns[column][self._index]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return f"RowView({dict(self)!r})"
+
+
+# Sequence of RowView rows over columns of Python values, {column: list}
+class RecordView(Sequence):
+    def __init__(self, columns, num_rows):
+        self._columns = columns
+        self._num_rows = num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._num_rows))]
+        if index < 0:
+            index += self._num_rows
+        if not 0 <= index < self._num_rows:
+            raise IndexError("RecordView index out of range")
+        return RowView(self._columns, index)
+
+    def __len__(self):
+        return self._num_rows
+
+
+# Arrow column as a list of Python values, null-free numbers and strings go through
+# NumPy which is about 10x faster than to_pylist, dictionary columns are decoded first
+def _arrow_column_to_list(column):
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if column.null_count == 0 and (
+        pa.types.is_integer(column.type)
+        or pa.types.is_floating(column.type)
+        or pa.types.is_boolean(column.type)
+        or pa.types.is_string(column.type)
+        or pa.types.is_large_string(column.type)
+    ):
+        return column.to_numpy(zero_copy_only=False).tolist()
+    return column.to_pylist()
+
+
+# Rows of a pandas/polars DataFrame or Arrow Table/RecordBatch as Python records,
+# every column is converted to a list of Python values in one call and the rows are
+# zipped from those lists, instead of building one Series per row like iterrows()
+# format="dicts" gives a list of dicts, "tuples" a list of tuples, "arrow" an Arrow
+# table and "view" a RecordView that only looks values up when a row is read
+def to_records(data, format="dicts"):
+    if format not in RECORD_FORMATS:
+        raise ValueError(f"format must be one of {RECORD_FORMATS}, got {format!r}")
+    library = type(data).__module__.split(".")[0]
+
+    if library == "pandas":
+        if format == "arrow":
+            import pyarrow as pa
+
+            return pa.Table.from_pandas(data, preserve_index=False)
+        columns = {name: data[name].tolist() for name in data.columns}
+        num_rows = len(data)
+    elif library == "polars":
+        if format == "arrow":
+            return data.to_arrow()
+        columns = {name: data[name].to_list() for name in data.columns}
+        num_rows = data.height
+    elif library == "pyarrow":
+        if format == "arrow":
+            return data
+        columns = {
+            name: _arrow_column_to_list(column)
+            for name, column in zip(data.column_names, data.columns)
+        }
+        num_rows = data.num_rows
+    else:
+        raise TypeError(f"Unsupported columnar input {type(data).__name__}")
+
+    if format == "dicts":
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    if format == "tuples":
+        return list(zip(*columns.values()))
+    return RecordView(columns, num_rows)
+
+
+# Columns of a pandas/polars DataFrame or Arrow Table/RecordBatch converted to pandas
+# Categorical, polars Categorical or Arrow dictionary columns: integer codes per row plus
+# one copy of each distinct value, which cuts the memory of low-cardinality strings
+# and lets group-bys and joins on them work on the codes
+def dictionary_encode(data, columns):
+    library = type(data).__module__.split(".")[0]
+    if library == "pandas":
+        return data.astype({column: "category" for column in columns})
+    if library == "polars":
+        import polars as pl
+
+        return data.with_columns(pl.col(columns).cast(pl.Categorical))
+    if library == "pyarrow":
+        import pyarrow.compute as pc
+
+        arrays = [
+            pc.dictionary_encode(column) if name in columns else column
+            for name, column in zip(data.column_names, data.columns)
+        ]
+        return type(data).from_arrays(arrays, names=data.column_names)
+    raise TypeError(f"Unsupported columnar input {type(data).__name__}")